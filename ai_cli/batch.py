@@ -0,0 +1,95 @@
+"""Batch mode: answer many tasks concurrently and write one JSON line per task."""
+
+import json
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from typing import TextIO
+
+from ai_cli.llm import LLMResponse
+
+DEFAULT_BATCH_JOBS = 4
+
+
+def _tasks(lines: Iterable[str]) -> Iterator[str]:
+    """Non-blank lines, stripped; lines are read lazily so input size doesn't matter."""
+    for line in lines:
+        task = line.strip()
+        if task:
+            yield task
+
+
+def _record(task: str, result: LLMResponse | None = None, error: str | None = None) -> dict:
+    return {
+        "task": task,
+        "model": result.model if result else None,
+        "command": result.command if result else None,
+        "explanation": result.explanation if result else None,
+        "timing": result.timing if result else None,
+        "error": error,
+    }
+
+
+def _answer(task: str, ask: Callable[[str], LLMResponse | None]) -> dict:
+    """Answer one task as a JSON-ready record; failures are recorded, not raised."""
+    try:
+        result = ask(task)
+    except Exception as e:
+        return _record(task, error=str(e) or type(e).__name__)
+    if result is None:
+        return _record(task, error="no command generated")
+    return _record(task, result)
+
+
+def run_batch(
+    lines: Iterable[str],
+    ask: Callable[[str], LLMResponse | None],
+    out: TextIO,
+    jobs: int = DEFAULT_BATCH_JOBS,
+    ordered: bool = False,
+) -> dict[str, float]:
+    """Answer every task with at most `jobs` in flight, writing JSONL records to out.
+
+    Records are written as tasks complete, or in input order with ordered. Either
+    way at most `jobs` tasks are read ahead, so memory stays flat for any input size.
+    Returns counts and throughput.
+    """
+    start = time.perf_counter()
+    done = errors = 0
+
+    def write(record: dict) -> None:
+        nonlocal done, errors
+        done += 1
+        errors += record["error"] is not None
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    tasks = _tasks(lines)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        if ordered:
+            window: deque[Future] = deque()
+            for task in tasks:
+                if len(window) >= jobs:
+                    write(window.popleft().result())
+                window.append(pool.submit(_answer, task, ask))
+            while window:
+                write(window.popleft().result())
+        else:
+            pending: set[Future] = set()
+            for task in tasks:
+                if len(pending) >= jobs:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write(future.result())
+                pending.add(pool.submit(_answer, task, ask))
+            for future in as_completed(pending):
+                write(future.result())
+
+    elapsed = time.perf_counter() - start
+    return {
+        "tasks": done,
+        "errors": errors,
+        "seconds": elapsed,
+        "tasks_per_s": done / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,113 @@
+"""Latency and throughput benchmark: run a fixed task corpus through ask_llm."""
+
+import math
+import time
+from collections.abc import Callable
+
+from ai_cli.llm import ask_llm
+
+BENCH_TASKS = [
+    "list all files including hidden ones with sizes",
+    "find python files modified in the last day",
+    "show disk usage of the current directory sorted by size",
+    "count lines in all markdown files",
+    "compress the logs directory into a tar.gz archive",
+    "show the 10 largest files under the home directory",
+    "find processes listening on port 8080",
+    "replace foo with bar in all txt files in place",
+]
+
+DEFAULT_BENCH_REPEAT = 3
+DEFAULT_BENCH_WARMUP = 1
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile, or None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def _run_once(task: str, model: str, config: dict) -> dict[str, float]:
+    """Ask once with caching off and return wall time plus the reported timing.
+
+    The no-op on_partial keeps the response streamed, so time to first token is
+    measured even though early_stop is off.
+    """
+    start = time.perf_counter()
+    result = ask_llm(
+        task,
+        model=model,
+        use_cache=False,
+        on_partial=lambda _: None,
+        config=config,
+        on_status=lambda _: None,
+    )
+    sample = dict(result.timing or {}) if result is not None else {}
+    sample["wall"] = time.perf_counter() - start
+    tokens, ttft = sample.get("tokens", 0), sample.get("ttft")
+    if sample.get("eval"):
+        sample["tokens_per_s"] = tokens / sample["eval"]
+    elif ttft is not None and tokens > 1 and sample["total"] > ttft:
+        sample["tokens_per_s"] = (tokens - 1) / (sample["total"] - ttft)
+    return sample
+
+
+def summarize(samples: list[dict[str, float]], errors: int) -> dict[str, float | int | None]:
+    """Reduce one model's samples to percentiles and medians."""
+
+    def values(key: str) -> list[float]:
+        return [s[key] for s in samples if key in s]
+
+    wall = values("wall")
+    return {
+        "runs": len(samples),
+        "errors": errors,
+        "wall_p50": _percentile(wall, 0.5),
+        "wall_p95": _percentile(wall, 0.95),
+        "wall_p99": _percentile(wall, 0.99),
+        "ttft_p50": _percentile(values("ttft"), 0.5),
+        "tokens_per_s_p50": _percentile(values("tokens_per_s"), 0.5),
+        "load_p50": _percentile(values("load"), 0.5),
+        "eval_p50": _percentile(values("eval"), 0.5),
+    }
+
+
+def run_bench(
+    models: list[str],
+    config: dict,
+    tasks: list[str] | None = None,
+    repeat: int = DEFAULT_BENCH_REPEAT,
+    warmup: int = DEFAULT_BENCH_WARMUP,
+    on_progress: Callable[[str, int, int], None] | None = None,
+) -> dict[str, dict[str, float | int | None]]:
+    """Benchmark each model over the task corpus and return a summary per model.
+
+    Each model first answers `warmup` untimed tasks, so its load time doesn't skew
+    the timed runs, then every task `repeat` times. Failed runs are counted, not timed.
+    Responses are read to the end regardless of `early_stop`, since the server only
+    reports its load and eval durations in the final chunk. on_progress is called
+    with (model, done, total) after every timed run.
+    """
+    config = {**config, "early_stop": False}
+    tasks = tasks or BENCH_TASKS
+    report = {}
+    for model in models:
+        for task in tasks[:warmup]:
+            try:
+                _run_once(task, model, config)
+            except Exception:
+                pass
+        samples: list[dict[str, float]] = []
+        errors = 0
+        total = len(tasks) * repeat
+        for i in range(total):
+            try:
+                samples.append(_run_once(tasks[i % len(tasks)], model, config))
+            except Exception:
+                errors += 1
+            if on_progress is not None:
+                on_progress(model, i + 1, total)
+        report[model] = summarize(samples, errors)
+    return report
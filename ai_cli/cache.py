@@ -0,0 +1,134 @@
+"""Persistent on-disk cache of generated commands."""
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from ai_cli.config import CONFIG_PATH
+
+CACHE_PATH = CONFIG_PATH.parent / "cache.sqlite3"
+
+DEFAULT_CACHE_MAX_ENTRIES = 1000
+DEFAULT_CACHE_MAX_AGE_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    task TEXT NOT NULL,
+    command TEXT NOT NULL,
+    explanation TEXT,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def normalize_task(task: str) -> str:
+    """Collapse whitespace so trivially different spellings share a cache entry."""
+    return " ".join(task.split())
+
+
+def cache_key(model: str, system_prompt: str, task: str) -> str:
+    """Build the cache key from the resolved model, rendered system prompt and task."""
+    prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+    payload = json.dumps([model, prompt_hash, normalize_task(task)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache of LLM responses with size and age limits."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        max_age_days: float = DEFAULT_CACHE_MAX_AGE_DAYS,
+    ) -> None:
+        self.path = path or CACHE_PATH
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the database, commit on success and always close."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.executescript(_SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _bump(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> tuple[str, str | None] | None:
+        """Return (command, explanation) for key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT command, explanation, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.max_age:
+                self._bump(conn, "misses")
+                return None
+            conn.execute(
+                "UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._bump(conn, "hits")
+        return row[0], row[1]
+
+    def put(self, key: str, model: str, task: str, command: str, explanation: str | None) -> None:
+        """Store a response and evict expired and least recently used entries."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, task, command, explanation, created, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, normalize_task(task), command, explanation, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+            conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict[str, int | float | None]:
+        """Return entry count, hit/miss counters, file size and oldest entry age."""
+        with self._connect() as conn:
+            entries, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(created) FROM responses"
+            ).fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "entries": entries,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "size_bytes": self.path.stat().st_size if self.path.exists() else 0,
+            "oldest_age_s": time.time() - oldest if oldest is not None else None,
+        }
+
+    def clear(self) -> int:
+        """Delete all entries and reset counters. Returns the number of entries removed."""
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM responses").rowcount
+            conn.execute("DELETE FROM counters")
+        return removed
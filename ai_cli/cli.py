@@ -1,60 +1,262 @@
 """CLI entry point for ai command."""
 
 import json
+import shutil
 import subprocess
 import sys
-from datetime import datetime, timezone
+from contextlib import ExitStack
+from datetime import datetime
+from typing import TextIO
 
 import click
-from ollama import list as ollama_list
 
 from ai_cli import __version__
-from ai_cli.config import CONFIG_PATH, save_config
-from ai_cli.llm import ask_llm
-from ai_cli.setup import ensure_ready, ensure_server
+from ai_cli.batch import DEFAULT_BATCH_JOBS, run_batch
+from ai_cli.bench import DEFAULT_BENCH_REPEAT, DEFAULT_BENCH_WARMUP, run_bench
+from ai_cli.cache import ResponseCache
+from ai_cli.config import get_generation_options, get_models, load_config, save_config
+from ai_cli.daemon import (
+    DEFAULT_DAEMON_IDLE_TIMEOUT,
+    SOCKET_PATH,
+    DaemonUnavailable,
+    ask_daemon,
+    daemon_running,
+    serve,
+)
+from ai_cli.history import (
+    DEFAULT_HISTORY_MAX_AGE_DAYS,
+    DEFAULT_HISTORY_MAX_ENTRIES,
+    HistoryStore,
+)
+from ai_cli.llm import (
+    DEFAULT_MODEL,
+    LLMResponse,
+    _candidate_models,
+    _detect_env,
+    _resolve_model,
+    ask_llm,
+    embed_texts,
+)
+from ai_cli.semantic import SemanticCache, env_fingerprint
+from ai_cli.setup import (
+    _fmt_size,
+    ensure_ready,
+    ensure_server,
+    installed_models,
+    warm_model,
+)
+from ai_cli.stats import ModelStats
+
+_SUBCOMMAND_ARGS = "ai_cli.subcommand_args"
+
+
+@click.group()
+def commands() -> None:
+    """Subcommands reachable as `ai <command> ...`."""
+
+
+class _AiCommand(click.Command):
+    """Task command that also routes `ai <command> ...` to the `commands` group.
+
+    Only a leading command name is routed, so `ai -- cache stats` is still a task.
+    """
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if args and args[0] in commands.commands:
+            ctx.meta[_SUBCOMMAND_ARGS] = args
+            return []
+        return super().parse_args(ctx, args)
+
+    def invoke(self, ctx: click.Context) -> object:
+        args = ctx.meta.pop(_SUBCOMMAND_ARGS, None)
+        if args is None:
+            return super().invoke(ctx)
+        with commands.make_context(ctx.info_name, list(args), parent=ctx) as sub_ctx:
+            return commands.invoke(sub_ctx)
+
+    def format_epilog(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        rows = [(name, cmd.get_short_help_str()) for name, cmd in sorted(commands.commands.items())]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+        super().format_epilog(ctx, formatter)
+
+
+def _history(config: dict | None = None) -> HistoryStore:
+    """Open the history store with the retention limits from config."""
+    if config is None:
+        config = load_config()
+    return HistoryStore(
+        max_entries=config.get("history_max_entries", DEFAULT_HISTORY_MAX_ENTRIES),
+        max_age_days=config.get("history_max_age_days", DEFAULT_HISTORY_MAX_AGE_DAYS),
+    )
+
+
+def _log_history(
+    task: str,
+    model: str,
+    command: str,
+    action: str,
+    cached: bool = False,
+    config: dict | None = None,
+) -> None:
+    """Record an entry in the history store."""
+    _history(config).add(task, model, command, action, cached)
+
+
+class _LiveLine:
+    """Redraw one stderr line with the command streamed so far."""
+
+    def __init__(self) -> None:
+        self.shown = False
+
+    def __call__(self, partial: LLMResponse) -> None:
+        if not partial.command:
+            return
+        width = max(shutil.get_terminal_size().columns - 3, 10)
+        text = partial.command.replace("\n", " ")[-width:]
+        click.secho(f"\r\033[K  {text}", fg="yellow", err=True, nl=False)
+        self.shown = True
+
+    def clear(self) -> None:
+        """Erase the live line so the final command can be printed cleanly."""
+        if self.shown:
+            click.echo("\r\033[K", err=True, nl=False)
+            self.shown = False
+
+
+def _format_timing(result: LLMResponse) -> str:
+    """Summarize where the time went for one answer."""
+    if result.cached:
+        return "timing: answered from cache"
+    timing = result.timing or {}
+    parts = [f"total {timing.get('total', 0):.2f}s"]
+    if "ttft" in timing:
+        parts.append(f"first token {timing['ttft']:.2f}s")
+    if "load" in timing:
+        parts.append(f"model load {timing['load']:.2f}s")
+    if "prompt_tokens" in timing:
+        prompt = f"prompt {int(timing['prompt_tokens'])} tokens"
+        if "prompt_eval" in timing:
+            prompt += f" in {timing['prompt_eval']:.2f}s"
+        parts.append(prompt)
+    if "tokens" in timing:
+        parts.append(f"{int(timing['tokens'])} tokens")
+    if timing.get("hedged"):
+        parts.append(f"hedged across {int(timing['hedged']) + 1} models")
+    if timing.get("stopped_early"):
+        parts.append(f"stopped early, skipped {int(timing['skipped_chars'])} chars")
+    return "timing: " + ", ".join(parts)
+
+
+def _warm(model: str | None, config: dict) -> None:
+    """Load a model into server memory and report how long loading took."""
+    ensure_server()
+    model = model or _resolve_model(None, config)
+    ensure_ready(model)
+    try:
+        load = warm_model(model, config.get("keep_alive"), get_generation_options(config, model))
+    except Exception as e:
+        click.secho(f"Error: {e}", fg="red", err=True)
+        sys.exit(1)
+    detail = f" (load {load:.2f}s)" if load is not None else ""
+    click.secho(f"warmed {model}{detail}", fg="green", err=True)
+
+
+def _ask(
+    task: str,
+    model: str | None,
+    verbose: bool,
+    use_cache: bool,
+    on_partial: _LiveLine | None,
+    config: dict,
+) -> LLMResponse | None:
+    """Answer through a running `ai daemon`, or in this process if there is none."""
+    try:
+        return ask_daemon(
+            task, model=model, verbose=verbose, use_cache=use_cache, on_partial=on_partial
+        )
+    except DaemonUnavailable:
+        pass
+
+    # An explicit model is checked (and pulled if missing) up front, optionally
+    # loading it in the background. Otherwise the server is checked once the
+    # response cache has missed, or before resolving the `models` list if the
+    # server is down (ask_llm runs before_request early for that).
+    if model is not None:
+        ensure_ready(model, warm=config.get("warm_on_start", False))
+
+    return ask_llm(
+        task,
+        model=model,
+        verbose=verbose,
+        use_cache=use_cache,
+        on_partial=on_partial,
+        before_request=ensure_server if model is None else None,
+        config=config,
+    )
 
-HISTORY_PATH = CONFIG_PATH.parent / "history.jsonl"
 
+def _run_batch(
+    source: TextIO,
+    model: str | None,
+    verbose: bool,
+    use_cache: bool,
+    jobs: int,
+    ordered: bool,
+    config: dict,
+) -> None:
+    """Answer every task in source, printing JSONL to stdout and a summary to stderr."""
+    if model is not None:
+        ensure_ready(model)
+    else:
+        ensure_server()
+
+    def ask(task: str) -> LLMResponse | None:
+        return ask_llm(
+            task,
+            model=model,
+            verbose=verbose,
+            use_cache=use_cache,
+            config=config,
+            on_status=lambda _: None,
+        )
 
-def _log_history(task: str, model: str, command: str, action: str) -> None:
-    """Append an entry to the history log."""
-    entry = {
-        "ts": datetime.now(timezone.utc).isoformat(),
-        "task": task,
-        "model": model,
-        "command": command,
-        "action": action,
-    }
-    HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(HISTORY_PATH, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+    summary = run_batch(source, ask, sys.stdout, jobs=jobs, ordered=ordered)
+    click.secho(
+        f"{summary['tasks']} tasks in {summary['seconds']:.1f}s"
+        f" ({summary['tasks_per_s']:.1f}/s), {summary['errors']} errors",
+        fg="bright_black",
+        err=True,
+    )
 
 
 def _pick_model() -> str:
     """List installed ollama models and let user pick one."""
     try:
-        response = ollama_list()
+        installed = installed_models()
     except ConnectionError:
         click.secho("Cannot reach ollama. Start it with: ollama serve", fg="red", err=True)
         sys.exit(1)
-    if not response.models:
+    if not installed:
         click.secho("No models installed.", fg="red", err=True)
         sys.exit(1)
 
+    names = list(installed)
     click.secho("Installed models:", fg="cyan", err=True)
-    for i, m in enumerate(response.models, 1):
-        size_gb = m.size / (1024**3) if m.size else 0
-        click.secho(f"  {i}. {m.model} ({size_gb:.1f} GB)", err=True)
+    for i, name in enumerate(names, 1):
+        size_gb = installed[name] / (1024**3)
+        click.secho(f"  {i}. {name} ({size_gb:.1f} GB)", err=True)
 
     choice = click.prompt("Choose model", type=int, err=True)
-    if choice < 1 or choice > len(response.models):
+    if choice < 1 or choice > len(names):
         click.secho("Invalid choice.", fg="red", err=True)
         sys.exit(1)
 
-    return response.models[choice - 1].model
+    return names[choice - 1]
 
 
-@click.command(options_metavar="[OPTIONS] [--]")
+@click.command(cls=_AiCommand, options_metavar="[OPTIONS] [--]")
 @click.version_option(__version__, "--version")
 @click.pass_context
 @click.argument("task", nargs=-1)
@@ -79,6 +281,45 @@ def _pick_model() -> str:
     help="Interactively pick a model and save it as default.",
 )
 @click.option("-v", "--verbose", is_flag=True, default=False, help="Show command explanation.")
+@click.option(
+    "-t",
+    "--timing",
+    "show_timing",
+    is_flag=True,
+    default=False,
+    help="Show where the response time went.",
+)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    is_flag=True,
+    default=False,
+    help="Always ask the model, bypassing the response cache.",
+)
+@click.option(
+    "--warm",
+    "warm",
+    is_flag=True,
+    default=False,
+    help="Load the model (-m, or the resolved one) into memory; exits unless a task is given.",
+)
+@click.option(
+    "--batch",
+    "batch",
+    type=click.File("r"),
+    default=None,
+    metavar="FILE|-",
+    help="Answer one task per line without prompting; prints JSON lines.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=DEFAULT_BATCH_JOBS,
+    show_default=True,
+    help="Tasks answered at once with --batch.",
+)
+@click.option("--ordered", is_flag=True, default=False, help="With --batch, keep input order.")
 def main(
     ctx: click.Context,
     task: tuple[str, ...],
@@ -86,6 +327,12 @@ def main(
     model_save: str | None,
     interactive: bool,
     verbose: bool,
+    show_timing: bool,
+    no_cache: bool,
+    warm: bool,
+    batch: TextIO | None,
+    jobs: int,
+    ordered: bool,
 ) -> None:
     """Generate a bash command from a natural language description."""
     # Resolve model: -m/-M flag > -i interactive > None (let ask_llm resolve)
@@ -101,6 +348,20 @@ def main(
     else:
         model = None  # Let ask_llm handle resolution (env > config models > config model > default)
 
+    # One config snapshot for the whole invocation
+    config = load_config()
+
+    if warm:
+        _warm(model, config)
+        if not task and not save_after_ready and batch is None:
+            return
+
+    if batch is not None:
+        _run_batch(batch, model, verbose, not no_cache, jobs, ordered, config)
+        if save_after_ready:
+            save_config({"model": model})
+        return
+
     if not task:
         if save_after_ready:
             ensure_ready(model)
@@ -111,45 +372,353 @@ def main(
         return
     task_str = " ".join(task)
 
-    # Always ensure server is running; check specific model if explicit
-    ensure_server()
-    if model is not None:
-        ensure_ready(model)
-
-    if save_after_ready:
-        save_config({"model": model})
+    # Offer the command executed last time for this exact task, without asking a model;
+    # if the user asks the model instead, the response cache would likely hand back
+    # the same command, so it is skipped
+    use_cache = not no_cache
+    if config.get("recall", False) and model is None and not verbose and use_cache:
+        recalled = _history(config).recall(task_str)
+        if recalled is not None:
+            if show_timing:
+                click.secho("timing: answered from history", fg="bright_black", err=True)
+            click.secho(
+                f"from history, last run {recalled['ts'][:10]}", fg="bright_black", err=True
+            )
+            if _offer(task_str, recalled["model"], recalled["command"], True, config, recall=True):
+                return
+            use_cache = False
 
+    # Stream the command onto the terminal as it is generated; plain output otherwise
+    live = _LiveLine() if sys.stderr.isatty() else None
     try:
-        result = ask_llm(task_str, model=model, verbose=verbose)
+        try:
+            result = _ask(task_str, model, verbose, use_cache, live, config)
+        finally:
+            if live is not None:
+                live.clear()
+        if save_after_ready:
+            save_config({"model": model})
         if result is None:
             click.secho("Error: no command generated", fg="red", err=True)
             sys.exit(1)
         command = result.command
+        cached = result.cached
         if verbose and result.explanation:
             click.secho(f"\n  {result.explanation}\n", fg="cyan", err=True)
+        if show_timing:
+            click.secho(_format_timing(result), fg="bright_black", err=True)
     except Exception as e:
         click.secho(f"Error: {e}", fg="red", err=True)
         sys.exit(1)
 
-    # For history logging, use the model that was actually used
-    log_model = model or "auto"
+    # For history logging, use the model that actually answered
+    _offer(task_str, result.model or model or "auto", command, cached, config)
 
+
+def _offer(
+    task: str, model: str, command: str, cached: bool, config: dict, recall: bool = False
+) -> bool:
+    """Show the command and execute, copy or drop it as the user chooses.
+
+    With recall, the user can also ask the model instead; returns False if they do.
+    """
     click.secho(f"\n  {command}\n", fg="yellow", bold=True)
 
+    prompt, choices = "[E]xecute / [C]opy / [A]bort", ["e", "c", "a"]
+    if recall:
+        prompt, choices = prompt + " / ask [M]odel", [*choices, "m"]
     choice = click.prompt(
-        "[E]xecute / [C]opy / [A]bort",
-        type=click.Choice(["e", "c", "a"], case_sensitive=False),
+        prompt,
+        type=click.Choice(choices, case_sensitive=False),
         default="e",
         show_choices=False,
     )
     if choice == "e":
-        _log_history(task_str, log_model, command, "execute")
+        _log_history(task, model, command, "execute", cached, config)
         result = subprocess.run(command, shell=True)
         sys.exit(result.returncode)
     elif choice == "c":
-        _log_history(task_str, log_model, command, "copy")
+        _log_history(task, model, command, "copy", cached, config)
         subprocess.run(["pbcopy"], input=command.encode(), check=True)
         click.secho("Copied to clipboard.", fg="green")
+    elif choice == "m":
+        return False
     else:
-        _log_history(task_str, log_model, command, "abort")
+        _log_history(task, model, command, "abort", cached, config)
         click.echo("Aborted.")
+    return True
+
+
+@commands.group("cache")
+def cache_group() -> None:
+    """Inspect or clear the response cache."""
+
+
+@cache_group.command("stats")
+def cache_stats() -> None:
+    """Show response cache size and hit rate."""
+    stats = ResponseCache().stats()
+    click.echo(f"entries: {stats['entries']}")
+    click.echo(f"hits:    {stats['hits']}")
+    click.echo(f"misses:  {stats['misses']}")
+    click.echo(f"size:    {_fmt_size(stats['size_bytes'])}")
+    if stats["oldest_age_s"] is not None:
+        click.echo(f"oldest:  {stats['oldest_age_s'] / 86400:.1f} days")
+
+    semantic = SemanticCache().stats()
+    click.echo(f"semantic entries: {semantic['entries']}")
+    click.echo(f"semantic hits:    {semantic['hits']}")
+    click.echo(f"semantic misses:  {semantic['misses']}")
+    click.echo(f"semantic hit rate: {semantic['hit_rate']:.0%}")
+
+
+@cache_group.command("clear")
+def cache_clear() -> None:
+    """Remove all cached responses."""
+    removed = ResponseCache().clear() + SemanticCache().clear()
+    click.secho(f"Removed {removed} cached responses.", fg="green", err=True)
+
+
+@cache_group.command("rebuild")
+def cache_rebuild() -> None:
+    """Rebuild the semantic cache from executed commands in history."""
+    ensure_server()
+    config = load_config()
+    fingerprint = env_fingerprint(_detect_env(config), verbose=False)
+    try:
+        indexed = SemanticCache().rebuild(
+            _history(config).find(action="execute", newest_first=False),
+            lambda texts: embed_texts(texts, config),
+            fingerprint,
+            default_model=_resolve_model(None, config),
+        )
+    except Exception as e:
+        click.secho(f"Error: {e}", fg="red", err=True)
+        sys.exit(1)
+    click.secho(f"Indexed {indexed} executed commands.", fg="green", err=True)
+
+
+@commands.group("history")
+def history_group() -> None:
+    """Search, export or compact the history of answered tasks."""
+
+
+_DATE = click.DateTime(["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"])
+
+
+@history_group.command("export")
+@click.argument("output", type=click.File("w"), default="-")
+@click.option("--model", help="Only entries answered by this model.")
+@click.option("--action", type=click.Choice(["execute", "copy", "abort"]), help="Only this action.")
+@click.option("--since", type=_DATE, help="Only entries from this date or time on.")
+@click.option("--until", type=_DATE, help="Only entries before this date or time.")
+def history_export(
+    output: TextIO,
+    model: str | None,
+    action: str | None,
+    since: datetime | None,
+    until: datetime | None,
+) -> None:
+    """Write history as JSON lines (the history.jsonl format) to OUTPUT or stdout."""
+    exported = _history().export(
+        output,
+        model=model,
+        action=action,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+    )
+    click.secho(f"Exported {exported} entries.", fg="green", err=True)
+
+
+@history_group.command("search")
+@click.argument("terms", nargs=-1, required=True)
+@click.option("--model", help="Only entries answered by this model.")
+@click.option("--action", type=click.Choice(["execute", "copy", "abort"]), help="Only this action.")
+@click.option("--since", type=_DATE, help="Only entries from this date or time on.")
+@click.option("--until", type=_DATE, help="Only entries before this date or time.")
+@click.option("-n", "--limit", type=click.IntRange(min=1), default=20, show_default=True)
+def history_search(
+    terms: tuple[str, ...],
+    model: str | None,
+    action: str | None,
+    since: datetime | None,
+    until: datetime | None,
+    limit: int,
+) -> None:
+    """Find past commands whose task or command contains all TERMS."""
+    results = _history().search(
+        list(terms),
+        model=model,
+        action=action,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        limit=limit,
+    )
+    if not results:
+        click.secho("No matching commands.", fg="bright_black", err=True)
+        return
+    for result in results:
+        click.secho(result["command"], fg="yellow")
+        runs = f"run {result['runs']}x" if result["runs"] else "never run"
+        click.secho(
+            f"  {result['task']} · {result['model']} · {runs} · last {result['last'][:10]}",
+            fg="bright_black",
+        )
+
+
+@history_group.command("compact")
+def history_compact() -> None:
+    """Apply the retention limits now and shrink the database file."""
+    store = _history()
+    removed = store.compact()
+    stats = store.stats()
+    click.secho(
+        f"Removed {removed} entries, {stats['entries']} left ({_fmt_size(stats['size_bytes'])}).",
+        fg="green",
+        err=True,
+    )
+
+
+def _fmt_seconds(summary: dict[str, float], key: str) -> str:
+    return f"{summary[key]:.2f}s" if key in summary else "-"
+
+
+@commands.command("models")
+@click.option("--stats", "show_stats", is_flag=True, help="Show recorded latency per model.")
+def models_command(show_stats: bool) -> None:
+    """List installed models, or the latency statistics used to rank them."""
+    config = load_config()
+    if show_stats:
+        stats = ModelStats()
+        names = stats.rank(stats.models())
+        if not names:
+            click.echo("No requests recorded yet.")
+            return
+        click.echo(
+            f"{'model':<32} {'requests':>8} {'failed':>6} {'p50':>7} {'p95':>7}"
+            f" {'ttft p50':>8} {'ttft p95':>8}"
+        )
+        for name in names:
+            summary = stats.summary(name)
+            click.echo(
+                f"{name:<32} {summary['requests']:>8} {summary['failures']:>6}"
+                f" {_fmt_seconds(summary, 'p50'):>7} {_fmt_seconds(summary, 'p95'):>7}"
+                f" {_fmt_seconds(summary, 'ttft_p50'):>8} {_fmt_seconds(summary, 'ttft_p95'):>8}"
+            )
+        click.echo(f"\nmodel_strategy: {config.get('model_strategy', 'ordered')}")
+        return
+
+    try:
+        installed = installed_models()
+    except ConnectionError:
+        click.secho("Cannot reach ollama. Start it with: ollama serve", fg="red", err=True)
+        sys.exit(1)
+    configured = get_models(config)
+    for name, size in installed.items():
+        marker = "*" if name in configured else " "
+        click.echo(f"{marker} {name:<32} {_fmt_size(size):>10}")
+
+
+@commands.command("daemon")
+@click.option(
+    "--idle-timeout",
+    type=float,
+    default=None,
+    help=f"Exit after this many idle seconds (default: {DEFAULT_DAEMON_IDLE_TIMEOUT}).",
+)
+def daemon_command(idle_timeout: float | None) -> None:
+    """Keep a warm process answering requests, so each `ai` call starts faster."""
+    if daemon_running():
+        click.secho("ai daemon is already running.", fg="yellow", err=True)
+        return
+    ensure_server()
+    config = load_config()
+    if idle_timeout is None:
+        idle_timeout = config.get("daemon_idle_timeout", DEFAULT_DAEMON_IDLE_TIMEOUT)
+    click.secho(
+        f"ai daemon listening on {SOCKET_PATH} (exits after {idle_timeout:g}s idle)",
+        fg="green",
+        err=True,
+    )
+    serve(idle_timeout=idle_timeout)
+
+
+_BENCH_COLUMNS = [
+    ("runs", "runs", "{:d}"),
+    ("errors", "errors", "{:d}"),
+    ("wall_p50", "p50", "{:.2f}s"),
+    ("wall_p95", "p95", "{:.2f}s"),
+    ("wall_p99", "p99", "{:.2f}s"),
+    ("ttft_p50", "ttft", "{:.2f}s"),
+    ("tokens_per_s_p50", "tok/s", "{:.1f}"),
+    ("load_p50", "load", "{:.2f}s"),
+    ("eval_p50", "eval", "{:.2f}s"),
+]
+
+
+@commands.command("bench")
+@click.option("-m", "models", multiple=True, help="Model to benchmark (repeatable).")
+@click.option(
+    "-n",
+    "--repeat",
+    type=int,
+    default=DEFAULT_BENCH_REPEAT,
+    show_default=True,
+    help="Timed runs per task.",
+)
+@click.option(
+    "--warmup",
+    type=int,
+    default=DEFAULT_BENCH_WARMUP,
+    show_default=True,
+    help="Untimed runs per model before measuring.",
+)
+@click.option("--host", default=None, help="Benchmark this server instead of the configured one.")
+@click.option(
+    "--fake", is_flag=True, help="Benchmark against the bundled fake ollama server (offline)."
+)
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+def bench_command(
+    models: tuple[str, ...],
+    repeat: int,
+    warmup: int,
+    host: str | None,
+    fake: bool,
+    as_json: bool,
+) -> None:
+    """Measure latency and throughput of models over a built-in task corpus."""
+    config = load_config()
+    stand_in = host is not None or fake
+    if not stand_in:
+        ensure_server()
+    if models:
+        targets = list(models)
+    elif not stand_in:
+        targets = _candidate_models(config) or [_resolve_model(None, config)]
+    else:
+        targets = get_models(config) or [config.get("model", DEFAULT_MODEL)]
+
+    def progress(model: str, done: int, total: int) -> None:
+        click.echo(f"\r\033[K{model}: {done}/{total}", err=True, nl=done == total)
+
+    with ExitStack() as stack:
+        if fake:
+            from ai_cli.fake_server import FakeOllama  # http.server is only needed here
+
+            server = FakeOllama(models=dict.fromkeys(targets, 0), latency=0.05, token_rate=200)
+            host = stack.enter_context(server).url
+        if host is not None:
+            # A stand-in server's numbers must not feed model_strategy = "fastest"
+            config = {**config, "host": host, "model_stats": False}
+        report = run_bench(targets, config, repeat=repeat, warmup=warmup, on_progress=progress)
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    width = max(len(m) for m in report) + 2
+    click.echo("model".ljust(width) + " ".join(f"{title:>7}" for _, title, _ in _BENCH_COLUMNS))
+    for model, row in report.items():
+        cells = [
+            fmt.format(row[key]) if row[key] is not None else "-" for key, _, fmt in _BENCH_COLUMNS
+        ]
+        click.echo(model.ljust(width) + " ".join(f"{cell:>7}" for cell in cells))
@@ -0,0 +1,100 @@
+"""Process-wide ollama client shared by readiness checks and requests."""
+
+import importlib.util
+import os
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from ai_cli.config import get_timeout, load_config
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from ollama import AsyncClient, Client
+
+DEFAULT_KEEPALIVE_EXPIRY = 30
+
+_Settings = tuple[str | None, float, float, bool]
+
+# One client per distinct settings tuple; in practice a single client per process
+_clients: dict[_Settings, "Client"] = {}
+
+# Async clients are bound to the event loop they were first used on
+_async_clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, dict[_Settings, AsyncClient]]" = (
+    WeakKeyDictionary()
+)
+
+
+def ollama_host(config: dict | None = None) -> str | None:
+    """Return the configured server URL: `host` in config, then OLLAMA_HOST, else the default."""
+    if config is None:
+        config = load_config()
+    return config.get("host") or os.environ.get("OLLAMA_HOST")
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """True if error means the server could not be reached at all.
+
+    ollama raises ConnectionError for plain requests, but a streamed request
+    surfaces httpx's ConnectError from its first chunk instead.
+    """
+    import httpx
+
+    return isinstance(error, (ConnectionError, httpx.ConnectError))
+
+
+def get_client(config: dict | None = None) -> "Client":
+    """Return the shared ollama client for the configured settings, creating it on first use.
+
+    Readiness checks, model pulls and chat requests all go through this client, so
+    the chat request reuses the keep-alive connection opened by the readiness check.
+    HTTP/2 is used when `http2 = true` and the optional h2 package is installed.
+    """
+    settings = _settings(config)
+    client = _clients.get(settings)
+    if client is None:
+        from ollama import Client
+
+        client = Client(**_client_kwargs(settings))
+        _clients[settings] = client
+    return client
+
+
+def get_async_client(config: dict | None = None) -> "AsyncClient":
+    """Return the shared async ollama client for the running event loop and settings."""
+    import asyncio
+
+    from ollama import AsyncClient
+
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    settings = _settings(config)
+    client = clients.get(settings)
+    if client is None:
+        client = AsyncClient(**_client_kwargs(settings))
+        clients[settings] = client
+    return client
+
+
+def _settings(config: dict | None) -> _Settings:
+    if config is None:
+        config = load_config()
+    return (
+        ollama_host(config),
+        get_timeout(config),
+        config.get("http_keepalive", DEFAULT_KEEPALIVE_EXPIRY),
+        bool(config.get("http2", False)) and importlib.util.find_spec("h2") is not None,
+    )
+
+
+def _client_kwargs(settings: _Settings) -> dict:
+    import httpx
+
+    host, timeout, keepalive, http2 = settings
+    return {
+        "host": host,
+        "timeout": timeout,
+        "limits": httpx.Limits(
+            max_connections=100, max_keepalive_connections=20, keepalive_expiry=keepalive
+        ),
+        "http2": http2,
+    }
@@ -1,5 +1,6 @@
 """Config file management for ai-cli."""
 
+import copy
 import tomllib
 from pathlib import Path
 
@@ -15,7 +16,8 @@ DEFAULT_SYSTEM_PROMPT = (
     "{env_context}"
     "You MUST answer with a single-line shell command. "
     "The command must be a oneliner — no line breaks, no multi-line scripts. "
-    "You may add a brief note before or after the command, but the command itself must be one line. "
+    "Give the command first. You may add a brief note after it, "
+    "but the command itself must be one line. "
     "No markdown, no backticks."
 )
 
@@ -31,16 +33,38 @@ DEFAULT_VERBOSE_SYSTEM_PROMPT = (
     "No markdown, no backticks."
 )
 
+# Generation options sent with every chat request; low temperature keeps the format
+# reliable. Output length is left to early stop and the context size to the server:
+# num_predict would count a reasoning model's thinking tokens, and a num_ctx other
+# than the one a model was loaded with makes ollama reload it.
+DEFAULT_GENERATION_OPTIONS = {"temperature": 0.2}
+
+
+# Parsed configs keyed by path, validated against the file's (mtime, size)
+_parsed: dict[Path, tuple[tuple[int, int], dict]] = {}
+
 
 def load_config(path: Path = CONFIG_PATH) -> dict:
-    """Load config from TOML file. Returns empty dict if file doesn't exist or is invalid."""
-    if not path.exists():
-        return {}
+    """Load config from TOML file. Returns empty dict if file doesn't exist or is invalid.
+
+    The parsed result is reused until the file's mtime or size changes. Callers get
+    their own copy, so mutating it never affects later loads.
+    """
     try:
-        with open(path, "rb") as f:
-            return tomllib.load(f)
-    except tomllib.TOMLDecodeError:
+        st = path.stat()
+    except FileNotFoundError:
+        _parsed.pop(path, None)
         return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _parsed.get(path)
+    if cached is None or cached[0] != stamp:
+        try:
+            with open(path, "rb") as f:
+                config = tomllib.load(f)
+        except tomllib.TOMLDecodeError:
+            config = {}
+        cached = _parsed[path] = (stamp, config)
+    return copy.deepcopy(cached[1])
 
 
 def save_config(updates: dict, path: Path = CONFIG_PATH) -> None:
@@ -50,6 +74,7 @@ def save_config(updates: dict, path: Path = CONFIG_PATH) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with open(path, "wb") as f:
         tomli_w.dump(config, f)
+    _parsed.pop(path, None)
 
 
 def get_timeout(config: dict | None = None) -> int:
@@ -66,6 +91,17 @@ def get_models(config: dict | None = None) -> list[str]:
     return config.get("models", [])
 
 
+def get_generation_options(config: dict | None = None, model: str | None = None) -> dict:
+    """Get ollama generation options: defaults, then `options`, then `model_options.<model>`."""
+    if config is None:
+        config = load_config()
+    options = dict(DEFAULT_GENERATION_OPTIONS)
+    options.update(config.get("options", {}))
+    if model is not None:
+        options.update(config.get("model_options", {}).get(model, {}))
+    return options
+
+
 def get_system_prompt(config: dict | None = None, verbose: bool = False) -> str | None:
     """Get custom system prompt template from config, or None for default."""
     if config is None:
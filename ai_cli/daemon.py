@@ -0,0 +1,215 @@
+"""Resident `ai daemon`: answer requests over a Unix socket with everything kept warm.
+
+Each connection carries one request as a JSON line. The daemon replies with JSON
+lines: `status` notes, `partial` commands while streaming, then a final `result`,
+`error` or `fallback` (the client should handle the request itself, e.g. because
+ollama is not running and only the client can start it).
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from ai_cli.client import is_connection_error
+from ai_cli.config import CONFIG_PATH, load_config
+from ai_cli.llm import LLMResponse, _show_status, ask_llm
+from ai_cli.setup import DEFAULT_INVENTORY_TTL, installed_models, is_installed
+
+SOCKET_PATH = CONFIG_PATH.parent / "daemon.sock"
+
+DEFAULT_DAEMON_IDLE_TIMEOUT = 900
+
+# Environment variables the prompt depends on, sent along with each request
+_FORWARDED_ENV = ("SHELL", "PATH")
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening, or it asked the client to handle the request itself."""
+
+
+class _ClientGone(Exception):
+    """The client closed its connection mid-request."""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serve one request per connection."""
+
+    server: "_DaemonServer"
+
+    def _send(self, **message: object) -> None:
+        try:
+            self.wfile.write(json.dumps(message).encode() + b"\n")
+            self.wfile.flush()
+        except OSError as e:
+            raise _ClientGone from e
+
+    def handle(self) -> None:
+        try:
+            try:
+                request = json.loads(self.rfile.readline())
+            except ValueError as e:
+                self._send(error=f"bad request: {e}")
+                return
+            self._answer(request)
+        except (OSError, _ClientGone):
+            pass  # client went away; a stream in progress was closed by ask_llm
+
+    def _answer(self, request: dict) -> None:
+        config = load_config()
+        model = request.get("model")
+        if model:
+            # Pulling asks for confirmation, which only the client's terminal can do
+            try:
+                installed = installed_models(config.get("inventory_ttl", DEFAULT_INVENTORY_TTL))
+            except ConnectionError as e:
+                self._send(fallback=f"ollama unreachable: {e}")
+                return
+            if not is_installed(model, installed):
+                self._send(fallback=f"model {model} is not installed")
+                return
+        try:
+            result = ask_llm(
+                request["task"],
+                model=model or request.get("env_model"),
+                verbose=request.get("verbose", False),
+                use_cache=request.get("use_cache", True),
+                on_partial=lambda partial: self._send(partial=list(partial[:2])),
+                config=config,
+                on_status=lambda message: self._send(status=message),
+                cwd=request.get("cwd"),
+                environ=request.get("environ"),
+            )
+        except _ClientGone:
+            raise
+        except Exception as e:
+            if is_connection_error(e):
+                # The client starts ollama when it handles the request itself
+                self._send(fallback=f"ollama unreachable: {e}")
+            else:
+                self._send(error=str(e))
+            return
+        self._send(result=result._asdict() if result is not None else None)
+
+
+class _DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Threaded server that tracks activity so it can exit when idle."""
+
+    daemon_threads = True
+    timeout = 1.0  # how often handle_request returns to check for idleness
+
+    def __init__(self, path: Path, idle_timeout: float) -> None:
+        self.idle_timeout = idle_timeout
+        self.active = 0
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+        super().__init__(str(path), _Handler)
+
+    def process_request(self, request: socket.socket, client_address: object) -> None:
+        # Counted before the handler thread starts, so idle() cannot miss it
+        with self.lock:
+            self.active += 1
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request: socket.socket) -> None:
+        super().shutdown_request(request)
+        with self.lock:
+            self.active -= 1
+            self.last_active = time.monotonic()
+
+    def idle(self) -> bool:
+        """True once no request has been in flight for idle_timeout seconds."""
+        with self.lock:
+            return self.active == 0 and time.monotonic() - self.last_active >= self.idle_timeout
+
+
+def daemon_running(path: Path | None = None) -> bool:
+    """Check whether a daemon is accepting connections on the socket."""
+    path = path or SOCKET_PATH
+    if not path.exists():
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def serve(path: Path | None = None, idle_timeout: float = DEFAULT_DAEMON_IDLE_TIMEOUT) -> None:
+    """Serve requests until idle_timeout seconds pass without one.
+
+    A stale socket left by a daemon that crashed is replaced.
+    """
+    path = path or SOCKET_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    # Owner-only from the start: anyone who can connect can spend this user's models
+    umask = os.umask(0o077)
+    try:
+        server = _DaemonServer(path, idle_timeout)
+    finally:
+        os.umask(umask)
+    try:
+        with server:
+            while not server.idle():
+                server.handle_request()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def ask_daemon(
+    task: str,
+    model: str | None = None,
+    verbose: bool = False,
+    use_cache: bool = True,
+    on_partial: Callable[[LLMResponse], None] | None = None,
+    path: Path | None = None,
+) -> LLMResponse | None:
+    """Forward a task to the running daemon, mirroring ask_llm.
+
+    Raises DaemonUnavailable when there is no daemon, or when it hands the request
+    back (for example, a model that has to be pulled first).
+    """
+    path = path or SOCKET_PATH
+    if not path.exists():
+        raise DaemonUnavailable("no daemon running")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(str(e)) from e
+
+    request = {
+        "task": task,
+        "model": model,
+        "env_model": os.environ.get("AI_MODEL"),
+        "verbose": verbose,
+        "use_cache": use_cache,
+        "cwd": os.getcwd(),
+        # The prompt describes the caller's shell and tools, not the daemon's
+        "environ": {name: os.environ[name] for name in _FORWARDED_ENV if name in os.environ},
+    }
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if "status" in message:
+                _show_status(message["status"])
+            elif "partial" in message:
+                if on_partial is not None:
+                    on_partial(LLMResponse(*message["partial"]))
+            elif "result" in message:
+                result = message["result"]
+                return LLMResponse(**result) if result is not None else None
+            elif "fallback" in message:
+                raise DaemonUnavailable(message["fallback"])
+            elif "error" in message:
+                raise RuntimeError(message["error"])
+    raise DaemonUnavailable("daemon closed the connection")
@@ -0,0 +1,324 @@
+"""Stand-in ollama HTTP server for offline tests and benchmarks.
+
+Implements the endpoints ai-cli uses (/api/tags, /api/chat, /api/generate,
+/api/pull, /api/ps, /api/embed) over HTTP/1.1 keep-alive with chunked streaming,
+with configurable latency, token rate, model load time and error injection.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FAKE_MODELS = {"glm-5:cloud": 400, "qwen2.5:7b": 4_700_000_000}
+DEFAULT_FAKE_RESPONSE = "ls -la"
+_EMBED_DIM = 64
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _tokens(text: str) -> list[str]:
+    """Split text into word-sized pieces that concatenate back to it."""
+    return re.findall(r"\s*\S+|\s+", text) or [""]
+
+
+def _embedding(text: str) -> list[float]:
+    """Deterministic bag-of-trigrams vector, so similar texts get similar vectors."""
+    vector = [0.0] * _EMBED_DIM
+    padded = f"  {text.lower()} "
+    for i in range(len(padded) - 2):
+        digest = hashlib.blake2b(padded[i : i + 3].encode(), digest_size=2).digest()
+        vector[int.from_bytes(digest) % _EMBED_DIM] += 1.0
+    return vector
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 resets connections when a batch or hedged run
+    # opens many at once, which a real ollama server would accept
+    request_queue_size = 128
+
+
+class FakeOllama:
+    """A local server that answers like ollama, for use as a context manager.
+
+    latency is the delay before the first token; token_rate is tokens per second
+    after it (None streams instantly); load_time is added the first time a model
+    is used; fail_rate is the fraction of chat and generate requests answered with
+    error_status. responses maps a model to its canned answer, which otherwise
+    is `response`. Counters: `requests` lists (method, path) and `connections`
+    counts accepted TCP connections.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, int] | None = None,
+        response: str = DEFAULT_FAKE_RESPONSE,
+        responses: dict[str, str] | None = None,
+        latency: float = 0.0,
+        token_rate: float | None = None,
+        load_time: float = 0.0,
+        fail_rate: float = 0.0,
+        error_status: int = 500,
+        seed: int | None = None,
+    ) -> None:
+        self.models = dict(DEFAULT_FAKE_MODELS if models is None else models)
+        self.response = response
+        self.responses = responses or {}
+        self.latency = latency
+        self.token_rate = token_rate
+        self.load_time = load_time
+        self.fail_rate = fail_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.loaded: dict[str, float] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        """Listen on a free loopback port in a background thread."""
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def _load(self, model: str) -> float:
+        """Mark a model resident and return the load time this request pays."""
+        with self.lock:
+            cold = model not in self.loaded
+            self.loaded[model] = time.time()
+        return self.load_time if cold else 0.0
+
+    def _should_fail(self) -> bool:
+        with self.lock:
+            return self.fail_rate > 0 and self.random.random() < self.fail_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    server: ThreadingHTTPServer
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    @property
+    def fake(self) -> FakeOllama:
+        return self.server.fake
+
+    def setup(self) -> None:
+        super().setup()
+        with self.fake.lock:
+            self.fake.connections += 1
+
+    # --- responses ---
+
+    def _json(self, body: object, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._json({"error": message}, status)
+
+    def _stream(self, parts: "list[dict] | object") -> None:
+        """Send NDJSON lines with chunked encoding; stops quietly if the client hangs up."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for part in parts:
+                line = json.dumps(part).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            self.close_connection = True
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # --- routing ---
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        self.fake.requests.append(("GET", self.path))
+        if self.path == "/api/tags":
+            self._tags()
+        elif self.path == "/api/ps":
+            self._ps()
+        else:
+            self._error(404, "not found")
+
+    def do_POST(self) -> None:
+        self.fake.requests.append(("POST", self.path))
+        body = self._body()
+        routes = {
+            "/api/chat": self._chat,
+            "/api/generate": self._generate,
+            "/api/pull": self._pull,
+            "/api/embed": self._embed,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._error(404, "not found")
+        else:
+            route(body)
+
+    # --- endpoints ---
+
+    def _tags(self) -> None:
+        models = [
+            {"name": name, "model": name, "size": size, "modified_at": _now(), "digest": name}
+            for name, size in self.fake.models.items()
+        ]
+        self._json({"models": models})
+
+    def _ps(self) -> None:
+        expires = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+        models = [
+            {
+                "name": name,
+                "model": name,
+                "size": self.fake.models.get(name, 0),
+                "size_vram": self.fake.models.get(name, 0),
+                "digest": name,
+                "expires_at": expires,
+            }
+            for name in list(self.fake.loaded)
+        ]
+        self._json({"models": models})
+
+    def _check_model(self, model: str) -> bool:
+        if model not in self.fake.models:
+            self._error(404, f"model '{model}' not found")
+            return False
+        if self.fake._should_fail():
+            self._error(self.fake.error_status, "injected failure")
+            return False
+        return True
+
+    def _reply(self, model: str, key: str, text: str, stream: bool, options: dict) -> None:
+        """Answer a chat or generate request with text, timed like the server would.
+
+        Honors the num_predict and stop options.
+        """
+        start = time.perf_counter()
+        load = self.fake._load(model)
+        time.sleep(load + self.fake.latency)
+        for stop in options.get("stop") or []:
+            text = text.split(stop, 1)[0]
+        tokens = _tokens(text)
+        if options.get("num_predict", -1) >= 0:
+            tokens = tokens[: options["num_predict"]] or [""]
+
+        def content(piece: str) -> dict:
+            if key == "message":
+                return {"message": {"role": "assistant", "content": piece}}
+            return {"response": piece}
+
+        def final(eval_s: float) -> dict:
+            return {
+                "model": model,
+                "created_at": _now(),
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": 10,
+                "prompt_eval_duration": 1_000_000,
+                "eval_count": len(tokens),
+                "eval_duration": int(eval_s * 1e9),
+            }
+
+        def parts():
+            eval_start = time.perf_counter()
+            for i, piece in enumerate(tokens):
+                if i and self.fake.token_rate:
+                    time.sleep(1 / self.fake.token_rate)
+                yield {"model": model, "created_at": _now(), "done": False, **content(piece)}
+            yield {**final(time.perf_counter() - eval_start), **content("")}
+
+        if stream:
+            self._stream(parts())
+            return
+        if self.fake.token_rate:
+            time.sleep((len(tokens) - 1) / self.fake.token_rate)
+        self._json(
+            {**final(len(tokens) / (self.fake.token_rate or 1e9)), **content("".join(tokens))}
+        )
+
+    def _chat(self, body: dict) -> None:
+        model = body.get("model", "")
+        if self._check_model(model):
+            text = self.fake.responses.get(model, self.fake.response)
+            self._reply(model, "message", text, body.get("stream", True), body.get("options") or {})
+
+    def _generate(self, body: dict) -> None:
+        model = body.get("model", "")
+        if self._check_model(model):
+            # An empty prompt only loads the model, which is how warm-up works
+            text = self.fake.responses.get(model, self.fake.response) if body.get("prompt") else ""
+            self._reply(
+                model, "response", text, body.get("stream", True), body.get("options") or {}
+            )
+
+    def _pull(self, body: dict) -> None:
+        model = body.get("model", "")
+        size = 1_000_000
+        parts = [
+            {"status": "pulling manifest"},
+            *(
+                {"status": "pulling", "digest": model, "total": size, "completed": done}
+                for done in (0, size // 2, size)
+            ),
+            {"status": "success"},
+        ]
+        with self.fake.lock:
+            self.fake.models.setdefault(model, size)
+        if body.get("stream", True):
+            self._stream(parts)
+        else:
+            self._json(parts[-1])
+
+    def _embed(self, body: dict) -> None:
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        self._json({"model": body.get("model"), "embeddings": [_embedding(t) for t in texts]})
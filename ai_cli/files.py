@@ -0,0 +1,39 @@
+"""Concurrency-safe updates of the state files under the config directory."""
+
+import fcntl
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def locked(path: Path, exclusive: bool = True) -> Iterator[None]:
+    """Hold an advisory lock on `<path>.lock`, shared by readers and exclusive for writers.
+
+    The lock is taken on a fresh file descriptor, so it serializes threads of one
+    process as well as separate processes (a batch run, the daemon and the CLI).
+    Writers re-read the file while holding it before saving, so concurrent updates
+    are merged rather than overwritten.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def write_atomic(path: Path, data: str | bytes) -> None:
+    """Replace path with data through a temporary file of its own, so writers never clash."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mode = "wb" if isinstance(data, bytes) else "w"
+    f = tempfile.NamedTemporaryFile(
+        mode, dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+    )
+    try:
+        with f:
+            f.write(data)
+        os.replace(f.name, path)
+    except BaseException:
+        Path(f.name).unlink(missing_ok=True)
+        raise
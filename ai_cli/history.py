@@ -0,0 +1,340 @@
+"""Indexed history of answered tasks and what was done with them."""
+
+import json
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, TextIO
+
+from ai_cli.cache import normalize_task
+from ai_cli.config import CONFIG_PATH
+
+HISTORY_DB_PATH = CONFIG_PATH.parent / "history.sqlite3"
+# Append-only log written by earlier versions, imported once on first use
+LEGACY_HISTORY_PATH = CONFIG_PATH.parent / "history.jsonl"
+
+DEFAULT_HISTORY_MAX_ENTRIES = 100_000
+DEFAULT_HISTORY_MAX_AGE_DAYS = 365
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    task TEXT NOT NULL,
+    norm_task TEXT NOT NULL,
+    model TEXT NOT NULL,
+    command TEXT NOT NULL,
+    action TEXT NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+CREATE INDEX IF NOT EXISTS history_task ON history (norm_task, ts);
+CREATE INDEX IF NOT EXISTS history_model ON history (model, ts);
+CREATE INDEX IF NOT EXISTS history_action ON history (action, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Full-text index over task and command, kept in step with the table by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    task, command, content='history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, task, command) VALUES (new.id, new.task, new.command);
+END;
+CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, task, command)
+    VALUES ('delete', old.id, old.task, old.command);
+END;
+"""
+
+# Matches considered per search, newest first, so a very common term stays fast
+SEARCH_WINDOW = 5000
+# Days after which a command's recency counts half as much
+_SEARCH_RECENCY_DAYS = 30
+
+_COLUMNS = "ts, task, model, command, action, cached"
+
+
+def _parse_ts(value: object) -> float:
+    """Epoch seconds from an ISO timestamp as written to history.jsonl."""
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _entry(row: tuple) -> dict:
+    """A row in the history.jsonl entry format."""
+    ts, task, model, command, action, cached = row
+    return {
+        "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+        "task": task,
+        "model": model,
+        "command": command,
+        "action": action,
+        "cached": bool(cached),
+    }
+
+
+class HistoryStore:
+    """SQLite (WAL) history with retention by count and age.
+
+    Lookups by normalized task, model, action and time range are served by indexes.
+    An existing history.jsonl is imported the first time the store is opened.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = DEFAULT_HISTORY_MAX_ENTRIES,
+        max_age_days: float = DEFAULT_HISTORY_MAX_AGE_DAYS,
+        legacy_path: Path | None = None,
+    ) -> None:
+        self.path = path or HISTORY_DB_PATH
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.legacy_path = legacy_path or LEGACY_HISTORY_PATH
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the database, commit on success and always close."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self.fts = self._create_fts(conn)
+            with conn:
+                self._import_legacy(conn)
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _create_fts(conn: sqlite3.Connection) -> bool:
+        """Set up the full-text index; False if this SQLite lacks FTS5."""
+        try:
+            conn.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        with conn:
+            if not conn.execute("SELECT 1 FROM meta WHERE name = 'fts'").fetchone():
+                # Index rows written before the index existed
+                conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+                conn.execute("INSERT INTO meta (name, value) VALUES ('fts', '1')")
+        return True
+
+    def _import_legacy(self, conn: sqlite3.Connection) -> None:
+        if conn.execute("SELECT 1 FROM meta WHERE name = 'imported_jsonl'").fetchone():
+            return
+        imported = self.import_jsonl(conn, self.legacy_path)
+        conn.execute(
+            "INSERT INTO meta (name, value) VALUES ('imported_jsonl', ?)", (str(imported),)
+        )
+
+    @staticmethod
+    def import_jsonl(conn: sqlite3.Connection, path: Path) -> int:
+        """Insert every valid entry of a history.jsonl file. Returns the number imported."""
+
+        def rows() -> Iterator[tuple]:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(entry, dict) or not entry.get("task"):
+                        continue
+                    task = entry["task"]
+                    yield (
+                        _parse_ts(entry.get("ts")),
+                        task,
+                        normalize_task(task),
+                        entry.get("model") or "",
+                        entry.get("command") or "",
+                        entry.get("action") or "",
+                        bool(entry.get("cached", False)),
+                    )
+
+        try:
+            return conn.executemany(
+                "INSERT INTO history (ts, task, norm_task, model, command, action, cached) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows(),
+            ).rowcount
+        except FileNotFoundError:
+            return 0
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        removed = conn.execute(
+            "DELETE FROM history WHERE ts < ?", (time.time() - self.max_age,)
+        ).rowcount
+        removed += conn.execute(
+            "DELETE FROM history WHERE id <= "
+            "(SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        return removed
+
+    def add(self, task: str, model: str, command: str, action: str, cached: bool = False) -> None:
+        """Record one answered task and drop entries beyond the retention limits."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO history (ts, task, norm_task, model, command, action, cached) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), task, normalize_task(task), model, command, action, cached),
+            )
+            self._prune(conn)
+
+    def _select(
+        self,
+        task: str | None = None,
+        model: str | None = None,
+        action: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int | None = None,
+        newest_first: bool = True,
+    ) -> tuple[str, list]:
+        where, params = [], []
+        if task is not None:
+            where.append("norm_task = ?")
+            params.append(normalize_task(task))
+        for column, value in (("model", model), ("action", action)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        sql = f"SELECT {_COLUMNS} FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC" if newest_first else " ORDER BY ts, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    def find(self, **filters: Any) -> list[dict]:
+        """Return entries matching every given filter, in history.jsonl format.
+
+        Filters are task (matched after whitespace normalization), model, action,
+        since and until (epoch seconds), limit and newest_first (default True).
+        """
+        with self._connect() as conn:
+            return [_entry(row) for row in conn.execute(*self._select(**filters))]
+
+    def export(self, out: TextIO, **filters: Any) -> int:
+        """Stream matching entries to out as JSON lines, oldest first. Returns the count."""
+        exported = 0
+        with self._connect() as conn:
+            for row in conn.execute(*self._select(newest_first=False, **filters)):
+                out.write(json.dumps(_entry(row)) + "\n")
+                exported += 1
+        return exported
+
+    def recall(self, task: str) -> dict | None:
+        """Return the entry that last executed a command for this task, or None."""
+        found = self.find(task=task, action="execute", limit=1)
+        return found[0] if found else None
+
+    def search(
+        self,
+        terms: list[str],
+        model: str | None = None,
+        action: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Find commands whose task or command contains every term (as a word prefix).
+
+        Entries are grouped by command and ranked by how often the command was
+        executed, discounted by how long ago it was last used. Each result has the
+        command, its latest task and model, `last` (ISO time), `uses` and `runs`.
+        """
+        # Unary + keeps SQLite from scanning a column index instead of the matches
+        filters, filter_params = [], []
+        for column, value in (("model", model), ("action", action)):
+            if value is not None:
+                filters.append(f"+{column} = ?")
+                filter_params.append(value)
+        if since is not None:
+            filters.append("+ts >= ?")
+            filter_params.append(since)
+        if until is not None:
+            filters.append("+ts < ?")
+            filter_params.append(until)
+
+        where = "".join(f" AND {f}" for f in filters)
+
+        # The filters go inside the window, so older matches inside a date range are
+        # found even when newer entries fill the window
+        with self._connect() as conn:
+            if self.fts:
+                # Each term becomes a quoted prefix query, so FTS syntax in it is literal
+                query = " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+                matches = (
+                    "SELECT id FROM history_fts JOIN history ON id = history_fts.rowid "
+                    f"WHERE history_fts MATCH ?{where} ORDER BY id DESC LIMIT ?"
+                )
+                params: list = [query, *filter_params, SEARCH_WINDOW]
+            else:
+                like = " AND ".join("(task LIKE ? OR command LIKE ?)" for _ in terms) or "1"
+                matches = f"SELECT id FROM history WHERE {like}{where} ORDER BY id DESC LIMIT ?"
+                params = [p for t in terms for p in (f"%{t}%", f"%{t}%")]
+                params += [*filter_params, SEARCH_WINDOW]
+            sql = (
+                "SELECT command, task, model, MAX(ts) AS last, COUNT(*), "
+                "SUM(action = 'execute') AS runs "
+                f"FROM history WHERE id IN ({matches})"
+                " GROUP BY command"
+                " ORDER BY (1.0 + runs) / (1.0 + (? - last) / ?) DESC, last DESC LIMIT ?"
+            )
+            params += [time.time(), _SEARCH_RECENCY_DAYS * 86400, limit]
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {
+                "command": command,
+                "task": task,
+                "model": model,
+                "last": datetime.fromtimestamp(last, timezone.utc).isoformat(),
+                "uses": uses,
+                "runs": runs,
+            }
+            for command, task, model, last, uses, runs in rows
+        ]
+
+    def compact(self) -> int:
+        """Apply retention, then reclaim the freed space. Returns the entries removed."""
+        with self._connect() as conn:
+            removed = self._prune(conn)
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        return removed
+
+    def stats(self) -> dict[str, int | float | None]:
+        """Return the entry count, database size and oldest entry age."""
+        with self._connect() as conn:
+            entries, oldest = conn.execute("SELECT COUNT(*), MIN(ts) FROM history").fetchone()
+        return {
+            "entries": entries,
+            "size_bytes": self.path.stat().st_size if self.path.exists() else 0,
+            "oldest_age_s": time.time() - oldest if oldest is not None else None,
+        }
@@ -3,21 +3,52 @@
 import os
 import platform
 import re
-import shutil
-from typing import NamedTuple
+import time
+from collections.abc import Awaitable, Callable, Generator, Mapping
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeVar
 
 import click
-from ollama import Client
-from ollama import list as ollama_list
 
+from ai_cli.cache import (
+    DEFAULT_CACHE_MAX_AGE_DAYS,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    ResponseCache,
+    cache_key,
+)
+from ai_cli.client import get_async_client, get_client
 from ai_cli.config import (
     DEFAULT_SYSTEM_PROMPT,
     DEFAULT_VERBOSE_SYSTEM_PROMPT,
+    get_generation_options,
     get_models,
     get_system_prompt,
-    get_timeout,
     load_config,
 )
+from ai_cli.semantic import (
+    DEFAULT_EMBED_MODEL,
+    DEFAULT_SEMANTIC_MAX_ENTRIES,
+    DEFAULT_SEMANTIC_THRESHOLD,
+    SemanticCache,
+    env_fingerprint,
+)
+from ai_cli.setup import (
+    DEFAULT_INVENTORY_TTL,
+    DEFAULT_RUNNING_TTL,
+    _fmt_size,
+    installed_models,
+    installed_models_async,
+    is_installed,
+    running_models,
+    running_models_async,
+)
+from ai_cli.stats import ModelStats
+from ai_cli.tools import available_tools
+
+if TYPE_CHECKING:
+    from ollama import AsyncClient, ChatResponse, Client
+
+
+_T = TypeVar("_T")
 
 
 class LLMResponse(NamedTuple):
@@ -25,28 +56,42 @@ class LLMResponse(NamedTuple):
 
     command: str
     explanation: str | None = None
+    model: str | None = None
+    cached: bool = False
+    timing: dict[str, float] | None = None
 
 
 DEFAULT_MODEL = "glm-5:cloud"
+DEFAULT_HEDGE_DELAY = 2.0
+DEFAULT_MEMORY_HEADROOM_GB = 2.0
 
+# Line starts that must not be displayed until they are complete.
+_PARTIAL_MARKERS = ("```", "COMMAND:", "EXPLANATION:")
 
-def _detect_env() -> dict[str, str]:
-    """Detect OS, architecture, shell, and available tools."""
-    shell = os.path.basename(os.environ.get("SHELL", "sh"))
-    tools = []
-    if shutil.which("brew"):
-        tools.append("Homebrew")
-    if shutil.which("uv"):
-        tools.append("uv")
-    if shutil.which("docker"):
-        tools.append("Docker")
-    cwd = os.getcwd()
+
+def _detect_env(
+    config: dict | None = None, cwd: str | None = None, environ: Mapping[str, str] | None = None
+) -> dict[str, str]:
+    """Detect OS, architecture, shell, and available tools.
+
+    env_context holds only what stays the same from one directory to the next, so
+    the rendered system prompt is a stable prefix the server can reuse; the working
+    directory is returned separately as cwd, defaulting to this process's. The shell
+    and tools come from environ's SHELL and PATH, defaulting to os.environ.
+    """
+    if config is None:
+        config = load_config()
+    if environ is None:
+        environ = os.environ
+    shell = os.path.basename(environ.get("SHELL", "sh"))
+    tools = available_tools(config, environ.get("PATH", ""))
+    cwd = cwd or os.getcwd()
     home = os.path.expanduser("~")
     env_parts = []
     if tools:
         env_parts.append(f"Available tools: {', '.join(tools)}. ")
-    env_parts.append(f"Working directory: {cwd}. Home: {home}. ")
-    user_context = load_config().get("context", "")
+    env_parts.append(f"Home: {home}. ")
+    user_context = config.get("context", "")
     if user_context:
         env_parts.append(f"{user_context} ")
     return {
@@ -54,9 +99,15 @@ def _detect_env() -> dict[str, str]:
         "arch": platform.machine(),
         "shell": shell,
         "env_context": "".join(env_parts),
+        "cwd": cwd,
     }
 
 
+def _show_status(message: str) -> None:
+    """Print a progress note such as the model in use."""
+    click.secho(message, fg="bright_black", err=True)
+
+
 def _strip_markdown_fences(text: str) -> str:
     """Remove markdown code fences wrapping a command."""
     text = re.sub(r"^```(?:\w*)\n?", "", text)
@@ -64,6 +115,24 @@ def _strip_markdown_fences(text: str) -> str:
     return text.strip()
 
 
+def _is_lead_in(line: str) -> bool:
+    """True for a line of prose introducing the command, such as "Here is the command:".
+
+    It starts like a sentence and ends in a colon or a full stop; commands start in
+    lowercase, so one ending in a colon (`scp notes.txt host:`) is not mistaken for it.
+    """
+    line = line.strip()
+    return line[:1].isupper() and line.endswith((":", ".", "!"))
+
+
+def _parse_plain_response(content: str) -> LLMResponse:
+    """Parse a plain answer: the command, after any lead-in lines and code fence."""
+    lines = content.strip().splitlines()
+    while len(lines) > 1 and (_is_lead_in(lines[0]) or not lines[0].strip()):
+        lines.pop(0)
+    return LLMResponse(command=_strip_markdown_fences("\n".join(lines)))
+
+
 def _parse_verbose_response(content: str) -> LLMResponse:
     """Parse EXPLANATION/COMMAND format. Fallback: treat whole content as command."""
     explanation_lines: list[str] = []
@@ -91,10 +160,469 @@ def _parse_verbose_response(content: str) -> LLMResponse:
     return LLMResponse(command=command, explanation=explanation)
 
 
-def _resolve_model(explicit_model: str | None = None) -> str:
+def _parse_partial(content: str, verbose: bool = False) -> LLMResponse:
+    """Parse a possibly incomplete streamed response for live display.
+
+    A trailing line that may still grow into a fence or a marker is held back,
+    and in verbose mode no command is shown until the COMMAND: line has started.
+    """
+    lines = content.lstrip().split("\n")
+    if any(marker.startswith(lines[-1]) for marker in _PARTIAL_MARKERS):
+        lines.pop()
+    if not verbose:
+        while lines and _is_lead_in(lines[0]):
+            lines.pop(0)
+        return LLMResponse(command=_strip_markdown_fences("\n".join(lines).lstrip()))
+    text = "\n".join(lines)
+    if any(line.startswith("COMMAND:") for line in lines):
+        return _parse_verbose_response(text)
+    explanation = _parse_verbose_response(text).explanation if "EXPLANATION:" in text else None
+    return LLMResponse(command="", explanation=explanation)
+
+
+def _command_line_end(content: str, verbose: bool = False) -> int | None:
+    """Return the offset just past the first complete command line, or None if not there yet.
+
+    In verbose mode that is a newline-terminated COMMAND: line; in plain mode it is
+    the first newline-terminated line that is neither blank, a code fence nor a
+    lead-in such as "Here is the command:".
+    """
+    end = 0
+    for line in content.splitlines(keepends=True):
+        end += len(line)
+        if not line.endswith("\n"):
+            return None
+        if verbose:
+            if line.startswith("COMMAND:") and line[len("COMMAND:") :].strip():
+                return end
+        elif line.strip() and not line.lstrip().startswith("```") and not _is_lead_in(line):
+            return end
+    return None
+
+
+def _add_server_timing(response: "ChatResponse", timing: dict[str, float]) -> None:
+    """Copy server-reported durations (nanoseconds) from a final response into timing (seconds).
+
+    The server only reports them in the last chunk, so a stream cut short has none.
+    """
+    for field, key in (
+        ("load_duration", "load"),
+        ("prompt_eval_duration", "prompt_eval"),
+        ("eval_duration", "eval"),
+    ):
+        value = getattr(response, field, None)
+        if isinstance(value, int):
+            timing[key] = value / 1e9
+    if isinstance(getattr(response, "prompt_eval_count", None), int):
+        timing["prompt_tokens"] = response.prompt_eval_count
+
+
+class _Stream:
+    """Accumulate a streamed response: its text, timing, and where to stop early."""
+
+    def __init__(
+        self,
+        verbose: bool,
+        early_stop: bool,
+        on_partial: Callable[[LLMResponse], None] | None,
+    ) -> None:
+        self.verbose = verbose
+        self.early_stop = early_stop
+        self.on_partial = on_partial
+        self.start = time.perf_counter()
+        self.chunks: list[str] = []
+        self.timing: dict[str, float] = {}
+        self.tokens = 0
+
+    def add(self, chunk: "ChatResponse") -> bool:
+        """Take one chunk; returns True once a complete command line means the stream can end."""
+        if chunk.done:
+            _add_server_timing(chunk, self.timing)
+        text = chunk.message.content or ""
+        if not text:
+            return False
+        self.tokens += 1
+        self.timing.setdefault("ttft", time.perf_counter() - self.start)
+        self.chunks.append(text)
+        content = "".join(self.chunks)
+        if self.on_partial is not None:
+            self.on_partial(_parse_partial(content, self.verbose))
+        if self.early_stop and "\n" in text:
+            end = _command_line_end(content, self.verbose)
+            if end is not None:
+                self.timing["stopped_early"] = 1
+                self.timing["skipped_chars"] = len(content) - end
+                self.chunks = [content[:end]]
+                return True
+        return False
+
+    def result(self) -> tuple[str, dict[str, float]]:
+        self.timing["total"] = time.perf_counter() - self.start
+        self.timing["tokens"] = self.tokens
+        return "".join(self.chunks), self.timing
+
+
+def _complete_response(response: "ChatResponse", start: float) -> tuple[str, dict[str, float]]:
+    """Text and timing of a non-streamed response."""
+    timing = {"total": time.perf_counter() - start}
+    if response.eval_count:
+        timing["tokens"] = response.eval_count
+    _add_server_timing(response, timing)
+    return response.message.content, timing
+
+
+def _chat(
+    client: "Client",
+    model: str,
+    messages: list[dict[str, str]],
+    verbose: bool,
+    stream: bool,
+    early_stop: bool,
+    on_partial: Callable[[LLMResponse], None] | None,
+    keep_alive: str | int | None = None,
+    options: dict | None = None,
+) -> tuple[str, dict[str, float]]:
+    """Run the chat request and return the response text with timing details.
+
+    When streaming with early_stop, the stream is closed as soon as a complete
+    command line has arrived, which makes the server stop generating.
+    """
+    start = time.perf_counter()
+    if not stream:
+        response = client.chat(
+            model=model, messages=messages, keep_alive=keep_alive, options=options
+        )
+        return _complete_response(response, start)
+
+    accumulated = _Stream(verbose, early_stop, on_partial)
+    response_stream = client.chat(
+        model=model, messages=messages, stream=True, keep_alive=keep_alive, options=options
+    )
+    try:
+        for chunk in response_stream:
+            if accumulated.add(chunk):
+                break
+    finally:
+        close = getattr(response_stream, "close", None)
+        if close is not None:
+            close()
+    return accumulated.result()
+
+
+async def _chat_async(
+    client: "AsyncClient",
+    model: str,
+    messages: list[dict[str, str]],
+    verbose: bool,
+    stream: bool,
+    early_stop: bool,
+    on_partial: Callable[[LLMResponse], None] | None,
+    keep_alive: str | int | None = None,
+    options: dict | None = None,
+) -> tuple[str, dict[str, float]]:
+    """Async twin of _chat; cancelling the task closes the stream."""
+    start = time.perf_counter()
+    if not stream:
+        response = await client.chat(
+            model=model, messages=messages, keep_alive=keep_alive, options=options
+        )
+        return _complete_response(response, start)
+
+    accumulated = _Stream(verbose, early_stop, on_partial)
+    response_stream = await client.chat(
+        model=model, messages=messages, stream=True, keep_alive=keep_alive, options=options
+    )
+    try:
+        async for chunk in response_stream:
+            if accumulated.add(chunk):
+                break
+    finally:
+        aclose = getattr(response_stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return accumulated.result()
+
+
+class _Callback:
+    """Wrap the caller's on_partial and remember what it raised.
+
+    Such an exception (e.g. the daemon's client hanging up) is the caller's, so it
+    must not be counted as the model failing or make a hedge ask the next model.
+    """
+
+    def __init__(self, on_partial: Callable[[LLMResponse], None]) -> None:
+        self.on_partial = on_partial
+        self.error: BaseException | None = None
+
+    def __call__(self, partial: LLMResponse) -> None:
+        try:
+            self.on_partial(partial)
+        except BaseException as e:
+            self.error = e
+            raise
+
+
+def _candidate_models(
+    config: dict,
+    stats: ModelStats | None = None,
+    note: Callable[[str], None] | None = None,
+) -> list[str] | None:
+    """Installed entries of the `models` list in preference order.
+
+    That is config order, or fastest first with `model_strategy = "fastest"`. With
+    `prefer_loaded = true`, models the server has loaded go first. With
+    `memory_aware = true`, models that don't fit in free memory are dropped (loaded
+    ones always fit). note receives the reason for each model skipped.
+    Returns None if the list is empty or the server is unreachable.
+    """
+    models_list = get_models(config)
+    if not models_list:
+        return None
+    ttl = config.get("inventory_ttl", DEFAULT_INVENTORY_TTL)
+    available = _get_available_models(ttl)
+    if available is None:
+        return None
+    candidates = [m for m in models_list if is_installed(m, available)]
+    if config.get("model_strategy", "ordered") == "fastest":
+        candidates = (stats or ModelStats()).rank(candidates)
+    prefer_loaded = config.get("prefer_loaded", False)
+    memory_aware = config.get("memory_aware", False)
+    if (prefer_loaded or memory_aware) and len(candidates) > 1:
+        loaded = _get_running_models(config.get("running_ttl", DEFAULT_RUNNING_TTL))
+        if prefer_loaded:
+            candidates = sorted(candidates, key=lambda m: not _is_loaded(m, loaded))
+        if memory_aware:
+            candidates = _fit_in_memory(candidates, loaded, config, note or (lambda _: None))
+    return candidates
+
+
+def _get_running_models(ttl: float = DEFAULT_RUNNING_TTL) -> set[str]:
+    """Get set of loaded model names, empty if the server is unreachable."""
+    try:
+        return running_models(ttl)
+    except ConnectionError:
+        return set()
+
+
+def _is_loaded(model: str, loaded: set[str]) -> bool:
+    return model in loaded or f"{model}:latest" in loaded
+
+
+def _fit_in_memory(
+    candidates: list[str], loaded: set[str], config: dict, note: Callable[[str], None]
+) -> list[str]:
+    """Keep loaded models, then those whose size plus headroom fits in available memory.
+
+    If nothing fits, all candidates are kept, smallest first, rather than failing.
+    """
+    import psutil
+
+    try:
+        sizes = installed_models(config.get("inventory_ttl", DEFAULT_INVENTORY_TTL))
+    except ConnectionError:
+        return candidates
+
+    def size(model: str) -> int:
+        return sizes.get(model, sizes.get(f"{model}:latest", 0))
+
+    free = psutil.virtual_memory().available
+    headroom = int(config.get("memory_headroom_gb", DEFAULT_MEMORY_HEADROOM_GB) * 1024**3)
+    hot, fitting = [], []
+    for model in candidates:
+        if _is_loaded(model, loaded):
+            hot.append(model)
+        elif size(model) + headroom <= free:
+            fitting.append(model)
+        else:
+            note(
+                f"skipping {model}: needs {_fmt_size(size(model))} + {_fmt_size(headroom)} "
+                f"headroom, {_fmt_size(free)} available"
+            )
+    if not hot and not fitting:
+        note("no model fits in available memory, trying the smallest")
+        return sorted(candidates, key=size)
+    return hot + fitting
+
+
+def _hedge_models(
+    resolved_model: str, explicit: bool, config: dict, stats: ModelStats | None = None
+) -> list[str]:
+    """Models to hedge across: the resolved one, then the other installed `models` entries.
+
+    Hedging is opt-in and only applies when the model was picked from the list.
+    """
+    if explicit or os.environ.get("AI_MODEL") or not config.get("hedge", False):
+        return [resolved_model]
+    candidates = _candidate_models(config, stats) or []
+    return [resolved_model, *(m for m in candidates if m != resolved_model)]
+
+
+def _hedge_delay(model: str, config: dict, stats: ModelStats) -> float:
+    """Seconds to wait for a model's first token: `hedge_delay`, else its recorded p95."""
+    if "hedge_delay" in config:
+        return config["hedge_delay"]
+    summary = stats.summary(model) or {}
+    return summary.get("ttft_p95", DEFAULT_HEDGE_DELAY)
+
+
+def _hedged_chat(
+    config: dict,
+    models: list[str],
+    messages: list[dict[str, str]],
+    verbose: bool,
+    early_stop: bool,
+    on_partial: Callable[[LLMResponse], None] | None,
+    keep_alive: str | int | None,
+    delays: list[float],
+    options: dict[str, dict],
+    status: Callable[[str], None],
+    stats: ModelStats,
+) -> tuple[str, str, dict[str, float]]:
+    """Hedge from synchronous code by running _hedged_chat_async on a private event loop.
+
+    A thread blocked reading a response can't be interrupted, so a losing model
+    would keep its request open (still loading or generating) until its next chunk
+    or the timeout. Cancelling a task closes its connection at once, which makes
+    the server drop the request. Only hedged requests pay for importing asyncio.
+    """
+    import asyncio
+
+    async def hedge() -> tuple[str, str, dict[str, float]]:
+        client = get_async_client(config)
+        try:
+            return await _hedged_chat_async(
+                client,
+                models,
+                messages,
+                verbose,
+                early_stop=early_stop,
+                on_partial=on_partial,
+                keep_alive=keep_alive,
+                delays=delays,
+                options=options,
+                status=status,
+                stats=stats,
+            )
+        finally:
+            await client.close()
+
+    return asyncio.run(hedge())
+
+
+async def _hedged_chat_async(
+    client: "AsyncClient",
+    models: list[str],
+    messages: list[dict[str, str]],
+    verbose: bool,
+    early_stop: bool,
+    on_partial: Callable[[LLMResponse], None] | None,
+    keep_alive: str | int | None,
+    delays: list[float],
+    options: dict[str, dict],
+    status: Callable[[str], None],
+    stats: ModelStats,
+) -> tuple[str, str, dict[str, float]]:
+    """Ask models[0]; each time delays[i] passes without a first token, also ask the next model.
+
+    Each model runs as a task. The first to finish wins and the others are
+    cancelled, which closes their streams. A model that fails hands over to the
+    next one at once; an exception from on_partial ends the hedge instead.
+    Partial output is shown from whichever model produced a token first. options
+    maps each model to its generation options. Returns (model, content, timing),
+    with total and ttft counted from the start of the hedge; stats records the
+    winner's own times.
+    """
+    import asyncio
+
+    leader: list[str] = []
+    callback = _Callback(on_partial) if on_partial is not None else None
+
+    async def run(model: str) -> tuple[str, dict[str, float]]:
+        def forward(partial: LLMResponse) -> None:
+            if not leader:
+                leader.append(model)
+            if leader[0] == model and callback is not None:
+                callback(partial)
+
+        return await _chat_async(
+            client,
+            model,
+            messages,
+            verbose,
+            stream=True,
+            early_stop=early_stop,
+            on_partial=forward,
+            keep_alive=keep_alive,
+            options=options[model],
+        )
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    tasks: dict[asyncio.Task, str] = {}
+    # Seconds after start each model was asked
+    asked: dict[str, float] = {}
+    launched = 0
+
+    def launch() -> None:
+        nonlocal launched, hedge_at
+        tasks[asyncio.create_task(run(models[launched]))] = models[launched]
+        asked[models[launched]] = time.perf_counter() - start
+        hedge_at = loop.time() + delays[launched]
+        launched += 1
+
+    hedge_at = 0.0
+    launch()
+    error: BaseException | None = None
+    try:
+        while tasks:
+            timeout = None
+            if not leader and launched < len(models):
+                timeout = max(hedge_at - loop.time(), 0)
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when="FIRST_COMPLETED")
+            if not done:
+                if not leader:
+                    slow, extra = models[launched - 1], models[launched]
+                    wait = delays[launched - 1]
+                    status(f"no token from {slow} after {wait:.2g}s, also asking {extra}")
+                    launch()
+                continue
+            for task in done:
+                model = tasks.pop(task)
+                error = task.exception()
+                if error is None:
+                    content, timing = task.result()
+                    stats.record(model, timing["total"], timing.get("ttft"))
+                    if launched > 1:
+                        # The caller waited from the start of the hedge, not just this model
+                        timing["total"] = time.perf_counter() - start
+                        if "ttft" in timing:
+                            timing["ttft"] += asked[model]
+                        timing["hedged"] = launched - 1
+                    return model, content, timing
+                if callback is not None and error is callback.error:
+                    raise error
+                stats.record_failure(model)
+                if not leader and launched < len(models):
+                    status(f"{model} failed, asking {models[launched]}")
+                    launch()
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Let the losers close their streams before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
+    raise error
+
+
+def _resolve_model(
+    explicit_model: str | None = None,
+    config: dict | None = None,
+    note: Callable[[str], None] | None = None,
+) -> str:
     """Resolve which model to use.
 
     Priority: explicit_model > AI_MODEL env > first available from config models list > config model > default.
+    With `model_strategy = "fastest"` the models list is ordered by recorded latency,
+    and with `memory_aware = true` it is filtered by free memory (see _candidate_models).
     """
     if explicit_model:
         return explicit_model
@@ -103,39 +631,139 @@ def _resolve_model(explicit_model: str | None = None) -> str:
     if env_model:
         return env_model
 
-    config = load_config()
+    if config is None:
+        config = load_config()
 
     # Try models list (priority order) — pick first available
-    models_list = get_models(config)
-    if models_list:
-        available = _get_available_models()
-        if available is not None:
-            for m in models_list:
-                if m in available or (":" not in m and f"{m}:latest" in available):
-                    return m
-            # None available from list — fall through to single model / default
+    candidates = _candidate_models(config, note=note)
+    if candidates:
+        return candidates[0]
+    # None available from list — fall through to single model / default
 
     return config.get("model", DEFAULT_MODEL)
 
 
-def _get_available_models() -> set[str] | None:
+def _get_available_models(ttl: float = DEFAULT_INVENTORY_TTL) -> set[str] | None:
     """Get set of installed model names, or None if server unreachable."""
     try:
-        response = ollama_list()
-        return {m.model for m in response.models}
+        return set(installed_models(ttl))
     except ConnectionError:
         return None
 
 
-def ask_llm(task: str, model: str | None = None, verbose: bool = False) -> LLMResponse | None:
-    """Ask ollama to generate a shell command for the given task."""
-    resolved_model = _resolve_model(model)
+def _needs_inventory(model: str | None, config: dict) -> bool:
+    """True if resolving the model means checking the `models` list against the server."""
+    return model is None and not os.environ.get("AI_MODEL") and bool(get_models(config))
 
-    # Print which model we're using
-    click.secho(f"using {resolved_model}", fg="bright_black", err=True)
 
-    config = load_config()
-    timeout = get_timeout(config)
+def _prefetch_inventory(config: dict) -> None:
+    """Fetch the inventory (and running set) that model resolution will use.
+
+    Raises ConnectionError if the server is unreachable for the inventory; the
+    running set is only a preference, so failing to get it is not an error.
+    """
+    if _get_available_models(config.get("inventory_ttl", DEFAULT_INVENTORY_TTL)) is None:
+        raise ConnectionError("ollama is unreachable")
+    if config.get("prefer_loaded", False) or config.get("memory_aware", False):
+        _get_running_models(config.get("running_ttl", DEFAULT_RUNNING_TTL))
+
+
+async def _prefetch_inventory_async(config: dict) -> None:
+    """Async twin of _prefetch_inventory, so resolution finds both in memory.
+
+    Resolution itself is synchronous; prefetching keeps it off the event loop.
+    """
+    await installed_models_async(config.get("inventory_ttl", DEFAULT_INVENTORY_TTL))
+    if config.get("prefer_loaded", False) or config.get("memory_aware", False):
+        try:
+            await running_models_async(config.get("running_ttl", DEFAULT_RUNNING_TTL))
+        except ConnectionError:
+            pass
+
+
+def _get_cache(config: dict) -> ResponseCache | None:
+    """Build the response cache from config, or None if caching is disabled."""
+    if not config.get("cache", True):
+        return None
+    return ResponseCache(
+        max_entries=config.get("cache_max_entries", DEFAULT_CACHE_MAX_ENTRIES),
+        max_age_days=config.get("cache_max_age_days", DEFAULT_CACHE_MAX_AGE_DAYS),
+    )
+
+
+def _get_semantic_cache(config: dict) -> SemanticCache | None:
+    """Build the semantic cache from config, or None unless it is enabled."""
+    if not config.get("semantic_cache", False):
+        return None
+    return SemanticCache(
+        threshold=config.get("semantic_cache_threshold", DEFAULT_SEMANTIC_THRESHOLD),
+        max_entries=config.get("semantic_cache_max_entries", DEFAULT_SEMANTIC_MAX_ENTRIES),
+    )
+
+
+def embed_texts(texts: list[str], config: dict | None = None) -> list[list[float]]:
+    """Embed texts with the configured ollama embedding model."""
+    if config is None:
+        config = load_config()
+    response = get_client(config).embed(
+        model=config.get("semantic_cache_model", DEFAULT_EMBED_MODEL), input=texts
+    )
+    return [list(v) for v in response.embeddings]
+
+
+async def embed_texts_async(texts: list[str], config: dict | None = None) -> list[list[float]]:
+    """Async twin of embed_texts."""
+    if config is None:
+        config = load_config()
+    response = await get_async_client(config).embed(
+        model=config.get("semantic_cache_model", DEFAULT_EMBED_MODEL), input=texts
+    )
+    return [list(v) for v in response.embeddings]
+
+
+class _Request(NamedTuple):
+    """One task with everything known about it before the model is asked."""
+
+    task: str
+    model: str
+    verbose: bool
+    env: dict[str, str]
+    system_prompt: str
+    cache: ResponseCache | None
+    semantic: SemanticCache | None
+
+    @property
+    def messages(self) -> list[dict[str, str]]:
+        # Volatile parts go last, after the byte-identical system prompt, so the
+        # server can reuse its evaluation of that prefix from the previous request
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": f"Working directory: {self.env['cwd']}.\n{self.task}"},
+        ]
+
+    def cache_key(self, model: str) -> str:
+        return cache_key(model, f"{self.system_prompt}\n{self.env['cwd']}", self.task)
+
+    @property
+    def fingerprint(self) -> str:
+        return env_fingerprint(self.env, self.verbose)
+
+
+def _build_request(
+    task: str,
+    model: str | None,
+    verbose: bool,
+    use_cache: bool,
+    config: dict,
+    cwd: str | None,
+    environ: Mapping[str, str] | None,
+    status: Callable[[str], None],
+) -> _Request:
+    """Resolve the model, render the system prompt and open the caches.
+
+    In verbose mode, status also hears why configured models were skipped.
+    """
+    resolved_model = _resolve_model(model, config, note=status if verbose else None)
 
     # Build system prompt
     custom_prompt = get_system_prompt(config, verbose=verbose)
@@ -146,23 +774,329 @@ def ask_llm(task: str, model: str | None = None, verbose: bool = False) -> LLMRe
     else:
         template = DEFAULT_SYSTEM_PROMPT
 
-    env = _detect_env()
-    system_prompt = template.format(**env)
-
-    client = Client(timeout=timeout)
-    response = client.chat(
-        model=resolved_model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": task},
-        ],
+    env = _detect_env(config, cwd, environ)
+    return _Request(
+        task,
+        resolved_model,
+        verbose,
+        env,
+        template.format(**env),
+        _get_cache(config) if use_cache else None,
+        _get_semantic_cache(config) if use_cache else None,
     )
 
-    content = response.message.content.strip()
+
+def _cached_answer(request: _Request, status: Callable[[str], None]) -> LLMResponse | None:
+    """Answer from the exact-match cache, if it has this task."""
+    if request.cache is None:
+        return None
+    hit = request.cache.get(request.cache_key(request.model))
+    if hit is None:
+        return None
+    status(f"using {request.model} (cached)")
+    command, explanation = hit
+    return LLMResponse(command, explanation, model=request.model, cached=True)
+
+
+def _similar_answer(
+    request: _Request, vector: list[float] | None, status: Callable[[str], None]
+) -> LLMResponse | None:
+    """Answer from the semantic cache, if it has a close enough task."""
+    if request.semantic is None or not vector:
+        return None
+    match = request.semantic.lookup(vector, request.model, request.fingerprint)
+    if match is None:
+        return None
+    entry, score = match
+    status(f"using {request.model} (similar to: {entry.task}, {score:.2f})")
+    return LLMResponse(entry.command, entry.explanation, model=request.model, cached=True)
+
+
+def _finish(
+    request: _Request,
+    answered_by: str,
+    content: str,
+    timing: dict[str, float],
+    vector: list[float] | None,
+    status: Callable[[str], None],
+) -> LLMResponse | None:
+    """Parse the model's answer and store it in the caches.
+
+    A hedged answer is cached under the resolved model, since that is the key the
+    next identical request looks up. A plain answer that is still only prose (the
+    model never got to the command) is returned but not cached.
+    """
+    if answered_by != request.model:
+        status(f"answered by {answered_by}")
+    content = content.strip()
     if not content:
         return None
 
-    if verbose:
-        return _parse_verbose_response(content)
+    if request.verbose:
+        result = _parse_verbose_response(content)
+    else:
+        result = _parse_plain_response(content)
+    result = result._replace(model=answered_by, timing=timing)
+    if not result.command or (not request.verbose and _is_lead_in(result.command)):
+        return result
+
+    if request.cache is not None:
+        request.cache.put(
+            request.cache_key(request.model),
+            answered_by,
+            request.task,
+            result.command,
+            result.explanation,
+        )
+    if request.semantic is not None and vector:
+        request.semantic.add(
+            vector,
+            request.model,
+            request.fingerprint,
+            request.task,
+            result.command,
+            result.explanation,
+        )
+    return result
+
+
+class _Io(NamedTuple):
+    """One step of answering a task that waits on I/O, in its sync and async forms.
+
+    Answering is written once, as a generator that yields these steps (see
+    _answer); _run_sync calls step.sync and _run_async awaits step.run_async, then
+    each sends the result back in, or throws in the exception.
+    """
+
+    sync: Callable[[], Any]
+    run_async: Callable[[], Awaitable[Any]]
+
+
+def _run_sync(steps: Generator[_Io, Any, _T]) -> _T:
+    """Drive steps to completion, running each one synchronously."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.send(value) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        value, error = None, None
+        try:
+            value = step.sync()
+        except Exception as e:
+            error = e
+
+
+async def _run_async(steps: Generator[_Io, Any, _T]) -> _T:
+    """Drive steps to completion, awaiting each one."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.send(value) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        value, error = None, None
+        try:
+            value = await step.run_async()
+        except Exception as e:
+            error = e
+
+
+def _ask_model(
+    request: _Request,
+    explicit: bool,
+    config: dict,
+    on_partial: Callable[[LLMResponse], None] | None,
+    status: Callable[[str], None],
+) -> Generator[_Io, Any, tuple[str, str, dict[str, float]]]:
+    """Ask the resolved model, hedged across the models list if enabled.
+
+    Returns (model that answered, content, timing) and records its latency.
+    """
+    early_stop = config.get("early_stop", True)
+    stats = ModelStats(recording=config.get("model_stats", True))
+    hedge = _hedge_models(request.model, explicit, config, stats)
+    if len(hedge) > 1:
+        hedged = {
+            "models": hedge,
+            "messages": request.messages,
+            "verbose": request.verbose,
+            "early_stop": early_stop,
+            "on_partial": on_partial,
+            "keep_alive": config.get("keep_alive"),
+            "delays": [_hedge_delay(m, config, stats) for m in hedge],
+            "options": {m: get_generation_options(config, m) for m in hedge},
+            "status": status,
+            "stats": stats,
+        }
+        return (
+            yield _Io(
+                lambda: _hedged_chat(config, **hedged),
+                lambda: _hedged_chat_async(get_async_client(config), **hedged),
+            )
+        )
 
-    return LLMResponse(command=_strip_markdown_fences(content))
+    callback = _Callback(on_partial) if on_partial is not None else None
+    chat = {
+        "model": request.model,
+        "messages": request.messages,
+        "verbose": request.verbose,
+        "stream": early_stop or on_partial is not None,
+        "early_stop": early_stop,
+        "on_partial": callback,
+        "keep_alive": config.get("keep_alive"),
+        "options": get_generation_options(config, request.model),
+    }
+    try:
+        content, timing = yield _Io(
+            lambda: _chat(get_client(config), **chat),
+            lambda: _chat_async(get_async_client(config), **chat),
+        )
+    except Exception as e:
+        if callback is None or e is not callback.error:
+            stats.record_failure(request.model)
+        raise
+    stats.record(request.model, timing["total"], timing.get("ttft"))
+    return request.model, content, timing
+
+
+def _answer(
+    task: str,
+    model: str | None,
+    verbose: bool,
+    use_cache: bool,
+    on_partial: Callable[[LLMResponse], None] | None,
+    before_request: Callable[[], Any] | None,
+    config: dict,
+    status: Callable[[str], None],
+    cwd: str | None,
+    environ: Mapping[str, str] | None,
+) -> Generator[_Io, Any, LLMResponse | None]:
+    """The steps of answering a task, shared by ask_llm and ask_llm_async."""
+    if _needs_inventory(model, config):
+        inventory = _Io(
+            lambda: _prefetch_inventory(config), lambda: _prefetch_inventory_async(config)
+        )
+        try:
+            yield inventory
+        except ConnectionError:
+            # Start the server before resolving, so it is asked rather than the fallback
+            if before_request is not None:
+                yield _Io(before_request, before_request)
+                before_request = None
+                try:
+                    yield inventory
+                except ConnectionError:
+                    pass
+    request = _build_request(task, model, verbose, use_cache, config, cwd, environ, status)
+
+    hit = _cached_answer(request, status)
+    if hit is not None:
+        return hit
+
+    if before_request is not None:
+        yield _Io(before_request, before_request)
+
+    vector = None
+    if request.semantic is not None:
+        from ollama import ResponseError
+
+        try:
+            vectors = yield _Io(
+                lambda: embed_texts([task], config), lambda: embed_texts_async([task], config)
+            )
+            vector = vectors[0]
+        except (ConnectionError, ResponseError):
+            vector = None
+        hit = _similar_answer(request, vector, status)
+        if hit is not None:
+            return hit
+
+    # Print which model we're using
+    status(f"using {request.model}")
+
+    answered_by, content, timing = yield from _ask_model(
+        request, model is not None, config, on_partial, status
+    )
+    return _finish(request, answered_by, content, timing, vector, status)
+
+
+def ask_llm(
+    task: str,
+    model: str | None = None,
+    verbose: bool = False,
+    use_cache: bool = True,
+    on_partial: Callable[[LLMResponse], None] | None = None,
+    before_request: Callable[[], None] | None = None,
+    config: dict | None = None,
+    on_status: Callable[[str], None] | None = None,
+    cwd: str | None = None,
+    environ: Mapping[str, str] | None = None,
+) -> LLMResponse | None:
+    """Ask ollama to generate a shell command for the given task.
+
+    The response is streamed unless early_stop is disabled in config, so that
+    generation can be cut off after the command line. With on_partial, the callback
+    is called with the command parsed so far after every chunk. before_request runs
+    once the exact-match cache has missed, just before the chat request; when the
+    model has to be picked from the `models` list and the server can't be reached
+    for its inventory, it runs before resolution instead, so a server it starts is
+    asked rather than the fallback model. config is the snapshot loaded once per
+    invocation; it is loaded here if omitted.
+    on_status receives progress notes (printed to stderr by default). cwd is the
+    working directory to describe in the prompt and environ the environment whose
+    SHELL and PATH it describes, for callers answering on behalf of another process.
+    """
+    if config is None:
+        config = load_config()
+    status = on_status or _show_status
+    return _run_sync(
+        _answer(
+            task,
+            model,
+            verbose,
+            use_cache,
+            on_partial,
+            before_request,
+            config,
+            status,
+            cwd,
+            environ,
+        )
+    )
+
+
+async def ask_llm_async(
+    task: str,
+    model: str | None = None,
+    verbose: bool = False,
+    use_cache: bool = True,
+    on_partial: Callable[[LLMResponse], None] | None = None,
+    before_request: Callable[[], Awaitable[None]] | None = None,
+    config: dict | None = None,
+    on_status: Callable[[str], None] | None = None,
+    cwd: str | None = None,
+    environ: Mapping[str, str] | None = None,
+) -> LLMResponse | None:
+    """Async twin of ask_llm on ollama's AsyncClient; before_request is awaited.
+
+    Both run the same steps (_answer), so many tasks can be answered concurrently
+    from one event loop with the same caching, parsing and hedging as ask_llm.
+    """
+    if config is None:
+        config = load_config()
+    status = on_status or _show_status
+    return await _run_async(
+        _answer(
+            task,
+            model,
+            verbose,
+            use_cache,
+            on_partial,
+            before_request,
+            config,
+            status,
+            cwd,
+            environ,
+        )
+    )
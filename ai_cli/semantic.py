@@ -0,0 +1,333 @@
+"""Semantic near-duplicate cache: answer rephrased tasks from earlier responses."""
+
+import hashlib
+import json
+import math
+import mmap
+import sqlite3
+import time
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from itertools import chain, compress, cycle, islice, repeat
+from operator import mul
+from pathlib import Path
+from typing import NamedTuple
+
+from ai_cli.cache import normalize_task
+from ai_cli.config import CONFIG_PATH
+from ai_cli.files import locked, write_atomic
+
+SEMANTIC_PATH = CONFIG_PATH.parent / "semantic"
+
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+DEFAULT_SEMANTIC_THRESHOLD = 0.9
+DEFAULT_SEMANTIC_MAX_ENTRIES = 2000
+
+EMBED_BATCH_SIZE = 32
+
+# Written on every lookup, so kept apart from the vectors and their metadata
+_USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS used (
+    key TEXT PRIMARY KEY,
+    last_used REAL NOT NULL
+);
+"""
+
+
+class SemanticEntry(NamedTuple):
+    """Metadata for one stored vector."""
+
+    model: str
+    fingerprint: str
+    task: str
+    command: str
+    explanation: str | None
+    last_used: float
+
+
+def env_fingerprint(env: dict[str, str], verbose: bool) -> str:
+    """Fingerprint the parts of the environment a command's validity depends on.
+
+    The working directory is deliberately left out so similar tasks can be shared
+    across directories; the exact-match cache covers the directory-specific case.
+    """
+    payload = json.dumps([env["os"], env["arch"], env["shell"], verbose])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _entry_key(entry: SemanticEntry) -> str:
+    """Identify an entry by its content, which stays the same when rows move."""
+    return hashlib.sha256(json.dumps(entry[:5]).encode()).hexdigest()[:16]
+
+
+def _bump(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+
+
+def _normalize(vector: Iterable[float]) -> array:
+    vec = array("f", vector)
+    norm = math.sqrt(sum(map(mul, vec, vec)))
+    if norm:
+        vec = array("f", (x / norm for x in vec))
+    return vec
+
+
+class SemanticCache:
+    """Float32 vector matrix plus JSON metadata, searched by cosine similarity.
+
+    Vectors are unit-normalized on insert, so cosine similarity is a dot product.
+    The matrix is stored as raw float32 rows in `<path>.f32` and metadata in
+    `<path>.json`; both are bounded by `max_entries` with LRU eviction. Lookups
+    only read them: hit/miss counters and when each entry was last matched are kept
+    in `<path>.sqlite3`, like ResponseCache's counters.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        threshold: float = DEFAULT_SEMANTIC_THRESHOLD,
+        max_entries: int = DEFAULT_SEMANTIC_MAX_ENTRIES,
+    ) -> None:
+        base = path or SEMANTIC_PATH
+        self.vectors_path = base.with_suffix(".f32")
+        self.meta_path = base.with_suffix(".json")
+        self.usage_path = base.with_suffix(".sqlite3")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._loaded = False
+        self.dim = 0
+        self.entries: list[SemanticEntry] = []
+        self.matrix: array | memoryview = array("f")
+
+    @contextmanager
+    def _usage(self) -> Iterator[sqlite3.Connection]:
+        """Open the usage database, commit on success and always close."""
+        self.usage_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.usage_path, timeout=5)
+        try:
+            conn.executescript(_USAGE_SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _load(self) -> None:
+        """Map the index on disk for reading, once per instance."""
+        if self._loaded:
+            return
+        with locked(self.meta_path, exclusive=False):
+            self._read(mapped=True)
+
+    def _read(self, mapped: bool = False) -> None:
+        """Replace the in-memory index with the one on disk (empty if there is none).
+
+        Callers hold the lock, so the metadata and vector rows always belong together.
+        Mapped, the rows are a read-only view of the file, which stays valid after a
+        writer replaces it; otherwise they are copied into an array that can grow.
+        """
+        self._loaded = True
+        self._reset()
+        try:
+            meta = json.loads(self.meta_path.read_text())
+            size = meta["dim"] * len(meta["entries"])
+            with open(self.vectors_path, "rb") as f:
+                if not mapped:
+                    matrix = array("f")
+                    matrix.fromfile(f, size)
+                elif size:
+                    view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    matrix = memoryview(view).cast("f")[:size]
+                    if len(matrix) < size:
+                        raise EOFError
+                else:
+                    matrix = array("f")
+        except (OSError, ValueError, TypeError, KeyError, EOFError):
+            return
+        self.dim = meta["dim"]
+        self.entries = [SemanticEntry(*e) for e in meta["entries"]]
+        self.matrix = matrix
+
+    def _reset(self) -> None:
+        self.dim = 0
+        self.entries = []
+        self.matrix = array("f")
+
+    def _save(self) -> None:
+        """Write the vector matrix and metadata.
+
+        Callers hold the lock and have just re-read the index, so neither file is
+        written from a stale copy.
+        """
+        meta = {"dim": self.dim, "entries": [list(e) for e in self.entries]}
+        write_atomic(self.vectors_path, self.matrix.tobytes())
+        write_atomic(self.meta_path, json.dumps(meta))
+
+    def _row(self, i: int) -> array | memoryview:
+        return self.matrix[i * self.dim : (i + 1) * self.dim]
+
+    def _scores(self, query: array, rows: list[bool]) -> Iterator[float]:
+        """Dot products of query with the rows marked True, in one pass over the matrix."""
+        values = self.matrix
+        if not all(rows):
+            values = compress(values, chain.from_iterable(repeat(r, self.dim) for r in rows))
+        products = map(mul, cycle(query), values)
+        return map(sum, zip(*[products] * self.dim))
+
+    def lookup(
+        self, vector: list[float], model: str, fingerprint: str
+    ) -> tuple[SemanticEntry, float] | None:
+        """Return the most similar entry for the same model and environment above threshold."""
+        self._load()
+        query = _normalize(vector)
+        best: tuple[SemanticEntry, float] | None = None
+        if len(query) == self.dim:
+            rows = [e.model == model and e.fingerprint == fingerprint for e in self.entries]
+            candidates = (e for e, r in zip(self.entries, rows) if r)
+            for entry, score in zip(candidates, self._scores(query, rows)):
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (entry, score)
+        with self._usage() as conn:
+            _bump(conn, "misses" if best is None else "hits")
+            if best is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO used (key, last_used) VALUES (?, ?)",
+                    (_entry_key(best[0]), time.time()),
+                )
+        return best
+
+    def _append(
+        self,
+        vector: list[float],
+        model: str,
+        fingerprint: str,
+        task: str,
+        command: str,
+        explanation: str | None,
+    ) -> None:
+        vec = _normalize(vector)
+        if len(vec) != self.dim:
+            # Embedding model changed: old vectors are not comparable.
+            self.dim = len(vec)
+            self.entries = []
+            self.matrix = array("f")
+        self.entries.append(
+            SemanticEntry(
+                model, fingerprint, normalize_task(task), command, explanation, time.time()
+            )
+        )
+        self.matrix.extend(vec)
+
+    def _evict(self) -> None:
+        """Drop least recently used entries past max_entries, with their usage rows."""
+        if len(self.entries) <= self.max_entries:
+            return
+        with self._usage() as conn:
+            used = dict(conn.execute("SELECT key, last_used FROM used").fetchall())
+            keys = [_entry_key(e) for e in self.entries]
+            last_used = [max(e.last_used, used.get(k, 0.0)) for e, k in zip(self.entries, keys)]
+            keep = sorted(range(len(self.entries)), key=last_used.__getitem__, reverse=True)[
+                : self.max_entries
+            ]
+            keep.sort()
+            kept = {keys[i] for i in keep}
+            conn.executemany(
+                "DELETE FROM used WHERE key = ?", [(k,) for k in used if k not in kept]
+            )
+        matrix = array("f")
+        for i in keep:
+            matrix.extend(self._row(i))
+        self.entries = [self.entries[i] for i in keep]
+        self.matrix = matrix
+
+    def add(
+        self,
+        vector: list[float],
+        model: str,
+        fingerprint: str,
+        task: str,
+        command: str,
+        explanation: str | None,
+    ) -> None:
+        """Store a response vector, evicting least recently used entries past max_entries."""
+        with locked(self.meta_path):
+            self._read()
+            self._append(vector, model, fingerprint, task, command, explanation)
+            self._evict()
+            self._save()
+
+    def stats(self) -> dict[str, int | float]:
+        """Return entry count, dimension and hit/miss counters."""
+        self._load()
+        with self._usage() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": len(self.entries),
+            "dim": self.dim,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> int:
+        """Delete all vectors and reset counters. Returns the number of entries removed."""
+        with locked(self.meta_path):
+            self._read()
+            removed = len(self.entries)
+            self._reset()
+            self._save()
+        with self._usage() as conn:
+            conn.execute("DELETE FROM counters")
+            conn.execute("DELETE FROM used")
+        return removed
+
+    def rebuild(
+        self,
+        history: Iterable[dict],
+        embed: Callable[[list[str]], list[list[float]]],
+        fingerprint: str,
+        default_model: str | None = None,
+    ) -> int:
+        """Replace the index with executed commands from history, embedding in batches.
+
+        history yields entries oldest first, as HistoryStore.find returns them. Only
+        the latest command per (model, task) is kept. Entries logged without a model
+        ("auto", from earlier runs without -m) are indexed under default_model, the
+        model such runs resolve to now, or skipped if it is not given, since lookups
+        only match the model a request resolved to. Returns the number indexed.
+        """
+        latest: dict[tuple[str, str], tuple[str, str]] = {}
+        for entry in history:
+            if entry.get("action") != "execute":
+                continue
+            model = entry.get("model") or "auto"
+            if model == "auto":
+                model = default_model
+            task = normalize_task(entry.get("task", ""))
+            if model and task and entry.get("command"):
+                latest[(model, task)] = (task, entry["command"])
+
+        items = iter(latest.items())
+        embedded = []
+        while batch := list(islice(items, EMBED_BATCH_SIZE)):
+            embedded += zip(batch, embed([task for _, (task, _) in batch]), strict=True)
+
+        with locked(self.meta_path):
+            self._reset()
+            for ((model, _), (task, command)), vector in embedded:
+                self._append(vector, model, fingerprint, task, command, None)
+            self._evict()
+            self._save()
+        with self._usage() as conn:
+            conn.execute("DELETE FROM used")
+        return len(self.entries)
@@ -1,14 +1,180 @@
 """Ollama readiness checks: server reachable, model available."""
 
+import json
+import socket
 import subprocess
 import sys
+import threading
 import time
+from collections.abc import Iterator
 from shutil import which as shutil_which
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 
 import click
-import psutil
-from ollama import list as ollama_list
-from ollama import pull as ollama_pull
+
+from ai_cli.client import get_async_client, get_client, ollama_host
+from ai_cli.config import CONFIG_PATH, get_generation_options, load_config
+from ai_cli.files import locked, write_atomic
+
+if TYPE_CHECKING:
+    from ollama import ListResponse, ProcessResponse, ProgressResponse
+
+# ollama (httpx, pydantic) and psutil are imported on first use, not at startup,
+# so `ai --help`, `ai --version` and most cache hits don't pay for them (picking
+# from a `models` list needs the inventory, which is only read from models.json
+# while it is fresh). Requests go through the shared client from ai_cli.client.
+
+
+def ollama_list() -> "ListResponse":
+    """List installed models."""
+    return get_client().list()
+
+
+def ollama_pull(model: str, stream: bool = False) -> "Iterator[ProgressResponse]":
+    """Pull a model, yielding progress updates when streaming."""
+    return get_client().pull(model, stream=stream)
+
+
+INVENTORY_PATH = CONFIG_PATH.parent / "models.json"
+
+DEFAULT_INVENTORY_TTL = 60
+DEFAULT_RUNNING_TTL = 10
+
+# Installed models (name -> size in bytes) with when they were listed
+_inventory: tuple[float, dict[str, int]] | None = None
+# Loaded models with when they were listed; this changes as ollama loads and unloads
+_running: tuple[float, set[str]] | None = None
+
+
+def _inventory_host() -> str:
+    return ollama_host() or ""
+
+
+def _read_state() -> dict:
+    """The persisted inventory and running set, or {} if missing or for another host."""
+    try:
+        state = json.loads(INVENTORY_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("host") == _inventory_host() else {}
+
+
+def _write_state(**updates: object) -> None:
+    """Merge updates into the persisted state, keeping the other entries."""
+    try:
+        with locked(INVENTORY_PATH):
+            state = {**_read_state(), **updates, "host": _inventory_host()}
+            write_atomic(INVENTORY_PATH, json.dumps(state))
+    except OSError:
+        pass
+
+
+def installed_models(ttl: float = 0) -> dict[str, int]:
+    """Return installed model names mapped to their size in bytes.
+
+    With ttl > 0, a listing made within the last ttl seconds is reused, whether by
+    this process or by another one (it is saved to models.json); otherwise the
+    server is asked at most once per process. Raises ConnectionError if the server
+    is unreachable.
+    """
+    known = _known_inventory(ttl)
+    if known is not None:
+        return known
+    return _remember_inventory(ollama_list())
+
+
+async def installed_models_async(ttl: float = 0) -> dict[str, int]:
+    """Async twin of installed_models, sharing its in-process and on-disk inventory."""
+    known = _known_inventory(ttl)
+    if known is not None:
+        return known
+    return _remember_inventory(await get_async_client().list())
+
+
+def _known_inventory(ttl: float) -> dict[str, int] | None:
+    """The inventory from this process or the state file; with ttl > 0, only if younger."""
+    global _inventory
+    if ttl <= 0:
+        return _inventory[1] if _inventory is not None else None
+    now = time.time()
+    if _inventory is None or now - _inventory[0] > ttl:
+        state = _read_state()
+        if "models" in state:
+            _inventory = (state.get("ts", 0), state["models"])
+    if _inventory is not None and now - _inventory[0] <= ttl:
+        return _inventory[1]
+    return None
+
+
+def _remember_inventory(response: "ListResponse") -> dict[str, int]:
+    """Keep a fresh server listing for this process and persist it for later ones."""
+    global _inventory
+    _inventory = (time.time(), {m.model: int(m.size or 0) for m in response.models})
+    _write_state(ts=_inventory[0], models=_inventory[1])
+    return _inventory[1]
+
+
+def invalidate_inventory() -> None:
+    """Forget the inventory in memory and on disk, e.g. after pulling a model."""
+    global _inventory
+    _inventory = None
+    INVENTORY_PATH.unlink(missing_ok=True)
+
+
+def running_models(ttl: float = 0) -> set[str]:
+    """Return the names of the models the server currently has loaded.
+
+    With ttl > 0, a listing made within the last ttl seconds is reused, whether by
+    this process or by another one (it is saved alongside the inventory).
+    Raises ConnectionError if the server is unreachable.
+    """
+    known = _known_running(ttl)
+    if known is not None:
+        return known
+    return _remember_running(get_client().ps())
+
+
+async def running_models_async(ttl: float = 0) -> set[str]:
+    """Async twin of running_models, sharing its in-process and on-disk cache."""
+    known = _known_running(ttl)
+    if known is not None:
+        return known
+    return _remember_running(await get_async_client().ps())
+
+
+def _known_running(ttl: float) -> set[str] | None:
+    """The running set from this process or the state file, if younger than ttl."""
+    global _running
+    if ttl <= 0:
+        return None
+    now = time.time()
+    if _running is None or now - _running[0] > ttl:
+        state = _read_state()
+        if "running" in state:
+            _running = (state.get("running_ts", 0), set(state["running"]))
+    if _running is not None and now - _running[0] <= ttl:
+        return _running[1]
+    return None
+
+
+def _remember_running(response: "ProcessResponse") -> set[str]:
+    global _running
+    _running = (time.time(), {m.model for m in response.models})
+    _write_state(running_ts=_running[0], running=sorted(_running[1]))
+    return _running[1]
+
+
+def _forget_running() -> None:
+    """Drop the cached running set, e.g. after loading a model."""
+    global _running
+    _running = None
+    _write_state(running_ts=0)
+
+
+def is_installed(model: str, installed: dict[str, int]) -> bool:
+    """Check a model name against the inventory, allowing an implicit :latest tag."""
+    return model in installed or (":" not in model and f"{model}:latest" in installed)
 
 
 def _fmt_size(size_bytes: int | float) -> str:
@@ -20,57 +186,201 @@ def _fmt_size(size_bytes: int | float) -> str:
     return f"{size_bytes:.1f} PB"
 
 
-def ensure_server() -> None:
-    """Ensure ollama server is reachable, auto-starting if needed."""
+DEFAULT_SERVER_START_TIMEOUT = 10
+
+_OLLAMA_PORT = 11434
+_FIRST_POLL_DELAY = 0.005
+_MAX_POLL_DELAY = 0.25
+
+
+def _server_address() -> tuple[str, int]:
+    """Host and port of the ollama server, resolved the way the ollama client does."""
+    host = ollama_host() or ""
+    default_port = _OLLAMA_PORT
+    if "://" in host:
+        default_port = 443 if host.startswith("https://") else 80
+    else:
+        host = "http://" + host
+    parts = urlsplit(host)
+    hostname = parts.hostname or "127.0.0.1"
+    if hostname in ("0.0.0.0", "::"):
+        hostname = "127.0.0.1"  # a listen-all address is reached through loopback
+    return hostname, parts.port or default_port
+
+
+def _port_open(address: tuple[str, int], timeout: float = 0.05) -> bool:
+    """Cheap TCP connect check, so polling doesn't pay for a full HTTP request."""
     try:
-        ollama_list()
-    except ConnectionError:
-        if shutil_which("ollama") is None:
-            click.secho(
-                "ollama is not installed. Install it: https://ollama.com/download",
-                fg="red",
-                err=True,
-            )
-            sys.exit(1)
-
-        click.secho("starting ollama...", fg="bright_black", err=True)
-        subprocess.Popen(
-            ["ollama", "serve"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        # Wait for server to become ready
-        for _ in range(10):
-            time.sleep(1)
+        with socket.create_connection(address, timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _poll_schedule(process: subprocess.Popen, timeout: float) -> Iterator[float | str]:
+    """Drive readiness polling: yields 0.0 when it is time to probe, a delay to sleep,
+    or a final reason string when the server cannot come up.
+
+    Shared by the sync and async waits, which only differ in how they sleep and probe.
+    """
+    deadline = time.monotonic() + timeout
+    delay = _FIRST_POLL_DELAY
+    while True:
+        code = process.poll()
+        if code is not None:
+            yield f"ollama serve exited with code {code}"
+            return
+        yield 0.0
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            yield f"ollama did not start within {timeout:g}s"
+            return
+        yield min(delay, remaining)
+        delay = min(delay * 2, _MAX_POLL_DELAY)
+
+
+def _wait_for_server(process: subprocess.Popen, timeout: float) -> str | None:
+    """Poll a freshly started server with exponential backoff until it answers.
+
+    Returns None once it is ready, or why it is not: the process exited, or
+    timeout seconds passed.
+    """
+    address = _server_address()
+    for step in _poll_schedule(process, timeout):
+        if isinstance(step, str):
+            return step
+        if step:
+            time.sleep(step)
+        elif _port_open(address):
             try:
-                ollama_list()
-                break
+                _remember_inventory(ollama_list())
+                return None
             except ConnectionError:
-                continue
-        else:
-            click.secho("ollama failed to start", fg="red", err=True)
-            sys.exit(1)
+                pass
+    return None
+
+
+async def _wait_for_server_async(process: subprocess.Popen, timeout: float) -> str | None:
+    """Async twin of _wait_for_server."""
+    import asyncio
+
+    address = _server_address()
+    for step in _poll_schedule(process, timeout):
+        if isinstance(step, str):
+            return step
+        if step:
+            await asyncio.sleep(step)
+        elif await asyncio.to_thread(_port_open, address):
+            try:
+                _remember_inventory(await get_async_client().list())
+                return None
+            except ConnectionError:
+                pass
+    return None
+
+
+def _start_server() -> tuple[subprocess.Popen, float]:
+    """Launch `ollama serve`, or exit if ollama is not installed. Returns it with its deadline."""
+    if shutil_which("ollama") is None:
+        click.secho(
+            "ollama is not installed. Install it: https://ollama.com/download",
+            fg="red",
+            err=True,
+        )
+        sys.exit(1)
+
+    click.secho("starting ollama...", fg="bright_black", err=True)
+    process = subprocess.Popen(
+        ["ollama", "serve"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return process, load_config().get("server_start_timeout", DEFAULT_SERVER_START_TIMEOUT)
 
 
-def ensure_ready(model: str) -> None:
-    """Ensure ollama server is reachable and the target model is available."""
+def _server_failed(reason: str) -> None:
+    click.secho(f"ollama failed to start: {reason}", fg="red", err=True)
+    sys.exit(1)
+
+
+def ensure_server() -> None:
+    """Ensure ollama server is reachable, auto-starting if needed.
+
+    The server is always asked (a saved inventory says nothing about whether it is
+    still up), and the listing it returns refreshes the inventory.
+    """
+    try:
+        _remember_inventory(ollama_list())
+    except ConnectionError:
+        reason = _wait_for_server(*_start_server())
+        if reason is not None:
+            _server_failed(reason)
+
+
+async def ensure_server_async() -> None:
+    """Async twin of ensure_server."""
+    try:
+        _remember_inventory(await get_async_client().list())
+    except ConnectionError:
+        reason = await _wait_for_server_async(*_start_server())
+        if reason is not None:
+            _server_failed(reason)
+
+
+def warm_model(
+    model: str, keep_alive: str | int | None = None, options: dict | None = None
+) -> float | None:
+    """Load a model into server memory with an empty request.
+
+    Returns the server-reported load time in seconds, or None if it is unavailable.
+    keep_alive defaults to the `keep_alive` config key and options to the model's
+    generation options, so the model is loaded with the context size chat requests
+    use (ollama reloads a model when num_ctx changes).
+    """
+    config = load_config()
+    if keep_alive is None:
+        keep_alive = config.get("keep_alive")
+    if options is None:
+        options = get_generation_options(config, model)
+    response = get_client().generate(model=model, prompt="", keep_alive=keep_alive, options=options)
+    _forget_running()
+    load = getattr(response, "load_duration", None)
+    return load / 1e9 if isinstance(load, int) else None
+
+
+def _warm_quietly(model: str) -> None:
+    """Background warm-up: failures only mean the chat request loads the model itself."""
+    try:
+        warm_model(model)
+    except Exception:
+        pass
+
+
+def ensure_ready(model: str, warm: bool = False) -> None:
+    """Ensure ollama server is reachable and the target model is available.
+
+    With warm, the model is then loaded in a background thread so its load time
+    overlaps with building the prompt and checking the caches.
+    """
     ensure_server()
 
     try:
-        response = ollama_list()
+        installed = installed_models()
     except ConnectionError:
         click.secho("ollama is not running", fg="red", err=True)
         sys.exit(1)
 
-    # Check if model is already available
-    installed = {m.model for m in response.models}
-    if model in installed:
-        return
-    # Handle implicit :latest tag (e.g. "gemini-3-flash-preview" matches "gemini-3-flash-preview:latest")
-    if ":" not in model and f"{model}:latest" in installed:
-        return
+    # Check if model is already available ("gemini-3-flash-preview" also matches ":latest")
+    if not is_installed(model, installed):
+        _pull_model(model)
+
+    if warm:
+        threading.Thread(target=_warm_quietly, args=(model,), daemon=True).start()
 
-    # Step 4: Ask user before pulling the missing model
+
+def _pull_model(model: str) -> None:
+    """Ask the user, then pull a missing model with progress and a RAM size warning."""
+    # Ask user before pulling the missing model
     click.secho(
         f"Ollama is running, but model '{model}' is not installed.",
         fg="yellow",
@@ -81,6 +391,8 @@ def ensure_ready(model: str) -> None:
         sys.exit(1)
 
     click.secho(f"Pulling model {model}...", fg="yellow", err=True)
+    import psutil
+
     ram_total = psutil.virtual_memory().total
     seen_digests: dict[str, int] = {}
     total_size = 0
@@ -126,6 +438,7 @@ def ensure_ready(model: str) -> None:
                     nl=False,
                 )
         click.secho("", err=True)
+        invalidate_inventory()
     except Exception as e:
         click.secho(f"\nFailed to pull model {model}: {e}", fg="red", err=True)
         sys.exit(1)
@@ -0,0 +1,131 @@
+"""Per-model latency statistics used to order candidate models."""
+
+import json
+import math
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from ai_cli.config import CONFIG_PATH
+from ai_cli.files import locked, write_atomic
+
+STATS_PATH = CONFIG_PATH.parent / "model_stats.json"
+
+DEFAULT_STATS_HALF_LIFE_DAYS = 7
+STATS_SAMPLES = 50
+
+
+def _quantile(samples: list[tuple[float, float]], q: float) -> float:
+    """Weighted quantile of (value, weight) pairs."""
+    samples = sorted(samples)
+    target = q * sum(w for _, w in samples)
+    seen = 0.0
+    for value, weight in samples:
+        seen += weight
+        if seen >= target:
+            return value
+    return samples[-1][0]
+
+
+class ModelStats:
+    """Recent wall times, time to first token and failures per model, in one JSON file.
+
+    Each model keeps its last STATS_SAMPLES samples as [timestamp, total, ttft].
+    Quantiles weight samples by age with a half-life, so a model that got faster
+    or slower is re-ranked within days rather than after hundreds of requests.
+    With recording off, the numbers are read but nothing is written.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        half_life_days: float = DEFAULT_STATS_HALF_LIFE_DAYS,
+        recording: bool = True,
+    ) -> None:
+        self.path = path or STATS_PATH
+        self.half_life_s = half_life_days * 86400
+        self.recording = recording
+        self._models: dict[str, dict] | None = None
+
+    def _load(self) -> dict[str, dict]:
+        if self._models is None:
+            try:
+                self._models = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._models = {}
+        return self._models
+
+    def _update(self, model: str, change: Callable[[dict], None]) -> None:
+        """Apply change to model's entry on disk; a failed save only drops this sample."""
+        if not self.recording:
+            return
+        try:
+            with locked(self.path):
+                try:
+                    models = json.loads(self.path.read_text())
+                except (OSError, ValueError):
+                    models = {}
+                change(models.setdefault(model, {"requests": 0, "failures": 0, "samples": []}))
+                write_atomic(self.path, json.dumps(models))
+        except Exception:
+            return
+        self._models = models
+
+    def record(self, model: str, total: float, ttft: float | None = None) -> None:
+        """Record one answered request."""
+
+        def change(entry: dict) -> None:
+            entry["requests"] += 1
+            entry["samples"] = [*entry["samples"], [time.time(), total, ttft]][-STATS_SAMPLES:]
+
+        self._update(model, change)
+
+    def record_failure(self, model: str) -> None:
+        """Record one request that raised instead of answering."""
+
+        def change(entry: dict) -> None:
+            entry["requests"] += 1
+            entry["failures"] += 1
+
+        self._update(model, change)
+
+    def summary(self, model: str) -> dict[str, float] | None:
+        """Return request and failure counts with decayed p50/p95, or None if never used."""
+        entry = self._load().get(model)
+        if entry is None:
+            return None
+        now = time.time()
+        totals, ttfts = [], []
+        for ts, total, ttft in entry["samples"]:
+            weight = 0.5 ** ((now - ts) / self.half_life_s)
+            totals.append((total, weight))
+            if ttft is not None:
+                ttfts.append((ttft, weight))
+        summary = {"requests": entry["requests"], "failures": entry["failures"]}
+        if totals:
+            summary["p50"] = _quantile(totals, 0.5)
+            summary["p95"] = _quantile(totals, 0.95)
+        if ttfts:
+            summary["ttft_p50"] = _quantile(ttfts, 0.5)
+            summary["ttft_p95"] = _quantile(ttfts, 0.95)
+        return summary
+
+    def models(self) -> list[str]:
+        """Models with recorded statistics."""
+        return sorted(self._load())
+
+    def rank(self, models: list[str]) -> list[str]:
+        """Order models fastest first by p50, inflated by their failure rate.
+
+        Models without samples go first, in their given order, so each is measured once.
+        """
+
+        def expected(model: str) -> float:
+            summary = self.summary(model)
+            if summary is None:
+                return 0.0
+            if "p50" not in summary:
+                return math.inf  # only ever failed
+            return summary["p50"] * (1 + summary["failures"] / summary["requests"])
+
+        return sorted(models, key=expected)
@@ -0,0 +1,116 @@
+"""Executables on PATH, indexed in one pass and cached across runs."""
+
+import json
+import os
+
+from ai_cli.config import CONFIG_PATH
+from ai_cli.files import write_atomic
+
+PATH_INDEX_PATH = CONFIG_PATH.parent / "path_index.json"
+
+# Executables mentioned in the prompt when found, unless config sets `tools`
+DEFAULT_TOOLS = [
+    "brew",
+    "uv",
+    "docker",
+    "podman",
+    "git",
+    "kubectl",
+    "rg",
+    "fd",
+    "jq",
+    "systemctl",
+]
+
+# How a tool is named in the prompt, when not by its executable
+_TOOL_LABELS = {"brew": "Homebrew", "docker": "Docker", "podman": "Podman"}
+
+_Stamp = tuple[str, list[int | None]]
+
+# The index for this process, with the stamp it was built for
+_index: tuple[_Stamp, frozenset[str]] | None = None
+
+
+def _path_dirs(path: str | None = None) -> list[str]:
+    if path is None:
+        path = os.environ.get("PATH", "")
+    return [d for d in path.split(os.pathsep) if d]
+
+
+def _stamp(dirs: list[str]) -> _Stamp:
+    """PATH plus each directory's mtime: any install or removal changes it."""
+    mtimes: list[int | None] = []
+    for d in dirs:
+        try:
+            mtimes.append(os.stat(d).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return os.pathsep.join(dirs), mtimes
+
+
+def _scan(dirs: list[str]) -> frozenset[str]:
+    """Names of all executable files in dirs, listing each directory once."""
+    names = set()
+    for d in dirs:
+        try:
+            entries = os.scandir(d)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir() or entry.name in names:
+                        continue
+                except OSError:
+                    continue
+                if os.access(entry.path, os.X_OK):
+                    names.add(entry.name)
+    return frozenset(names)
+
+
+def _read_index(stamp: _Stamp) -> frozenset[str] | None:
+    try:
+        state = json.loads(PATH_INDEX_PATH.read_text())
+    except (OSError, ValueError):
+        return None
+    if [state.get("path"), state.get("mtimes")] != list(stamp):
+        return None
+    return frozenset(state.get("names", []))
+
+
+def _write_index(stamp: _Stamp, names: frozenset[str]) -> None:
+    state = {"path": stamp[0], "mtimes": stamp[1], "names": sorted(names)}
+    try:
+        write_atomic(PATH_INDEX_PATH, json.dumps(state))
+    except OSError:
+        pass
+
+
+def path_executables(path: str | None = None) -> frozenset[str]:
+    """Return the names of all executables on path, by default this process's PATH.
+
+    The index is rebuilt only when PATH or the mtime of one of its directories
+    changes; otherwise it comes from memory or from the file saved by an earlier run,
+    so checking it costs one stat per PATH directory.
+    """
+    global _index
+    dirs = _path_dirs(path)
+    stamp = _stamp(dirs)
+    if _index is not None and _index[0] == stamp:
+        return _index[1]
+    names = _read_index(stamp)
+    if names is None:
+        names = _scan(dirs)
+        _write_index(stamp, names)
+    _index = (stamp, names)
+    return names
+
+
+def available_tools(config: dict, path: str | None = None) -> list[str]:
+    """Prompt labels of the configured tools found on PATH (or path), in configured order."""
+    executables = path_executables(path)
+    return [
+        _TOOL_LABELS.get(name, name)
+        for name in config.get("tools", DEFAULT_TOOLS)
+        if name in executables
+    ]
@@ -0,0 +1,38 @@
+"""Shared fixtures: keep on-disk state out of the real ~/.config/ai-cli."""
+
+from unittest.mock import patch
+
+import pytest
+
+from ai_cli.fake_server import FakeOllama
+
+
+@pytest.fixture(autouse=True)
+def _isolated_state(tmp_path):
+    with (
+        patch("ai_cli.cache.CACHE_PATH", tmp_path / "cache.sqlite3"),
+        patch("ai_cli.daemon.SOCKET_PATH", tmp_path / "daemon.sock"),
+        patch("ai_cli.history.HISTORY_DB_PATH", tmp_path / "history.sqlite3"),
+        patch("ai_cli.history.LEGACY_HISTORY_PATH", tmp_path / "history.jsonl"),
+        patch("ai_cli.semantic.SEMANTIC_PATH", tmp_path / "semantic"),
+        patch("ai_cli.setup.INVENTORY_PATH", tmp_path / "models.json"),
+        patch("ai_cli.setup._inventory", None),
+        patch("ai_cli.setup._running", None),
+        patch("ai_cli.stats.STATS_PATH", tmp_path / "model_stats.json"),
+        patch("ai_cli.tools.PATH_INDEX_PATH", tmp_path / "path_index.json"),
+        patch("ai_cli.tools._index", None),
+        patch.dict("ai_cli.client._clients", clear=True),
+    ):
+        yield
+
+
+@pytest.fixture()
+def fake_ollama():
+    """A running fake ollama server that the shared client talks to."""
+    with FakeOllama() as fake:
+        config = {"host": fake.url}
+        with (
+            patch("ai_cli.client.load_config", return_value=config),
+            patch("ai_cli.setup.load_config", return_value=config),
+        ):
+            yield fake
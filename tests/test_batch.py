@@ -0,0 +1,93 @@
+"""Tests for batch mode."""
+
+import io
+import json
+import threading
+import time
+
+from ai_cli.batch import run_batch
+from ai_cli.llm import LLMResponse
+
+
+def _ask(task):
+    if task == "fail":
+        raise ConnectionError("refused")
+    if task == "empty":
+        return None
+    if task == "slow":
+        time.sleep(0.05)
+    return LLMResponse(command=f"echo {task}", model="llama3", timing={"total": 0.1})
+
+
+def _records(out):
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_run_batch_writes_one_record_per_task_and_skips_blank_lines():
+    out = io.StringIO()
+    summary = run_batch(["a\n", "\n", "  fail \n", "empty\n"], _ask, out)
+
+    records = sorted(_records(out), key=lambda r: r["task"])
+    assert [r["task"] for r in records] == ["a", "empty", "fail"]
+    assert records[0] == {
+        "task": "a",
+        "model": "llama3",
+        "command": "echo a",
+        "explanation": None,
+        "timing": {"total": 0.1},
+        "error": None,
+    }
+    assert records[1]["error"] == "no command generated"
+    assert records[2]["error"] == "refused"
+    assert summary["tasks"] == 3
+    assert summary["errors"] == 2
+
+
+def test_run_batch_ordered_keeps_input_order():
+    out = io.StringIO()
+    run_batch(["slow", "a", "b"], _ask, out, jobs=3, ordered=True)
+
+    assert [r["task"] for r in _records(out)] == ["slow", "a", "b"]
+
+
+def test_run_batch_completion_order_does_not_wait_for_slow_tasks():
+    out = io.StringIO()
+    run_batch(["slow", "a", "b"], _ask, out, jobs=3)
+
+    assert [r["task"] for r in _records(out)][-1] == "slow"
+
+
+def test_run_batch_bounds_concurrency_and_reads_lazily():
+    in_flight = peak = 0
+    lock = threading.Lock()
+    read = []
+
+    def ask(task):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return LLMResponse(command="true")
+
+    def lines():
+        for i in range(20):
+            read.append(i)
+            yield f"task {i}\n"
+
+    class Out(io.StringIO):
+        read_at_first_write = None
+
+        def write(self, text):
+            if self.read_at_first_write is None:
+                self.read_at_first_write = len(read)
+            return super().write(text)
+
+    out = Out()
+    run_batch(lines(), ask, out, jobs=2)
+
+    assert peak <= 2
+    assert out.read_at_first_write <= 3  # input is consumed only as slots free up
+    assert len(_records(out)) == 20
@@ -0,0 +1,66 @@
+"""Tests for the benchmark runner."""
+
+from unittest.mock import patch
+
+from ai_cli.bench import _percentile, run_bench, summarize
+from ai_cli.llm import LLMResponse
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert _percentile(values, 0.5) == 50.0
+    assert _percentile(values, 0.95) == 95.0
+    assert _percentile(values, 0.99) == 99.0
+    assert _percentile([], 0.5) is None
+
+
+def test_summarize_reports_missing_metrics_as_none():
+    summary = summarize([{"wall": 1.0, "ttft": 0.2}, {"wall": 3.0, "ttft": 0.4}], errors=1)
+
+    assert summary["runs"] == 2
+    assert summary["errors"] == 1
+    assert summary["wall_p50"] == 1.0
+    assert summary["wall_p99"] == 3.0
+    assert summary["ttft_p50"] == 0.2
+    assert summary["load_p50"] is None
+
+
+def test_run_bench_warms_up_then_times_every_task_repeat_times():
+    timing = {"total": 1.0, "ttft": 0.5, "tokens": 11, "eval": 0.5, "load": 2.0}
+    calls = []
+
+    def fake_ask_llm(task, model, **kwargs):
+        assert kwargs["config"]["early_stop"] is False
+        assert kwargs["on_partial"] is not None
+        calls.append((task, model, kwargs["use_cache"]))
+        return LLMResponse(command="ls", model=model, timing=dict(timing))
+
+    with patch("ai_cli.bench.ask_llm", side_effect=fake_ask_llm):
+        report = run_bench(["llama3"], {}, tasks=["a", "b"], repeat=2, warmup=1)
+
+    assert [task for task, _, _ in calls] == ["a", "a", "b", "a", "b"]
+    assert all(use_cache is False for _, _, use_cache in calls)
+    row = report["llama3"]
+    assert row["runs"] == 4
+    assert row["tokens_per_s_p50"] == 22.0
+    assert row["load_p50"] == 2.0
+
+
+def test_run_bench_counts_errors():
+    with patch("ai_cli.bench.ask_llm", side_effect=ConnectionError("refused")):
+        report = run_bench(["llama3"], {}, tasks=["a"], repeat=3, warmup=0)
+
+    assert report["llama3"]["runs"] == 0
+    assert report["llama3"]["errors"] == 3
+    assert report["llama3"]["wall_p50"] is None
+
+
+def test_run_bench_reports_server_timing_for_multiline_answers(fake_ollama):
+    fake_ollama.response = "ls -la\nThis lists every file, including hidden ones."
+    fake_ollama.load_time = 0.01
+
+    report = run_bench(["qwen2.5:7b"], {"host": fake_ollama.url}, tasks=["a"], repeat=2, warmup=0)
+
+    assert report["qwen2.5:7b"]["load_p50"] is not None
+    assert report["qwen2.5:7b"]["eval_p50"] is not None
+    assert report["qwen2.5:7b"]["ttft_p50"] is not None
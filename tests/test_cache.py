@@ -0,0 +1,74 @@
+"""Tests for the persistent response cache."""
+
+import time
+from unittest.mock import patch
+
+from ai_cli.cache import ResponseCache, cache_key, normalize_task
+
+
+def test_normalize_task_collapses_whitespace():
+    assert normalize_task("  find   big\tfiles \n") == "find big files"
+
+
+def test_cache_key_depends_on_model_prompt_and_task():
+    base = cache_key("llama3", "prompt", "list files")
+    assert cache_key("llama3", "prompt", "list   files") == base
+    assert cache_key("qwen2.5:7b", "prompt", "list files") != base
+    assert cache_key("llama3", "other prompt", "list files") != base
+    assert cache_key("llama3", "prompt", "list dirs") != base
+
+
+def test_get_returns_stored_response(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db")
+    cache.put("k", "llama3", "list files", "ls -la", "Lists files")
+    assert cache.get("k") == ("ls -la", "Lists files")
+
+
+def test_get_miss_returns_none(tmp_path):
+    assert ResponseCache(tmp_path / "c.db").get("missing") is None
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db", max_age_days=1)
+    with patch("ai_cli.cache.time.time", return_value=time.time() - 2 * 86400):
+        cache.put("k", "llama3", "list files", "ls", None)
+    assert cache.get("k") is None
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db", max_entries=2)
+    cache.put("a", "m", "task a", "cmd a", None)
+    cache.put("b", "m", "task b", "cmd b", None)
+    cache.get("a")  # a is now more recently used than b
+    cache.put("c", "m", "task c", "cmd c", None)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_stats_counts_hits_and_misses(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db")
+    cache.put("k", "m", "task", "cmd", None)
+    cache.get("k")
+    cache.get("nope")
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size_bytes"] > 0
+
+
+def test_clear_removes_everything(tmp_path):
+    cache = ResponseCache(tmp_path / "c.db")
+    cache.put("k", "m", "task", "cmd", None)
+
+    assert cache.clear() == 1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_default_path_follows_cache_path(tmp_path):
+    with patch("ai_cli.cache.CACHE_PATH", tmp_path / "other.db"):
+        assert ResponseCache().path == tmp_path / "other.db"
@@ -1,3 +1,4 @@
+import json
 import os
 from unittest.mock import patch, MagicMock
 
@@ -5,7 +6,9 @@ from click.testing import CliRunner
 
 from ai_cli import __version__
 from ai_cli.cli import main
+from ai_cli.history import HistoryStore
 from ai_cli.llm import LLMResponse
+from ai_cli.semantic import SemanticCache
 
 
 def test_version_flag():
@@ -114,22 +117,18 @@ def test_copy_to_clipboard():
     mock_run.assert_called_once_with(["pbcopy"], input=b"find . -name '*.py'", check=True)
 
 
-def test_history_logged_on_execute(tmp_path):
-    import json
-
-    history_path = tmp_path / "history.jsonl"
+def test_history_logged_on_execute():
     runner = CliRunner()
     with (
         patch("ai_cli.cli.ensure_server"),
         patch("ai_cli.cli.ensure_ready"),
         patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="echo hi")),
         patch("ai_cli.cli.subprocess.run") as mock_run,
-        patch("ai_cli.cli.HISTORY_PATH", history_path),
     ):
         mock_run.return_value = MagicMock(returncode=0)
         runner.invoke(main, ["say", "hi"], input="e\n")
 
-    entries = [json.loads(line) for line in history_path.read_text().splitlines()]
+    entries = HistoryStore().find()
     assert len(entries) == 1
     assert entries[0]["task"] == "say hi"
     assert entries[0]["command"] == "echo hi"
@@ -138,20 +137,101 @@ def test_history_logged_on_execute(tmp_path):
     assert "model" in entries[0]
 
 
-def test_history_logged_on_abort(tmp_path):
+def test_history_records_cache_hit():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch(
+            "ai_cli.cli.ask_llm",
+            return_value=LLMResponse(command="echo hi", model="llama3", cached=True),
+        ),
+    ):
+        runner.invoke(main, ["say", "hi"], input="a\n")
+
+    entries = HistoryStore().find()
+    assert entries[0]["cached"] is True
+
+
+def test_no_cache_flag_disables_cache():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="echo hi")) as mock_llm,
+    ):
+        runner.invoke(main, ["--no-cache", "say", "hi"], input="a\n")
+
+    assert mock_llm.call_args.kwargs.get("use_cache") is False
+
+
+def test_cache_stats_subcommand():
+    from ai_cli.cache import ResponseCache
+
+    ResponseCache().put("k", "llama3", "say hi", "echo hi", None)
+    runner = CliRunner()
+    result = runner.invoke(main, ["cache", "stats"])
+
+    assert result.exit_code == 0
+    assert "entries: 1" in result.output
+
+
+def test_cache_clear_subcommand():
+    from ai_cli.cache import ResponseCache
+
+    ResponseCache().put("k", "llama3", "say hi", "echo hi", None)
+    runner = CliRunner()
+    result = runner.invoke(main, ["cache", "clear"])
+
+    assert result.exit_code == 0
+    assert ResponseCache().stats()["entries"] == 0
+
+
+def test_cache_rebuild_subcommand(tmp_path):
     import json
 
     history_path = tmp_path / "history.jsonl"
+    entry = {"task": "show disk", "model": "auto", "command": "df -h", "action": "execute"}
+    history_path.write_text(json.dumps(entry) + "\n")
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli._resolve_model", return_value="llama3"),
+        patch("ai_cli.cli.embed_texts", return_value=[[1.0, 0.0]]) as mock_embed,
+    ):
+        result = runner.invoke(main, ["cache", "rebuild"])
+
+    assert result.exit_code == 0
+    assert "Indexed 1" in result.output
+    mock_embed.assert_called_once()
+    assert mock_embed.call_args.args[0] == ["show disk"]
+    semantic = SemanticCache()
+    assert semantic.stats()["entries"] == 1
+    assert semantic.entries[0].model == "llama3"
+
+
+def test_double_dash_keeps_subcommand_name_as_task():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="echo hi")) as mock_llm,
+    ):
+        runner.invoke(main, ["--", "cache", "stats"], input="a\n")
+
+    assert mock_llm.call_args.args[0] == "cache stats"
+
+
+def test_history_logged_on_abort():
     runner = CliRunner()
     with (
         patch("ai_cli.cli.ensure_server"),
         patch("ai_cli.cli.ensure_ready"),
         patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="rm -rf /")),
-        patch("ai_cli.cli.HISTORY_PATH", history_path),
     ):
         runner.invoke(main, ["delete", "everything"], input="a\n")
 
-    entries = [json.loads(line) for line in history_path.read_text().splitlines()]
+    entries = HistoryStore().find()
     assert len(entries) == 1
     assert entries[0]["action"] == "abort"
 
@@ -246,7 +326,7 @@ def test_pick_model_connection_error():
     """_pick_model exits gracefully when ollama is not reachable."""
     from ai_cli.cli import _pick_model
 
-    with patch("ai_cli.cli.ollama_list", side_effect=ConnectionError("refused")):
+    with patch("ai_cli.setup.ollama_list", side_effect=ConnectionError("refused")):
         import pytest
 
         with pytest.raises(SystemExit) as exc_info:
@@ -269,7 +349,7 @@ def test_pick_model_lists_and_selects():
     mock_resp.models = [model_a, model_b]
 
     with (
-        patch("ai_cli.cli.ollama_list", return_value=mock_resp),
+        patch("ai_cli.setup.ollama_list", return_value=mock_resp),
         patch("click.prompt", return_value=2),
     ):
         result = _pick_model()
@@ -282,7 +362,7 @@ def test_big_m_flag_saves_model_after_ensure_ready():
     runner = CliRunner()
     call_order = []
 
-    def track_ensure_ready(model):
+    def track_ensure_ready(model, warm=False):
         call_order.append("ensure_ready")
 
     def track_save_config(data):
@@ -369,3 +449,327 @@ def test_env_var_overrides_config():
 
     # CLI passes model=None; ask_llm internally resolves AI_MODEL
     assert mock_llm.call_args.kwargs.get("model") is None
+
+
+def test_live_line_redraws_partial_command(capsys):
+    from ai_cli.cli import _LiveLine
+
+    live = _LiveLine()
+    live(LLMResponse(command=""))
+    assert not live.shown
+    live(LLMResponse(command="ls -l"))
+    live.clear()
+    output = capsys.readouterr().err
+
+    assert "ls -l" in output
+    assert output.endswith("\r")
+    assert not live.shown
+
+
+def test_timing_flag_shows_timing_summary():
+    runner = CliRunner()
+    timing = {"total": 1.5, "ttft": 0.25, "tokens": 7, "stopped_early": 1, "skipped_chars": 40}
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="ls", timing=timing)),
+    ):
+        result = runner.invoke(main, ["-t", "list", "files"], input="a\n")
+
+    assert "total 1.50s" in result.output
+    assert "first token 0.25s" in result.output
+    assert "7 tokens" in result.output
+    assert "skipped 40 chars" in result.output
+
+
+def test_timing_flag_reports_cache_hit():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="ls", cached=True)),
+    ):
+        result = runner.invoke(main, ["--timing", "list", "files"], input="a\n")
+
+    assert "answered from cache" in result.output
+
+
+def test_server_check_deferred_to_ask_llm_without_explicit_model():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server") as mock_server,
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="echo hi")) as mock_llm,
+    ):
+        runner.invoke(main, ["say", "hi"], input="a\n")
+
+    mock_server.assert_not_called()
+    assert mock_llm.call_args.kwargs["before_request"] is mock_server
+
+
+def test_config_loaded_once_and_passed_to_ask_llm():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.load_config", return_value={"timeout": 5}) as mock_load,
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="echo hi")) as mock_llm,
+    ):
+        runner.invoke(main, ["say", "hi"], input="a\n")
+
+    mock_load.assert_called_once()
+    assert mock_llm.call_args.kwargs["config"] == {"timeout": 5}
+
+
+def test_warm_flag_without_task_warms_resolved_model_and_exits():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready") as mock_ready,
+        patch("ai_cli.cli._resolve_model", return_value="qwen2.5:7b"),
+        patch("ai_cli.cli.warm_model", return_value=2.5) as mock_warm,
+        patch("ai_cli.cli.ask_llm") as mock_llm,
+    ):
+        result = runner.invoke(main, ["--warm"])
+
+    assert result.exit_code == 0
+    mock_ready.assert_called_once_with("qwen2.5:7b")
+    assert mock_warm.call_args.args[0] == "qwen2.5:7b"
+    assert "warmed qwen2.5:7b (load 2.50s)" in result.output
+    mock_llm.assert_not_called()
+
+
+def test_warm_flag_with_model_argument():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli.warm_model", return_value=None) as mock_warm,
+    ):
+        result = runner.invoke(main, ["--warm", "-m", "llama3"])
+
+    assert result.exit_code == 0
+    assert mock_warm.call_args.args[0] == "llama3"
+    assert "warmed llama3" in result.output
+
+
+def test_warm_flag_does_not_take_the_task_as_model():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli._resolve_model", return_value="qwen2.5:7b"),
+        patch("ai_cli.cli.warm_model", return_value=None) as mock_warm,
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="ls")) as mock_llm,
+    ):
+        result = runner.invoke(main, ["--warm", "list", "files"], input="a\n")
+
+    assert result.exit_code == 0
+    assert mock_warm.call_args.args[0] == "qwen2.5:7b"
+    assert mock_llm.call_args.args[0] == "list files"
+
+
+def test_warm_on_start_config_passed_to_ensure_ready():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.load_config", return_value={"warm_on_start": True}),
+        patch("ai_cli.cli.ensure_ready") as mock_ready,
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="echo hi")),
+    ):
+        runner.invoke(main, ["-m", "llama3", "say", "hi"], input="a\n")
+
+    mock_ready.assert_called_once_with("llama3", warm=True)
+
+
+def test_task_answered_by_running_daemon():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ask_daemon", return_value=LLMResponse(command="ls")) as mock_daemon,
+        patch("ai_cli.cli.ensure_ready") as mock_ready,
+        patch("ai_cli.cli.ask_llm") as mock_llm,
+    ):
+        result = runner.invoke(main, ["-m", "llama3", "list", "files"], input="a\n")
+
+    assert result.exit_code == 0
+    assert mock_daemon.call_args.kwargs["model"] == "llama3"
+    mock_ready.assert_not_called()
+    mock_llm.assert_not_called()
+
+
+def test_daemon_command_serves_with_configured_idle_timeout():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.daemon_running", return_value=False),
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.load_config", return_value={"daemon_idle_timeout": 60}),
+        patch("ai_cli.cli.serve") as mock_serve,
+    ):
+        result = runner.invoke(main, ["daemon"])
+
+    assert result.exit_code == 0
+    mock_serve.assert_called_once_with(idle_timeout=60)
+
+
+def test_history_logs_model_that_answered():
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="ls", model="fast-model")),
+    ):
+        runner.invoke(main, ["list", "files"], input="a\n")
+
+    assert HistoryStore().find()[0]["model"] == "fast-model"
+
+
+def test_models_stats_shows_recorded_numbers():
+    from ai_cli.stats import ModelStats
+
+    stats = ModelStats()
+    stats.record("llama3", 1.25, ttft=0.5)
+    stats.record_failure("qwen2.5:7b")
+
+    result = CliRunner().invoke(main, ["models", "--stats"])
+
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[1].split()[:6] == ["llama3", "1", "0", "1.25s", "1.25s", "0.50s"]
+    assert lines[2].split()[:3] == ["qwen2.5:7b", "1", "1"]
+    assert "model_strategy: ordered" in result.output
+
+
+def test_models_lists_installed_and_marks_configured():
+    with (
+        patch("ai_cli.cli.installed_models", return_value={"llama3:latest": 4 * 1024**3}),
+        patch("ai_cli.cli.load_config", return_value={"models": ["llama3:latest"]}),
+    ):
+        result = CliRunner().invoke(main, ["models"])
+
+    assert result.output.split() == ["*", "llama3:latest", "4.0", "GB"]
+
+
+def test_bench_against_host_prints_json_without_recording_stats():
+    report = {"llama3": {"runs": 3, "errors": 0, "wall_p50": 1.0}}
+    with (
+        patch("ai_cli.cli.load_config", return_value={}),
+        patch("ai_cli.cli.ensure_server") as mock_server,
+        patch("ai_cli.cli.run_bench", return_value=report) as mock_bench,
+    ):
+        result = CliRunner().invoke(
+            main, ["bench", "-m", "llama3", "--host", "http://127.0.0.1:9", "--json"]
+        )
+
+    assert result.exit_code == 0
+    assert json.loads(result.output[result.output.index("{") :]) == report
+    mock_server.assert_not_called()
+    models, config = mock_bench.call_args.args
+    assert models == ["llama3"]
+    assert config["host"] == "http://127.0.0.1:9"
+    assert config["model_stats"] is False
+
+
+def test_batch_flag_answers_stdin_tasks_without_prompting():
+    def fake_ask_llm(task, **kwargs):
+        assert kwargs["use_cache"] is True
+        return LLMResponse(command=f"echo {task}", model="llama3")
+
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ask_llm", side_effect=fake_ask_llm),
+        patch("ai_cli.cli.subprocess.run") as mock_run,
+    ):
+        result = CliRunner().invoke(main, ["--batch", "-", "--ordered"], input="one\ntwo\n")
+
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.output.splitlines() if line.startswith("{")]
+    assert [(r["task"], r["command"]) for r in lines] == [("one", "echo one"), ("two", "echo two")]
+    assert "2 tasks in" in result.output
+    mock_run.assert_not_called()
+
+
+def test_batch_jobs_against_server_lose_no_shared_state(fake_ollama, tmp_path):
+    # A threshold above 1 never matches, so every task is looked up and then added
+    config = {
+        "host": fake_ollama.url,
+        "semantic_cache": True,
+        "semantic_cache_threshold": 1.01,
+    }
+    tasks = [f"task number {i}" for i in range(60)]
+    with patch("ai_cli.cli.load_config", return_value=config):
+        result = CliRunner().invoke(
+            main, ["--batch", "-", "-j", "16", "-m", "qwen2.5:7b"], input="\n".join(tasks)
+        )
+
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.output.splitlines() if line.startswith("{")]
+    assert sorted(r["task"] for r in records) == sorted(tasks)
+    assert [r["error"] for r in records if r["error"]] == []
+    assert "60 tasks in" in result.output
+    stats = json.loads((tmp_path / "model_stats.json").read_text())
+    assert stats["qwen2.5:7b"]["requests"] == 60
+    semantic = SemanticCache(threshold=1.01).stats()
+    assert (semantic["entries"], semantic["misses"]) == (60, 60)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_recall_executes_command_from_history_without_model():
+    HistoryStore().add("list files", "llama3", "ls -la", "execute")
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.load_config", return_value={"recall": True}),
+        patch("ai_cli.cli.ensure_server") as mock_server,
+        patch("ai_cli.cli.ask_llm") as mock_llm,
+        patch("ai_cli.cli.subprocess.run", return_value=MagicMock(returncode=0)) as mock_run,
+    ):
+        result = runner.invoke(main, ["list", "files"], input="e\n")
+
+    assert result.exit_code == 0
+    assert "from history" in result.output
+    mock_run.assert_called_once_with("ls -la", shell=True)
+    mock_server.assert_not_called()
+    mock_llm.assert_not_called()
+    latest = HistoryStore().find()[0]
+    assert (latest["model"], latest["cached"]) == ("llama3", True)
+
+
+def test_recall_falls_through_to_model_on_request():
+    HistoryStore().add("list files", "llama3", "ls", "execute")
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.load_config", return_value={"recall": True}),
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="ls -la")) as mock_llm,
+    ):
+        result = runner.invoke(main, ["list", "files"], input="m\na\n")
+
+    assert result.exit_code == 0
+    mock_llm.assert_called_once()
+    assert mock_llm.call_args.kwargs["use_cache"] is False
+    assert "ls -la" in result.output
+
+
+def test_recall_fall_through_generates_a_fresh_command(fake_ollama):
+    config = {"recall": True, "host": fake_ollama.url}
+    runner = CliRunner()
+    with patch("ai_cli.cli.load_config", return_value=config):
+        # Answered once and cached, then the user runs a command of their own
+        runner.invoke(main, ["list", "files"], input="a\n")
+        HistoryStore().add("list files", "glm-5:cloud", "ls", "execute")
+        fake_ollama.response = "ls -lah"
+        result = runner.invoke(main, ["list", "files"], input="m\na\n")
+
+    assert result.exit_code == 0
+    assert "from history" in result.output
+    assert "(cached)" not in result.output
+    assert "ls -lah" in result.output
+
+
+def test_recall_off_by_default_and_for_explicit_model():
+    HistoryStore().add("list files", "llama3", "ls", "execute")
+    runner = CliRunner()
+    with (
+        patch("ai_cli.cli.ensure_server"),
+        patch("ai_cli.cli.ensure_ready"),
+        patch("ai_cli.cli.ask_llm", return_value=LLMResponse(command="ls -la")) as mock_llm,
+    ):
+        runner.invoke(main, ["list", "files"], input="a\n")
+        with patch("ai_cli.cli.load_config", return_value={"recall": True}):
+            runner.invoke(main, ["-m", "qwen2.5:7b", "list", "files"], input="a\n")
+
+    assert mock_llm.call_count == 2
@@ -0,0 +1,71 @@
+"""Tests for the shared ollama client."""
+
+from unittest.mock import MagicMock, patch
+
+from ai_cli.client import get_client, ollama_host
+from ai_cli.setup import ollama_list
+
+
+def test_get_client_reuses_instance_for_same_settings():
+    with patch("ollama.Client") as mock_client_cls:
+        first = get_client({"timeout": 5})
+        second = get_client({"timeout": 5})
+
+    assert first is second
+    mock_client_cls.assert_called_once()
+
+
+def test_get_client_new_instance_when_settings_change():
+    with patch("ollama.Client") as mock_client_cls:
+        mock_client_cls.side_effect = lambda **kwargs: MagicMock()
+        assert get_client({"timeout": 5}) is not get_client({"timeout": 10})
+
+
+def test_get_client_passes_host_timeout_and_keepalive():
+    with patch("ollama.Client") as mock_client_cls:
+        get_client({"host": "http://gpu-box:11434", "timeout": 7, "http_keepalive": 90})
+
+    kwargs = mock_client_cls.call_args.kwargs
+    assert kwargs["host"] == "http://gpu-box:11434"
+    assert kwargs["timeout"] == 7
+    assert kwargs["limits"].keepalive_expiry == 90
+    assert kwargs["http2"] is False
+
+
+def test_get_client_http2_requires_h2_package():
+    with (
+        patch("ollama.Client") as mock_client_cls,
+        patch("ai_cli.client.importlib.util.find_spec", return_value=None),
+    ):
+        get_client({"http2": True})
+
+    assert mock_client_cls.call_args.kwargs["http2"] is False
+
+
+def test_ollama_host_prefers_config_over_env():
+    with patch.dict("os.environ", {"OLLAMA_HOST": "http://env:11434"}):
+        assert ollama_host({"host": "http://config:11434"}) == "http://config:11434"
+        assert ollama_host({}) == "http://env:11434"
+
+
+def test_readiness_check_and_chat_share_client():
+    client = MagicMock()
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.client.load_config", return_value={}),
+    ):
+        ollama_list()
+        get_client({}).chat(model="m", messages=[])
+
+    client.list.assert_called_once()
+    client.chat.assert_called_once()
+
+
+def test_is_connection_error_covers_streamed_requests():
+    import httpx
+
+    from ai_cli.client import is_connection_error
+
+    assert is_connection_error(ConnectionError("refused"))
+    assert is_connection_error(httpx.ConnectError("refused"))
+    assert not is_connection_error(ValueError("boom"))
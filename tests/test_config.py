@@ -1,8 +1,15 @@
 """Tests for config file load/save."""
 
 import tomllib
+from unittest.mock import patch
 
-from ai_cli.config import CONFIG_PATH, load_config, save_config
+from ai_cli.config import (
+    CONFIG_PATH,
+    DEFAULT_GENERATION_OPTIONS,
+    get_generation_options,
+    load_config,
+    save_config,
+)
 
 
 def test_load_config_missing_file_returns_empty_dict(tmp_path):
@@ -47,3 +54,62 @@ def test_load_config_malformed_toml_returns_empty_dict(tmp_path):
 def test_config_path_is_xdg():
     assert ".config" in str(CONFIG_PATH)
     assert str(CONFIG_PATH).endswith("config.toml")
+
+
+def test_load_config_parses_unchanged_file_once(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text('model = "llama3"\n')
+
+    with patch("ai_cli.config.tomllib.load", wraps=tomllib.load) as mock_load:
+        load_config(path)
+        load_config(path)
+
+    mock_load.assert_called_once()
+
+
+def test_load_config_reparses_changed_file(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text('model = "llama3"\n')
+    load_config(path)
+    path.write_text('model = "qwen2.5:7b"\n')
+
+    assert load_config(path)["model"] == "qwen2.5:7b"
+
+
+def test_load_config_returns_independent_copies(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text('models = ["llama3"]\n')
+    load_config(path)["models"].append("mutated")
+
+    assert load_config(path)["models"] == ["llama3"]
+
+
+def test_save_config_invalidates_parse_cache(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text('model = "llama3"\n')
+    load_config(path)
+    save_config({"model": "qwen2.5:7b"}, path)
+
+    assert load_config(path)["model"] == "qwen2.5:7b"
+
+
+def test_generation_options_leave_length_and_context_to_the_server():
+    assert get_generation_options({}) == DEFAULT_GENERATION_OPTIONS
+    assert "num_predict" not in DEFAULT_GENERATION_OPTIONS
+    assert "num_ctx" not in DEFAULT_GENERATION_OPTIONS
+
+
+def test_generation_options_global_then_per_model_overrides():
+    config = {
+        "options": {"temperature": 0, "seed": 42, "stop": ["\n\n"]},
+        "model_options": {"qwen2.5:7b": {"num_ctx": 4096, "temperature": 0.5}},
+    }
+
+    assert get_generation_options(config, "llama3") == {
+        **DEFAULT_GENERATION_OPTIONS,
+        "temperature": 0,
+        "seed": 42,
+        "stop": ["\n\n"],
+    }
+    qwen = get_generation_options(config, "qwen2.5:7b")
+    assert (qwen["num_ctx"], qwen["temperature"], qwen["seed"]) == (4096, 0.5, 42)
@@ -0,0 +1,141 @@
+"""Tests for the resident daemon and its socket client."""
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from ai_cli.daemon import DaemonUnavailable, ask_daemon, daemon_running, serve
+from ai_cli.llm import LLMResponse
+
+
+@pytest.fixture()
+def socket_path():
+    # Unix socket paths are limited to ~100 bytes, which pytest's tmp_path can exceed
+    with tempfile.TemporaryDirectory(prefix="ai-") as d:
+        yield Path(d) / "d.sock"
+
+
+@pytest.fixture()
+def running(socket_path):
+    """Start a daemon in a thread; yields the socket path."""
+    thread = threading.Thread(target=serve, args=(socket_path, 2.0), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not daemon_running(socket_path):
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.01)
+    yield socket_path
+
+
+def fake_ask_llm(task, on_partial=None, on_status=None, **kwargs):
+    on_status("using glm-5:cloud")
+    on_partial(LLMResponse(command="ls"))
+    return LLMResponse(command="ls -la", model="glm-5:cloud", timing={"total": 0.5})
+
+
+def test_ask_daemon_without_daemon_is_unavailable(socket_path):
+    with pytest.raises(DaemonUnavailable):
+        ask_daemon("list files", path=socket_path)
+
+
+def test_ask_daemon_streams_partials_and_returns_result(running, capsys):
+    partials = []
+    with (
+        patch("ai_cli.daemon.load_config", return_value={}),
+        patch("ai_cli.daemon.ask_llm", side_effect=fake_ask_llm) as mock_llm,
+    ):
+        result = ask_daemon("list files", verbose=True, on_partial=partials.append, path=running)
+
+    assert result == LLMResponse(command="ls -la", model="glm-5:cloud", timing={"total": 0.5})
+    assert partials == [LLMResponse(command="ls")]
+    assert "using glm-5:cloud" in capsys.readouterr().err
+    kwargs = mock_llm.call_args.kwargs
+    assert kwargs["verbose"] is True
+    assert kwargs["cwd"]
+
+
+def test_ask_daemon_forwards_the_callers_shell_and_path(running, monkeypatch):
+    monkeypatch.setenv("SHELL", "/usr/bin/fish")
+    monkeypatch.setenv("PATH", "/nix/store/bin:/usr/bin")
+    with (
+        patch("ai_cli.daemon.load_config", return_value={}),
+        patch("ai_cli.daemon.ask_llm", side_effect=fake_ask_llm) as mock_llm,
+    ):
+        ask_daemon("list files", path=running)
+
+    assert mock_llm.call_args.kwargs["environ"] == {
+        "SHELL": "/usr/bin/fish",
+        "PATH": "/nix/store/bin:/usr/bin",
+    }
+
+
+def test_ask_daemon_hands_back_missing_model(running):
+    with (
+        patch("ai_cli.daemon.load_config", return_value={}),
+        patch("ai_cli.daemon.installed_models", return_value={"llama3:latest": 1}),
+        patch("ai_cli.daemon.ask_llm") as mock_llm,
+    ):
+        with pytest.raises(DaemonUnavailable, match="not installed"):
+            ask_daemon("list files", model="qwen2.5:7b", path=running)
+
+    mock_llm.assert_not_called()
+
+
+def test_ask_daemon_raises_daemon_errors(running):
+    with (
+        patch("ai_cli.daemon.load_config", return_value={}),
+        patch("ai_cli.daemon.ask_llm", side_effect=ValueError("boom")),
+    ):
+        with pytest.raises(RuntimeError, match="boom"):
+            ask_daemon("list files", path=running)
+
+
+@pytest.mark.parametrize(
+    "error", [ConnectionError("refused"), httpx.ConnectError("Connection refused")]
+)
+def test_ask_daemon_hands_back_when_ollama_is_down(running, error):
+    with (
+        patch("ai_cli.daemon.load_config", return_value={}),
+        patch("ai_cli.daemon.ask_llm", side_effect=error),
+    ):
+        with pytest.raises(DaemonUnavailable, match="ollama unreachable"):
+            ask_daemon("list files", path=running)
+
+
+def test_daemon_serves_concurrent_clients(running):
+    gate = threading.Barrier(3, timeout=5)
+
+    def slow_ask_llm(task, **kwargs):
+        gate.wait()  # only passes once all three requests are in flight together
+        return LLMResponse(command=f"echo {task}")
+
+    results = {}
+
+    def client(task):
+        results[task] = ask_daemon(task, path=running).command
+
+    with (
+        patch("ai_cli.daemon.load_config", return_value={}),
+        patch("ai_cli.daemon.ask_llm", side_effect=slow_ask_llm),
+    ):
+        threads = [threading.Thread(target=client, args=(t,)) for t in ("a", "b", "c")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=5)
+
+    assert results == {"a": "echo a", "b": "echo b", "c": "echo c"}
+
+
+def test_daemon_exits_after_idle_timeout(socket_path):
+    thread = threading.Thread(target=serve, args=(socket_path, 0.2), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert not socket_path.exists()
@@ -0,0 +1,184 @@
+"""End-to-end tests through the real HTTP client against the fake ollama server."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+from ollama import ResponseError
+
+from ai_cli.cli import main
+from ai_cli.client import get_client
+from ai_cli.llm import _resolve_model, ask_llm, ask_llm_async
+from ai_cli.setup import (
+    ensure_ready,
+    ensure_server,
+    ensure_server_async,
+    installed_models,
+    installed_models_async,
+    warm_model,
+)
+
+
+def test_inventory_comes_from_tags_endpoint(fake_ollama):
+    assert installed_models() == {"glm-5:cloud": 400, "qwen2.5:7b": 4_700_000_000}
+    assert ("GET", "/api/tags") in fake_ollama.requests
+
+
+def test_readiness_check_and_chat_share_one_connection(fake_ollama):
+    ensure_server()
+    result = ask_llm("list files", config={"host": fake_ollama.url})
+
+    assert result.command == "ls -la"
+    assert fake_ollama.connections == 1
+
+
+def test_stream_stopped_after_command_line(fake_ollama):
+    fake_ollama.response = "ls -la\n\nThis lists every file, including hidden ones, " * 5
+    fake_ollama.token_rate = 1000
+
+    result = ask_llm("list files", config={"host": fake_ollama.url})
+
+    assert result.command == "ls -la"
+    assert result.timing["stopped_early"] == 1
+    assert result.timing["ttft"] <= result.timing["total"]
+
+
+def test_stream_not_stopped_on_lead_in_line(fake_ollama):
+    fake_ollama.response = "Here is the command:\nls -la\nThis lists every file."
+
+    result = ask_llm("list files", config={"host": fake_ollama.url})
+
+    assert result.command == "ls -la"
+    assert result.timing["stopped_early"] == 1
+    again = ask_llm("list files", config={"host": fake_ollama.url})
+    assert (again.command, again.cached) == ("ls -la", True)
+
+
+def test_answer_without_a_command_is_not_cached(fake_ollama):
+    fake_ollama.response = "Here is the command:\n"
+
+    assert ask_llm("list files", config={"host": fake_ollama.url}).command == (
+        "Here is the command:"
+    )
+    fake_ollama.response = "ls -la"
+    result = ask_llm("list files", config={"host": fake_ollama.url})
+
+    assert (result.command, result.cached) == ("ls -la", False)
+
+
+def test_full_response_reports_server_timing(fake_ollama):
+    fake_ollama.load_time = 0.05
+
+    result = ask_llm("list files", config={"host": fake_ollama.url, "early_stop": False})
+
+    assert result.command == "ls -la"
+    assert result.timing["load"] == pytest.approx(0.05)
+    assert result.timing["tokens"] == 2
+
+
+def test_num_predict_caps_generated_tokens(fake_ollama):
+    fake_ollama.response = "ls -la\n\nThis lists every file, including hidden ones."
+    config = {"host": fake_ollama.url, "early_stop": False, "options": {"num_predict": 2}}
+
+    result = ask_llm("list files", config=config)
+
+    assert result.command == "ls -la"
+    assert result.timing["tokens"] == 2
+
+
+def test_injected_failure_surfaces_as_response_error(fake_ollama):
+    fake_ollama.fail_rate = 1.0
+    fake_ollama.error_status = 503
+
+    with pytest.raises(ResponseError) as exc_info:
+        ask_llm("list files", config={"host": fake_ollama.url})
+
+    assert exc_info.value.status_code == 503
+
+
+def test_latency_beyond_timeout_fails(fake_ollama):
+    fake_ollama.latency = 1.0
+
+    with pytest.raises(Exception, match="timed out"):
+        ask_llm("list files", config={"host": fake_ollama.url, "timeout": 0.1})
+
+
+def test_async_ask_matches_sync_ask(fake_ollama):
+    config = {"host": fake_ollama.url}
+
+    async def run():
+        await ensure_server_async()
+        return await ask_llm_async("list files", use_cache=False, config=config)
+
+    result = asyncio.run(run())
+
+    assert result == ask_llm("list files", use_cache=False, config=config)._replace(
+        timing=result.timing
+    )
+    assert result.command == "ls -la"
+
+
+def test_async_asks_run_concurrently_on_one_loop(fake_ollama):
+    fake_ollama.latency = 0.2
+    config = {"host": fake_ollama.url}
+
+    async def run():
+        return await asyncio.gather(
+            *(ask_llm_async(f"task {i}", use_cache=False, config=config) for i in range(4))
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert [r.command for r in results] == ["ls -la"] * 4
+    assert elapsed < 0.6
+
+
+def test_async_stream_stopped_after_command_line(fake_ollama):
+    fake_ollama.response = "ls -la\n\nThis lists every file, including hidden ones, " * 5
+    fake_ollama.token_rate = 1000
+
+    result = asyncio.run(ask_llm_async("list files", config={"host": fake_ollama.url}))
+
+    assert result.command == "ls -la"
+    assert result.timing["stopped_early"] == 1
+
+
+def test_async_inventory_comes_from_tags_endpoint(fake_ollama):
+    assert asyncio.run(installed_models_async()) == {
+        "glm-5:cloud": 400,
+        "qwen2.5:7b": 4_700_000_000,
+    }
+
+
+def test_pull_installs_missing_model(fake_ollama):
+    with patch("click.confirm", return_value=True):
+        ensure_ready("llama3")
+
+    assert "llama3" in installed_models()
+
+
+def test_warm_loads_model_and_ps_lists_it(fake_ollama):
+    fake_ollama.load_time = 0.02
+
+    assert warm_model("qwen2.5:7b") == pytest.approx(0.02)
+    assert [m.model for m in get_client().ps().models] == ["qwen2.5:7b"]
+
+
+def test_prefer_loaded_resolves_to_model_loaded_by_warm_up(fake_ollama):
+    config = {"host": fake_ollama.url, "models": ["glm-5:cloud", "qwen2.5:7b"]}
+    warm_model("qwen2.5:7b")
+
+    assert _resolve_model(config=config) == "glm-5:cloud"
+    assert _resolve_model(config={**config, "prefer_loaded": True}) == "qwen2.5:7b"
+    assert ("GET", "/api/ps") in fake_ollama.requests
+
+
+def test_bench_runs_offline_against_bundled_server():
+    result = CliRunner().invoke(main, ["bench", "--fake", "-m", "llama3", "-n", "1", "--json"])
+
+    assert result.exit_code == 0
+    assert '"errors": 0' in result.output
@@ -0,0 +1,53 @@
+"""Tests for concurrency-safe state file updates."""
+
+import threading
+
+from ai_cli.files import locked, write_atomic
+
+
+def test_write_atomic_replaces_file_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "state.json"
+    write_atomic(path, "old")
+    write_atomic(path, b"new")
+
+    assert path.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_concurrent_writers_do_not_collide(tmp_path):
+    path = tmp_path / "state.json"
+    errors = []
+
+    def write(i):
+        try:
+            for _ in range(20):
+                write_atomic(path, str(i))
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert path.read_text() in {str(i) for i in range(8)}
+
+
+def test_locked_serializes_threads(tmp_path):
+    path = tmp_path / "counter"
+    path.write_text("0")
+
+    def bump():
+        for _ in range(50):
+            with locked(path):
+                path.write_text(str(int(path.read_text()) + 1))
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert path.read_text() == "200"
@@ -0,0 +1,181 @@
+"""Tests for the SQLite history store."""
+
+import io
+import json
+import time
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from ai_cli.cli import main
+from ai_cli.history import HistoryStore
+
+
+def test_add_and_find_by_filters():
+    store = HistoryStore()
+    store.add("list files", "llama3", "ls", "execute")
+    store.add("show disk", "qwen2.5:7b", "df -h", "abort", cached=True)
+
+    assert [e["command"] for e in store.find()] == ["df -h", "ls"]
+    assert [e["command"] for e in store.find(task="list   files")] == ["ls"]
+    assert [e["command"] for e in store.find(model="qwen2.5:7b")] == ["df -h"]
+    assert [e["command"] for e in store.find(action="execute")] == ["ls"]
+    assert store.find(action="abort")[0]["cached"] is True
+
+
+def test_find_by_time_range():
+    store = HistoryStore()
+    with patch("ai_cli.history.time.time", return_value=1000.0):
+        store.add("old", "m", "echo old", "execute")
+    with patch("ai_cli.history.time.time", return_value=2000.0):
+        store.add("new", "m", "echo new", "execute")
+
+    assert [e["task"] for e in store.find(since=1500)] == ["new"]
+    assert [e["task"] for e in store.find(until=1500)] == ["old"]
+
+
+def test_retention_by_count_and_age():
+    store = HistoryStore(max_entries=2, max_age_days=1)
+    with patch("ai_cli.history.time.time", return_value=time.time() - 2 * 86400):
+        store.add("ancient", "m", "echo", "execute")
+    for i in range(3):
+        store.add(f"task {i}", "m", "echo", "execute")
+
+    assert [e["task"] for e in store.find()] == ["task 2", "task 1"]
+
+
+def test_legacy_jsonl_imported_once(tmp_path):
+    legacy = tmp_path / "history.jsonl"
+    entries = [
+        {
+            "ts": "2026-03-28T12:00:00+00:00",
+            "task": "a",
+            "model": "m",
+            "command": "ls",
+            "action": "execute",
+            "cached": False,
+        },
+        {
+            "ts": "2026-03-28T12:01:00+00:00",
+            "task": "b",
+            "model": "m",
+            "command": "pwd",
+            "action": "copy",
+        },
+    ]
+    legacy.write_text("\n".join(json.dumps(e) for e in entries) + "\nnot json\n")
+
+    assert HistoryStore().stats()["entries"] == 2
+    assert HistoryStore().stats()["entries"] == 2
+    out = io.StringIO()
+    HistoryStore().export(out)
+    exported = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert exported == [{**entries[0]}, {**entries[1], "cached": False}]
+
+
+def test_history_export_subcommand(tmp_path):
+    store = HistoryStore()
+    store.add("list files", "m", "ls", "execute")
+    store.add("delete all", "m", "rm -rf /", "abort")
+    output = tmp_path / "export.jsonl"
+
+    result = CliRunner().invoke(main, ["history", "export", str(output), "--action", "execute"])
+
+    assert result.exit_code == 0
+    assert "Exported 1 entries" in result.output
+    assert json.loads(output.read_text())["command"] == "ls"
+
+
+def test_history_compact_subcommand():
+    store = HistoryStore()
+    for i in range(3):
+        store.add(f"task {i}", "m", "echo", "execute")
+
+    with patch("ai_cli.cli.load_config", return_value={"history_max_entries": 1}):
+        result = CliRunner().invoke(main, ["history", "compact"])
+
+    assert result.exit_code == 0
+    assert "Removed 2 entries, 1 left" in result.output
+
+
+def test_search_matches_word_prefixes_in_task_and_command():
+    store = HistoryStore()
+    store.add("sync site to web server", "m", "rsync -avz site/ web:/srv/", "execute")
+    store.add("list files", "m", "ls -la", "execute")
+
+    assert [r["command"] for r in store.search(["rsyn"])] == ["rsync -avz site/ web:/srv/"]
+    assert [r["command"] for r in store.search(["web", "site"])] == ["rsync -avz site/ web:/srv/"]
+    assert store.search(["site", "files"]) == []
+    assert store.search(['"unbalanced']) == []
+
+
+def test_search_ranks_by_executions_and_recency():
+    store = HistoryStore()
+    with patch("ai_cli.history.time.time", return_value=time.time() - 300 * 86400):
+        for _ in range(3):
+            store.add("backup home", "m", "tar czf old.tgz ~", "execute")
+    store.add("backup home", "m", "restic backup ~", "execute")
+    store.add("backup home", "m", "restic backup ~", "execute")
+    store.add("backup home", "m", "rsync ~ /backup", "copy")
+
+    results = store.search(["backup"])
+
+    assert [r["command"] for r in results] == [
+        "restic backup ~",
+        "rsync ~ /backup",
+        "tar czf old.tgz ~",
+    ]
+    assert results[0]["runs"] == 2
+    assert results[1]["runs"] == 0
+    assert results[2]["runs"] == 3
+
+
+def test_search_filters():
+    store = HistoryStore()
+    store.add("show disk", "llama3", "df -h", "execute")
+    store.add("show disk usage", "qwen2.5:7b", "du -sh .", "abort")
+
+    assert [r["command"] for r in store.search(["disk"], model="llama3")] == ["df -h"]
+    assert [r["command"] for r in store.search(["disk"], action="abort")] == ["du -sh ."]
+    assert store.search(["disk"], since=time.time() + 60) == []
+
+
+def test_search_filters_apply_before_the_match_window():
+    store = HistoryStore()
+    month_ago = time.time() - 40 * 86400
+    with patch("ai_cli.history.time.time", return_value=month_ago):
+        store.add("sync backups", "llama3", "rsync -a old/ backup:", "execute")
+    for i in range(10):
+        store.add("sync site", "qwen2.5:7b", f"rsync -a site{i}/ web:", "execute")
+
+    with patch("ai_cli.history.SEARCH_WINDOW", 5):
+        for fts in (True, False):
+            store.fts = fts
+            expected = ["rsync -a old/ backup:"]
+            assert [r["command"] for r in store.search(["rsync"], until=month_ago + 1)] == expected
+            assert [r["command"] for r in store.search(["rsync"], model="llama3")] == expected
+
+
+def test_search_finds_entries_imported_from_jsonl(tmp_path):
+    entry = {"ts": "2026-03-28T12:00:00+00:00", "task": "t", "model": "m", "command": "rsync a b"}
+    (tmp_path / "history.jsonl").write_text(json.dumps({**entry, "action": "execute"}) + "\n")
+
+    assert HistoryStore().search(["rsync"])[0]["command"] == "rsync a b"
+
+
+def test_pruned_entries_leave_search_index():
+    store = HistoryStore(max_entries=1)
+    store.add("old task", "m", "echo old", "execute")
+    store.add("new task", "m", "echo new", "execute")
+
+    assert [r["command"] for r in store.search(["echo"])] == ["echo new"]
+
+
+def test_history_search_subcommand():
+    HistoryStore().add("sync site", "llama3", "rsync -avz site/ web:/srv/", "execute")
+
+    result = CliRunner().invoke(main, ["history", "search", "rsync"])
+
+    assert result.exit_code == 0
+    assert "rsync -avz site/ web:/srv/" in result.output
+    assert "sync site · llama3 · run 1x" in result.output
@@ -1,5 +1,7 @@
 """Integration tests — verify the tool installs and runs."""
 
+import subprocess
+import sys
 from unittest.mock import patch
 
 from click.testing import CliRunner
@@ -50,3 +52,34 @@ def test_verbose_flag_in_help():
     runner = CliRunner()
     result = runner.invoke(main, ["--help"])
     assert "explanation" in result.output.lower() or "verbose" in result.output.lower()
+
+
+# Generous enough for slow CI runners; importing ollama alone costs more than this.
+IMPORT_BUDGET_US = 250_000
+HEAVY_MODULES = {"ollama", "httpx", "pydantic", "psutil"}
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """Import module in a fresh interpreter and return cumulative import time per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def test_cli_import_skips_heavy_modules():
+    times = _import_times("ai_cli.cli")
+    assert not HEAVY_MODULES & set(times)
+
+
+def test_cli_import_within_budget():
+    times = _import_times("ai_cli.cli")
+    assert times["ai_cli.cli"] < IMPORT_BUDGET_US
@@ -1,16 +1,45 @@
 """Tests for LLM integration."""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from ai_cli.llm import LLMResponse, _detect_env, _parse_verbose_response, _resolve_model, ask_llm
+from ai_cli.llm import (
+    LLMResponse,
+    _add_server_timing,
+    _command_line_end,
+    _detect_env,
+    _parse_partial,
+    _parse_verbose_response,
+    _resolve_model,
+    ask_llm,
+    ask_llm_async,
+)
 
 
 def _mock_client(content: str):
-    """Create a mock Client whose chat() returns given content."""
+    """Create a mock Client whose chat() returns given content, streamed or not."""
     mock_response = MagicMock()
     mock_response.message.content = content
+    mock_response.eval_count = len(content.split())
+
+    def chat(**kwargs):
+        if kwargs.get("stream"):
+            return (part for part in [mock_response])
+        return mock_response
+
+    mock_client_instance = MagicMock()
+    mock_client_instance.chat.side_effect = chat
+    return mock_client_instance
+
+
+def _mock_stream_client(chunks: list[str]):
+    """Create a mock Client whose chat(stream=True) yields the given content chunks."""
+    parts = []
+    for text in chunks:
+        part = MagicMock()
+        part.message.content = text
+        parts.append(part)
     mock_client_instance = MagicMock()
-    mock_client_instance.chat.return_value = mock_response
+    mock_client_instance.chat.return_value = (part for part in parts)
     return mock_client_instance
 
 
@@ -22,8 +51,8 @@ def test_detect_env_returns_os_arch_shell():
     assert "env_context" in env
     assert env["os"]  # non-empty
     assert env["shell"]  # non-empty
-    assert "Working directory" in env["env_context"]
     assert "Home" in env["env_context"]
+    assert env["cwd"]
 
 
 def test_detect_env_reads_shell_from_env():
@@ -36,13 +65,13 @@ def test_ask_llm_returns_command():
     client = _mock_client("ls -la /tmp")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
         result = ask_llm("list files in tmp")
 
-    assert result == LLMResponse(command="ls -la /tmp")
+    assert result._replace(timing=None) == LLMResponse(command="ls -la /tmp", model="glm-5:cloud")
     assert result.command == "ls -la /tmp"
     assert result.explanation is None
     client.chat.assert_called_once()
@@ -51,14 +80,14 @@ def test_ask_llm_returns_command():
     messages = call_kwargs.kwargs["messages"]
     assert messages[0]["role"] == "system"
     assert messages[1]["role"] == "user"
-    assert messages[1]["content"] == "list files in tmp"
+    assert messages[1]["content"].endswith("\nlist files in tmp")
 
 
 def test_ask_llm_system_prompt_includes_env():
     client = _mock_client("echo hi")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
@@ -74,7 +103,7 @@ def test_ask_llm_strips_markdown_backticks():
     client = _mock_client("```bash\nls -la\n```")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
@@ -87,7 +116,7 @@ def test_ask_llm_custom_model():
     client = _mock_client("echo hello")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
     ):
         result = ask_llm("say hello", model="llama3")
@@ -100,7 +129,7 @@ def test_ask_llm_empty_response():
     client = _mock_client("")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
@@ -141,13 +170,15 @@ def test_ask_llm_verbose_returns_explanation_and_command():
     client = _mock_client("EXPLANATION: Lists files sorted by size\nCOMMAND: ls -lS /tmp")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
         result = ask_llm("list files by size", verbose=True)
 
-    assert result == LLMResponse(command="ls -lS /tmp", explanation="Lists files sorted by size")
+    assert result._replace(timing=None) == LLMResponse(
+        command="ls -lS /tmp", explanation="Lists files sorted by size", model="glm-5:cloud"
+    )
 
 
 def test_ask_llm_verbose_fallback_when_no_markers():
@@ -155,20 +186,20 @@ def test_ask_llm_verbose_fallback_when_no_markers():
     client = _mock_client("ls -lS /tmp")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
         result = ask_llm("list files by size", verbose=True)
 
-    assert result == LLMResponse(command="ls -lS /tmp")
+    assert result._replace(timing=None) == LLMResponse(command="ls -lS /tmp", model="glm-5:cloud")
 
 
 def test_ask_llm_verbose_uses_different_system_prompt():
     client = _mock_client("EXPLANATION: test\nCOMMAND: echo hi")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
@@ -183,33 +214,35 @@ def test_ask_llm_uses_timeout_from_config():
     client = _mock_client("echo hi")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client) as mock_client_cls,
+        patch("ollama.Client", return_value=client) as mock_client_cls,
         patch("ai_cli.llm.load_config", return_value={"timeout": 30}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
         ask_llm("say hi")
 
-    mock_client_cls.assert_called_once_with(timeout=30)
+    mock_client_cls.assert_called_once()
+    assert mock_client_cls.call_args.kwargs["timeout"] == 30
 
 
 def test_ask_llm_default_timeout():
     client = _mock_client("echo hi")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client) as mock_client_cls,
+        patch("ollama.Client", return_value=client) as mock_client_cls,
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
         ask_llm("say hi")
 
-    mock_client_cls.assert_called_once_with(timeout=20)
+    mock_client_cls.assert_called_once()
+    assert mock_client_cls.call_args.kwargs["timeout"] == 20
 
 
 def test_ask_llm_prints_model_to_stderr(capsys):
     client = _mock_client("echo hi")
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
@@ -224,7 +257,7 @@ def test_ask_llm_custom_system_prompt():
     custom_prompt = "Custom prompt. System: {os} {arch} {shell}. {env_context}Answer with command."
 
     with (
-        patch("ai_cli.llm.Client", return_value=client),
+        patch("ollama.Client", return_value=client),
         patch("ai_cli.llm.load_config", return_value={"system_prompt": custom_prompt}),
         patch("ai_cli.llm._get_available_models", return_value=None),
     ):
@@ -234,6 +267,66 @@ def test_ask_llm_custom_system_prompt():
     assert "Custom prompt" in system_msg
 
 
+def test_ask_llm_cache_hit_skips_chat(capsys):
+    client = _mock_client("ls -la")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        first = ask_llm("list files")
+        second = ask_llm("list   files")
+
+    client.chat.assert_called_once()
+    assert first.cached is False
+    assert second == LLMResponse(command="ls -la", model="glm-5:cloud", cached=True)
+    assert "(cached)" in capsys.readouterr().err
+
+
+def test_ask_llm_cache_keyed_on_model():
+    client = _mock_client("ls -la")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files", model="llama3")
+        ask_llm("list files", model="qwen2.5:7b")
+
+    assert client.chat.call_count == 2
+
+
+def test_ask_llm_use_cache_false_bypasses_cache():
+    client = _mock_client("ls -la")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files")
+        result = ask_llm("list files", use_cache=False)
+
+    assert client.chat.call_count == 2
+    assert result.cached is False
+
+
+def test_ask_llm_cache_disabled_in_config():
+    client = _mock_client("ls -la")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"cache": False}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files")
+        ask_llm("list files")
+
+    assert client.chat.call_count == 2
+
+
 def test_resolve_model_explicit():
     assert _resolve_model("llama3") == "llama3"
 
@@ -304,3 +397,657 @@ def test_default_system_prompt_mentions_macos_fish():
 
     assert "macOS" in DEFAULT_SYSTEM_PROMPT
     assert "fish" in DEFAULT_SYSTEM_PROMPT
+
+
+def test_ask_llm_semantic_cache_answers_rephrased_task(capsys):
+    client = _mock_client("du -sh * | sort -h")
+    client.embed.side_effect = [
+        MagicMock(embeddings=[[1.0, 0.0]]),
+        MagicMock(embeddings=[[0.98, 0.05]]),
+    ]
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"semantic_cache": True}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("find big files")
+        result = ask_llm("list large files")
+
+    client.chat.assert_called_once()
+    assert result.command == "du -sh * | sort -h"
+    assert result.cached is True
+    assert "similar to: find big files" in capsys.readouterr().err
+
+
+def test_ask_llm_semantic_cache_survives_embed_failure():
+    client = _mock_client("ls")
+    client.embed.side_effect = ConnectionError("refused")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"semantic_cache": True}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files")
+
+    assert result.command == "ls"
+
+
+def test_parse_partial_holds_back_incomplete_fence():
+    assert _parse_partial("``").command == ""
+    assert _parse_partial("```bash").command == ""
+    assert _parse_partial("```bash\nls -l").command == "ls -l"
+    assert _parse_partial("```bash\nls -la\n``").command == "ls -la"
+
+
+def test_parse_partial_plain_grows_with_content():
+    assert _parse_partial("find . -na").command == "find . -na"
+
+
+def test_parse_partial_verbose_waits_for_command_marker():
+    partial = _parse_partial("EXPLANATION: Lists files\nCOMM", verbose=True)
+    assert partial.command == ""
+    assert partial.explanation == "Lists files"
+
+    partial = _parse_partial("EXPLANATION: Lists files\nCOMMAND: ls -l", verbose=True)
+    assert partial == LLMResponse(command="ls -l", explanation="Lists files")
+
+
+def test_parse_partial_verbose_without_markers_shows_nothing():
+    assert _parse_partial("ls -la", verbose=True).command == ""
+
+
+def test_ask_llm_streams_partials():
+    client = _mock_stream_client(["```bash\n", "ls ", "-la", "\n```"])
+    partials = []
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files", on_partial=partials.append)
+
+    assert client.chat.call_args.kwargs["stream"] is True
+    assert [p.command for p in partials] == ["", "ls", "ls -la", "ls -la"]
+    assert result._replace(timing=None) == LLMResponse(command="ls -la", model="glm-5:cloud")
+
+
+def test_ask_llm_streams_verbose_response():
+    client = _mock_stream_client(["EXPLANATION: Lists", " files\nCOMMAND: ls", " -la\n"])
+    partials = []
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files", verbose=True, on_partial=partials.append)
+
+    assert [p.command for p in partials] == ["", "ls", "ls -la"]
+    assert result.explanation == "Lists files"
+    assert result.command == "ls -la"
+
+
+def test_command_line_end_plain_skips_fences_and_blank_lines():
+    assert _command_line_end("```bash\n\nls -la") is None
+    assert _command_line_end("```bash\n\nls -la\n") == len("```bash\n\nls -la\n")
+
+
+def test_command_line_end_plain_skips_lead_in_lines():
+    assert _command_line_end("Here is the command:\n") is None
+    assert _command_line_end("Here is the command:\nls -la\n") == len(
+        "Here is the command:\nls -la\n"
+    )
+    assert _command_line_end("scp notes.txt host:\n") == len("scp notes.txt host:\n")
+
+
+def test_parse_partial_plain_hides_lead_in():
+    assert _parse_partial("Here is the command:\nls -l").command == "ls -l"
+    assert _parse_partial("Sure.\n```bash\nls").command == "ls"
+
+
+def test_command_line_end_verbose_waits_for_command_line():
+    assert _command_line_end("EXPLANATION: Lists files\n", verbose=True) is None
+    assert _command_line_end("EXPLANATION: x\nCOMMAND: ls", verbose=True) is None
+    assert _command_line_end("EXPLANATION: x\nCOMMAND: ls\nNote", verbose=True) == len(
+        "EXPLANATION: x\nCOMMAND: ls\n"
+    )
+
+
+def test_ask_llm_stops_stream_after_command_line():
+    chunks = ["ls", " -la\n", "This lists", " all files", " in detail."]
+    client = _mock_stream_client(chunks)
+    stream = client.chat.return_value
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files")
+
+    assert result.command == "ls -la"
+    assert result.timing["stopped_early"] == 1
+    assert result.timing["tokens"] == 2
+    assert "ttft" in result.timing
+    # The stream was closed, so the remaining chunks were never read
+    assert next(stream, None) is None
+
+
+def test_ask_llm_stop_discards_rest_of_chunk():
+    client = _mock_stream_client(["EXPLANATION: Lists files\nCOMMAND: ls -la\nNote: safe"])
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files", verbose=True)
+
+    assert result.command == "ls -la"
+    assert result.explanation == "Lists files"
+    assert result.timing["skipped_chars"] == len("Note: safe")
+
+
+def test_ask_llm_early_stop_disabled_uses_plain_request():
+    client = _mock_client("ls -la\nThis lists files.")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"early_stop": False}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files")
+
+    assert "stream" not in client.chat.call_args.kwargs
+    assert result.command == "ls -la\nThis lists files."
+    assert "stopped_early" not in result.timing
+
+
+def test_ask_llm_before_request_skipped_on_cache_hit():
+    client = _mock_client("ls -la")
+    before_request = MagicMock()
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files", before_request=before_request)
+        ask_llm("list files", before_request=before_request)
+
+    before_request.assert_called_once()
+
+
+def test_ask_llm_loads_config_once():
+    client = _mock_client("ls")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"models": ["m"]}) as mock_load,
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files")
+
+    mock_load.assert_called_once()
+
+
+def test_ask_llm_uses_passed_config_snapshot():
+    client = _mock_client("ls")
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config") as mock_load,
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files", config={"model": "llama3", "context": "Use uv."})
+
+    mock_load.assert_not_called()
+    assert client.chat.call_args.kwargs["model"] == "llama3"
+    assert "Use uv." in client.chat.call_args.kwargs["messages"][0]["content"]
+
+
+def test_ask_llm_passes_keep_alive_and_reports_load_time():
+    done = MagicMock()
+    done.message.content = ""
+    done.done = True
+    done.load_duration = 2_000_000_000
+    client = _mock_stream_client(["ls -la"])
+    client.chat.return_value = (part for part in [*client.chat.return_value, done])
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"keep_alive": "1h"}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        result = ask_llm("list files")
+
+    assert client.chat.call_args.kwargs["keep_alive"] == "1h"
+    assert result.timing["load"] == 2.0
+
+
+def _hedge_config(**extra):
+    return {"models": ["slow-model", "fast-model"], "hedge": True, "hedge_delay": 0.01, **extra}
+
+
+def test_hedged_request_answered_by_second_model_when_first_stalls(capsys):
+    client = _async_hedge_client({"slow-model": "slow\n", "fast-model": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.load_config", return_value=_hedge_config()),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        result = ask_llm("list files")
+
+    assert result.command == "ls -la"
+    assert result.model == "fast-model"
+    assert result.timing["hedged"] == 1
+    err = capsys.readouterr().err
+    assert "also asking fast-model" in err
+    assert "answered by fast-model" in err
+    # The stalled request was closed when the hedge won, not left to run on
+    assert client.closed == ["slow-model"]
+    client.close.assert_awaited_once()
+
+
+def test_hedged_timing_counts_from_the_start_of_the_hedge():
+    from ai_cli.stats import ModelStats
+
+    client = _async_hedge_client({"slow-model": "slow\n", "fast-model": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        result = ask_llm("list files", config=_hedge_config(hedge_delay=0.2))
+
+    assert result.timing["total"] >= 0.2
+    assert 0.2 <= result.timing["ttft"] <= result.timing["total"]
+    # The model's own time, which the hedge delay is not part of
+    assert ModelStats().summary("fast-model")["p50"] < 0.2
+
+
+def test_hedged_answer_served_from_cache_on_next_request(capsys):
+    client = _async_hedge_client({"slow-model": "slow\n", "fast-model": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.load_config", return_value=_hedge_config()),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        ask_llm("list files")
+        result = ask_llm("list files")
+
+    assert result.cached
+    assert result.command == "ls -la"
+    assert client.chat.call_count == 2  # only the first request asked both models
+
+
+def test_hedged_request_fails_over_immediately_on_error():
+    client = _async_hedge_client({"slow-model": "error", "fast-model": "ls -la\n"})
+    config = _hedge_config(hedge_delay=60)
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.load_config", return_value=config),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        result = ask_llm("list files")
+
+    assert result.model == "fast-model"
+
+
+def test_no_hedging_for_explicit_model():
+    client = _mock_client("ls\n")
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value=_hedge_config()),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        result = ask_llm("list files", model="slow-model")
+
+    assert result.model == "slow-model"
+    assert client.chat.call_count == 1
+
+
+def test_fastest_strategy_picks_model_with_lowest_recorded_latency():
+    from ai_cli.stats import ModelStats
+
+    stats = ModelStats()
+    stats.record("qwen2.5:7b", 6.0)
+    stats.record("llama3", 1.5)
+    config = {"models": ["qwen2.5:7b", "llama3"], "model_strategy": "fastest"}
+    with patch("ai_cli.llm._get_available_models", return_value={"qwen2.5:7b", "llama3"}):
+        assert _resolve_model(config=config) == "llama3"
+        assert _resolve_model(config={"models": ["qwen2.5:7b", "llama3"]}) == "qwen2.5:7b"
+
+
+def test_ask_llm_records_model_latency():
+    from ai_cli.stats import ModelStats
+
+    client = _mock_client("ls -la")
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files")
+
+    summary = ModelStats().summary("glm-5:cloud")
+    assert summary["requests"] == 1
+    assert "p50" in summary
+
+
+class _Gone(Exception):
+    pass
+
+
+def _hang_up(partial):
+    raise _Gone
+
+
+def test_callback_error_is_not_counted_as_model_failure():
+    import pytest
+
+    from ai_cli.stats import ModelStats
+
+    with (
+        patch("ollama.Client", return_value=_mock_client("ls -la")),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        with pytest.raises(_Gone):
+            ask_llm("list files", model="llama3", config={}, on_partial=_hang_up)
+
+    assert ModelStats().summary("llama3") is None
+
+
+def test_callback_error_ends_hedge_without_blaming_the_model():
+    import pytest
+
+    from ai_cli.stats import ModelStats
+
+    config = {"models": ["qwen2.5:7b", "llama3"], "hedge": True, "hedge_delay": 60}
+    client = _async_hedge_client({"qwen2.5:7b": "ls -la\n", "llama3": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm._get_available_models", return_value={"qwen2.5:7b", "llama3"}),
+    ):
+        with pytest.raises(_Gone):
+            ask_llm("list files", config=config, on_partial=_hang_up)
+
+    assert client.chat.call_count == 1
+    assert ModelStats().summary("qwen2.5:7b") is None
+
+
+def _async_hedge_client(responses: dict[str, str]):
+    """AsyncClient whose chat streams responses[model]; "slow" models never answer.
+
+    Models whose request was cancelled mid-stream are listed in client.closed.
+    """
+    import asyncio
+
+    async def chat(model, **kwargs):
+        if responses[model] == "error":
+            raise ConnectionError("refused")
+        part = MagicMock()
+        part.message.content = responses[model]
+        part.done = False
+
+        async def stream():
+            try:
+                if model.startswith("slow"):
+                    await asyncio.sleep(5)
+                yield part
+            except asyncio.CancelledError:
+                client.closed.append(model)
+                raise
+
+        return stream()
+
+    client = MagicMock()
+    client.chat.side_effect = chat
+    client.close = AsyncMock()
+    client.closed = []
+    return client
+
+
+def test_async_hedged_request_cancels_stalled_model(capsys):
+    import asyncio
+
+    client = _async_hedge_client({"slow-model": "slow\n", "fast-model": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.installed_models_async", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        result = asyncio.run(ask_llm_async("list files", config=_hedge_config()))
+
+    assert result.command == "ls -la"
+    assert result.model == "fast-model"
+    assert result.timing["hedged"] == 1
+    assert "also asking fast-model" in capsys.readouterr().err
+
+
+def test_async_hedged_request_fails_over_immediately_on_error():
+    import asyncio
+
+    client = _async_hedge_client({"slow-model": "error", "fast-model": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.installed_models_async", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+    ):
+        result = asyncio.run(ask_llm_async("list files", config=_hedge_config(hedge_delay=60)))
+
+    assert result.model == "fast-model"
+
+
+def test_async_cache_hit_skips_client():
+    import asyncio
+
+    client = _mock_client("ls -la")
+    config = {}
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files", config=config)
+    with patch("ollama.AsyncClient") as async_client:
+        result = asyncio.run(ask_llm_async("list files", config=config))
+
+    assert result.cached
+    async_client.assert_not_called()
+
+
+def test_system_prompt_is_identical_across_directories(tmp_path):
+    client = _mock_client("ls -la")
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"context": "Python: use uv."}),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files", cwd="/srv/one")
+        ask_llm("list files", cwd=str(tmp_path))
+
+    first, second = (call.kwargs["messages"] for call in client.chat.call_args_list)
+    assert first[0] == second[0]
+    assert "/srv/one" not in first[0]["content"]
+    assert first[1]["content"] == "Working directory: /srv/one.\nlist files"
+    assert second[1]["content"] == f"Working directory: {tmp_path}.\nlist files"
+
+
+def test_prompt_eval_reported_in_timing():
+    response = MagicMock(prompt_eval_count=42, prompt_eval_duration=30_000_000)
+    response.load_duration = response.eval_duration = None
+    timing = {}
+
+    _add_server_timing(response, timing)
+
+    assert timing == {"prompt_tokens": 42, "prompt_eval": 0.03}
+
+
+def test_generation_options_sent_with_chat():
+    client = _mock_client("ls -la")
+    config = {"options": {"top_p": 0.9}, "model_options": {"llama3": {"num_predict": 64}}}
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm._get_available_models", return_value=None),
+    ):
+        ask_llm("list files", model="llama3", config=config)
+        ask_llm("list dirs", model="qwen2.5:7b", verbose=True, config=config)
+
+    llama3, qwen = (call.kwargs["options"] for call in client.chat.call_args_list)
+    assert (llama3["num_predict"], llama3["top_p"]) == (64, 0.9)
+    assert qwen == {"temperature": 0.2, "top_p": 0.9}
+
+
+def _memory_patches(free_gb: float, loaded: set[str] = frozenset()):
+    sizes = {"qwen2.5:14b": 9 * 1024**3, "qwen2.5:7b": 4.7 * 1024**3, "llama3.2:3b": 2 * 1024**3}
+    return (
+        patch("ai_cli.llm._get_available_models", return_value=set(sizes)),
+        patch("ai_cli.llm.installed_models", return_value=sizes),
+        patch("ai_cli.llm.running_models", return_value=set(loaded)),
+        patch("psutil.virtual_memory", return_value=MagicMock(available=free_gb * 1024**3)),
+    )
+
+
+_MEMORY_CONFIG = {"models": ["qwen2.5:14b", "qwen2.5:7b", "llama3.2:3b"], "memory_aware": True}
+
+
+def test_memory_aware_skips_models_that_do_not_fit():
+    notes = []
+    a, b, c, d = _memory_patches(free_gb=8)
+    with a, b, c, d:
+        assert _resolve_model(config=_MEMORY_CONFIG, note=notes.append) == "qwen2.5:7b"
+        assert _resolve_model(config={**_MEMORY_CONFIG, "memory_headroom_gb": 4}) == "llama3.2:3b"
+
+    assert notes == ["skipping qwen2.5:14b: needs 9.0 GB + 2.0 GB headroom, 8.0 GB available"]
+
+
+def test_memory_aware_prefers_loaded_model():
+    a, b, c, d = _memory_patches(free_gb=1, loaded={"qwen2.5:14b"})
+    with a, b, c, d:
+        assert _resolve_model(config=_MEMORY_CONFIG) == "qwen2.5:14b"
+
+
+def test_memory_aware_falls_back_to_smallest_when_nothing_fits():
+    a, b, c, d = _memory_patches(free_gb=1)
+    with a, b, c, d:
+        assert _resolve_model(config=_MEMORY_CONFIG) == "llama3.2:3b"
+        assert _resolve_model(config={**_MEMORY_CONFIG, "memory_aware": False}) == "qwen2.5:14b"
+
+
+def test_skipped_models_reported_only_in_verbose_mode(capsys):
+    client = _mock_client("COMMAND: ls")
+    a, b, c, d = _memory_patches(free_gb=8)
+    with a, b, c, d, patch("ollama.Client", return_value=client):
+        ask_llm("list files", config=_MEMORY_CONFIG)
+        assert "skipping" not in capsys.readouterr().err
+        ask_llm("list dirs", verbose=True, config=_MEMORY_CONFIG)
+
+    assert "skipping qwen2.5:14b" in capsys.readouterr().err
+
+
+def test_prefer_loaded_picks_hot_model_from_models_list():
+    config = {"models": ["qwen2.5:14b", "qwen2.5:7b", "llama3.2:3b"], "prefer_loaded": True}
+    with (
+        patch("ai_cli.llm._get_available_models", return_value=set(config["models"])),
+        patch("ai_cli.llm.running_models", return_value={"llama3.2:3b"}) as mock_running,
+    ):
+        assert _resolve_model(config=config) == "llama3.2:3b"
+        assert _resolve_model(config={**config, "prefer_loaded": False}) == "qwen2.5:14b"
+
+    mock_running.assert_called_once_with(10)
+
+
+def test_prefer_loaded_keeps_order_when_server_unreachable():
+    config = {"models": ["qwen2.5:14b", "qwen2.5:7b"], "prefer_loaded": True}
+    with (
+        patch("ai_cli.llm._get_available_models", return_value=set(config["models"])),
+        patch("ai_cli.llm.running_models", side_effect=ConnectionError("refused")),
+    ):
+        assert _resolve_model(config=config) == "qwen2.5:14b"
+
+
+def test_ask_llm_starts_server_before_resolving_models_list():
+    client = _mock_client("ls -la")
+    before_request = MagicMock()
+
+    def inventory(ttl):
+        return {"qwen2.5:7b", "llama3"} if before_request.called else None
+
+    with (
+        patch("ollama.Client", return_value=client),
+        patch("ai_cli.llm.load_config", return_value={"models": ["qwen2.5:7b", "llama3"]}),
+        patch("ai_cli.llm._get_available_models", side_effect=inventory),
+    ):
+        result = ask_llm("list files", before_request=before_request)
+
+    before_request.assert_called_once()
+    assert result.model == "qwen2.5:7b"
+    assert client.chat.call_args.kwargs["model"] == "qwen2.5:7b"
+
+
+def test_async_starts_server_before_resolving_models_list():
+    import asyncio
+
+    client = _async_hedge_client({"qwen2.5:7b": "ls -la\n"})
+    started = []
+
+    async def before_request():
+        started.append(True)
+
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.installed_models_async", side_effect=[ConnectionError(), {}]),
+        patch("ai_cli.llm._get_available_models", return_value={"qwen2.5:7b"}),
+    ):
+        result = asyncio.run(
+            ask_llm_async(
+                "list files",
+                config={"models": ["qwen2.5:7b", "llama3"]},
+                before_request=before_request,
+            )
+        )
+
+    assert started == [True]
+    assert result.model == "qwen2.5:7b"
+
+
+def test_missing_running_set_does_not_start_the_server():
+    import asyncio
+
+    config = {"models": ["qwen2.5:7b", "llama3"], "prefer_loaded": True}
+    before_request = MagicMock()
+
+    async def before_request_async():
+        before_request()
+
+    with (
+        patch("ollama.Client", return_value=_mock_client("ls -la")),
+        patch("ai_cli.llm.installed_models_async", return_value={}),
+        patch("ai_cli.llm._get_available_models", return_value={"qwen2.5:7b", "llama3"}),
+        patch("ai_cli.llm.running_models", side_effect=ConnectionError("refused")),
+        patch("ai_cli.llm.running_models_async", side_effect=ConnectionError("refused")),
+    ):
+        ask_llm("list files", config=config)
+        # Cache hits: a missing running set is not a stopped server
+        sync = ask_llm("list files", config=config, before_request=before_request)
+        coro = ask_llm_async("list files", config=config, before_request=before_request_async)
+        async_ = asyncio.run(coro)
+
+    assert sync.cached and async_.cached
+    before_request.assert_not_called()
+
+
+def test_hedged_request_does_not_hang_when_recording_fails():
+    import pytest
+
+    client = _async_hedge_client({"slow-model": "slow\n", "fast-model": "ls -la\n"})
+    with (
+        patch("ollama.AsyncClient", return_value=client),
+        patch("ai_cli.llm.load_config", return_value=_hedge_config()),
+        patch("ai_cli.llm._get_available_models", return_value={"slow-model", "fast-model"}),
+        patch("ai_cli.stats.ModelStats.record", side_effect=OSError("disk full")),
+    ):
+        with pytest.raises(OSError):
+            ask_llm("list files")
@@ -0,0 +1,142 @@
+"""Tests for the semantic near-duplicate cache."""
+
+from ai_cli.semantic import SemanticCache, env_fingerprint
+
+ENV = {"os": "Darwin", "arch": "arm64", "shell": "fish", "env_context": "Home: /u. ", "cwd": "/a"}
+
+
+def test_env_fingerprint_ignores_working_directory():
+    other_dir = {**ENV, "cwd": "/b"}
+    assert env_fingerprint(ENV, False) == env_fingerprint(other_dir, False)
+    assert env_fingerprint(ENV, False) != env_fingerprint(ENV, True)
+    assert env_fingerprint(ENV, False) != env_fingerprint({**ENV, "shell": "zsh"}, False)
+
+
+def test_lookup_returns_similar_entry(tmp_path):
+    cache = SemanticCache(tmp_path / "s", threshold=0.9)
+    cache.add([1.0, 0.0, 0.0], "llama3", "fp", "find big files", "du -sh * | sort -h", None)
+
+    match = cache.lookup([0.95, 0.1, 0.0], "llama3", "fp")
+
+    assert match is not None
+    entry, score = match
+    assert entry.command == "du -sh * | sort -h"
+    assert score > 0.9
+
+
+def test_lookup_below_threshold_is_a_miss(tmp_path):
+    cache = SemanticCache(tmp_path / "s", threshold=0.9)
+    cache.add([1.0, 0.0], "llama3", "fp", "find big files", "du -sh *", None)
+
+    assert cache.lookup([0.0, 1.0], "llama3", "fp") is None
+
+
+def test_lookup_requires_same_model_and_fingerprint(tmp_path):
+    cache = SemanticCache(tmp_path / "s")
+    cache.add([1.0, 0.0], "llama3", "fp", "find big files", "du -sh *", None)
+
+    assert cache.lookup([1.0, 0.0], "qwen2.5:7b", "fp") is None
+    assert cache.lookup([1.0, 0.0], "llama3", "other") is None
+
+
+def test_counters_and_vectors_persist(tmp_path):
+    cache = SemanticCache(tmp_path / "s")
+    cache.add([1.0, 0.0], "llama3", "fp", "find big files", "du -sh *", None)
+    cache.lookup([1.0, 0.0], "llama3", "fp")
+    cache.lookup([0.0, 1.0], "llama3", "fp")
+
+    reloaded = SemanticCache(tmp_path / "s")
+    stats = reloaded.stats()
+    assert stats == {"entries": 1, "dim": 2, "hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert (tmp_path / "s.f32").stat().st_size == 2 * 4  # one float32 row
+
+
+def test_add_evicts_least_recently_used(tmp_path):
+    cache = SemanticCache(tmp_path / "s", max_entries=2)
+    cache.add([1.0, 0.0, 0.0], "m", "fp", "a", "cmd a", None)
+    cache.add([0.0, 1.0, 0.0], "m", "fp", "b", "cmd b", None)
+    cache.lookup([1.0, 0.0, 0.0], "m", "fp")  # a is now more recently used than b
+    cache.add([0.0, 0.0, 1.0], "m", "fp", "c", "cmd c", None)
+
+    assert [e.task for e in cache.entries] == ["a", "c"]
+    assert cache.lookup([0.0, 1.0, 0.0], "m", "fp") is None
+    assert cache.lookup([0.0, 0.0, 1.0], "m", "fp")[0].command == "cmd c"
+
+
+def test_dimension_change_resets_index(tmp_path):
+    cache = SemanticCache(tmp_path / "s")
+    cache.add([1.0, 0.0], "m", "fp", "a", "cmd a", None)
+    cache.add([1.0, 0.0, 0.0], "m", "fp", "b", "cmd b", None)
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["dim"] == 3
+
+
+def test_rebuild_indexes_executed_history_in_batches(tmp_path):
+    history = [
+        {"task": "find big files", "model": "m", "command": "du -sh *", "action": "execute"},
+        {"task": "list dirs", "model": "m", "command": "ls -d */", "action": "abort"},
+        {"task": "find  big files", "model": "m", "command": "du -ah .", "action": "execute"},
+        {"task": "show disk", "model": "m", "command": "df -h", "action": "execute"},
+    ]
+    batches = []
+
+    def embed(texts):
+        batches.append(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    cache = SemanticCache(tmp_path / "s")
+    indexed = cache.rebuild(history, embed, "fp")
+
+    assert indexed == 2
+    assert batches == [["find big files", "show disk"]]
+    assert {e.command for e in cache.entries} == {"du -ah .", "df -h"}
+
+
+def test_rebuild_indexes_auto_entries_under_default_model(tmp_path):
+    history = [
+        {"task": "find big files", "model": "auto", "command": "du -sh *", "action": "execute"},
+        {"task": "show disk", "model": "m", "command": "df -h", "action": "execute"},
+    ]
+    cache = SemanticCache(tmp_path / "s")
+
+    assert cache.rebuild(history, lambda texts: [[1.0, 0.0]] * len(texts), "fp") == 1
+    assert cache.rebuild(history, lambda texts: [[1.0, 0.0]] * len(texts), "fp", "llama3") == 2
+    assert cache.lookup([1.0, 0.0], "llama3", "fp")[0].command == "du -sh *"
+
+
+def test_lookup_does_not_undo_a_concurrent_write(tmp_path):
+    reader = SemanticCache(tmp_path / "s", max_entries=1)
+    reader.add([1.0, 0.0], "m", "fp", "a", "cmd a", None)
+    reader.lookup([0.0, 1.0], "m", "fp")  # loaded with only "a"
+
+    # Another writer evicts "a" for "b"; the reader's stale copy must not be saved over it
+    SemanticCache(tmp_path / "s", max_entries=1).add([0.0, 1.0], "m", "fp", "b", "cmd b", None)
+    reader.lookup([1.0, 0.0], "m", "fp")
+
+    reloaded = SemanticCache(tmp_path / "s")
+    assert reloaded.stats()["hits"] == 1
+    assert [e.task for e in reloaded.entries] == ["b"]
+    assert reloaded.lookup([0.0, 1.0], "m", "fp")[0].command == "cmd b"
+
+
+def test_miss_on_empty_index_survives_the_first_add(tmp_path):
+    cache = SemanticCache(tmp_path / "s")
+    assert cache.lookup([1.0, 0.0], "m", "fp") is None
+    cache.add([1.0, 0.0], "m", "fp", "a", "cmd a", None)
+
+    assert SemanticCache(tmp_path / "s").stats()["misses"] == 1
+
+
+def test_lookup_only_writes_usage(tmp_path):
+    SemanticCache(tmp_path / "s").add([1.0, 0.0], "m", "fp", "a", "cmd a", None)
+    vectors, meta = (tmp_path / "s.f32").read_bytes(), (tmp_path / "s.json").read_text()
+
+    cache = SemanticCache(tmp_path / "s")
+    assert cache.lookup([1.0, 0.0], "m", "fp")[0].command == "cmd a"
+    assert cache.lookup([0.0, 1.0], "m", "fp") is None
+
+    assert (tmp_path / "s.f32").read_bytes() == vectors
+    assert (tmp_path / "s.json").read_text() == meta
+    stats = SemanticCache(tmp_path / "s").stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
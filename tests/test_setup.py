@@ -4,7 +4,16 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from ai_cli.setup import ensure_ready, ensure_server
+from ai_cli import setup
+from ai_cli.setup import (
+    _server_address,
+    _wait_for_server,
+    ensure_ready,
+    ensure_server,
+    installed_models,
+    running_models,
+    warm_model,
+)
 
 
 @pytest.fixture()
@@ -52,11 +61,19 @@ def test_connection_error_binary_missing_exits_with_1(_mock_list, _mock_which):
 # --- Connection failure: binary exists → auto-start ---
 
 
+@pytest.fixture()
+def popen():
+    """Patch Popen with a process that keeps running."""
+    with patch("ai_cli.setup.subprocess.Popen") as mock_popen:
+        mock_popen.return_value.poll.return_value = None
+        yield mock_popen
+
+
 @patch("ai_cli.setup.time.sleep")
-@patch("ai_cli.setup.subprocess.Popen")
+@patch("ai_cli.setup._port_open", return_value=True)
 @patch("ai_cli.setup.shutil_which", return_value="/usr/local/bin/ollama")
 @patch("ai_cli.setup.ollama_list")
-def test_auto_starts_ollama_when_binary_exists(mock_list, _mock_which, mock_popen, _mock_sleep):
+def test_auto_starts_ollama_when_binary_exists(mock_list, _mock_which, _mock_port, _sleep, popen):
     """When ollama binary exists but server down, auto-start it."""
     success_resp = MagicMock()
     success_resp.models = []
@@ -64,28 +81,30 @@ def test_auto_starts_ollama_when_binary_exists(mock_list, _mock_which, mock_pope
 
     ensure_server()
 
-    mock_popen.assert_called_once()
-    assert mock_popen.call_args[0][0] == ["ollama", "serve"]
+    popen.assert_called_once()
+    assert popen.call_args[0][0] == ["ollama", "serve"]
 
 
 @patch("ai_cli.setup.time.sleep")
-@patch("ai_cli.setup.subprocess.Popen")
+@patch("ai_cli.setup._port_open", return_value=True)
+@patch("ai_cli.setup.load_config", return_value={"server_start_timeout": 0.05})
 @patch("ai_cli.setup.shutil_which", return_value="/usr/local/bin/ollama")
 @patch("ai_cli.setup.ollama_list", side_effect=ConnectionError("refused"))
-def test_auto_start_fails_after_retries(_mock_list, _mock_which, _mock_popen, _mock_sleep):
-    """If ollama doesn't start after retries, exit(1)."""
+def test_auto_start_fails_after_deadline(_list, _which, _config, _port, _sleep, popen, capsys):
+    """If ollama doesn't answer before server_start_timeout, exit(1)."""
     with pytest.raises(SystemExit) as exc_info:
         ensure_server()
 
     assert exc_info.value.code == 1
+    assert "within 0.05s" in capsys.readouterr().err
 
 
 @patch("ai_cli.setup.time.sleep")
-@patch("ai_cli.setup.subprocess.Popen")
+@patch("ai_cli.setup._port_open", return_value=True)
 @patch("ai_cli.setup.shutil_which", return_value="/usr/local/bin/ollama")
 @patch("ai_cli.setup.ollama_list")
 def test_auto_start_prints_starting_message(
-    mock_list, _mock_which, _mock_popen, _mock_sleep, capsys
+    mock_list, _mock_which, _mock_port, _mock_sleep, popen, capsys
 ):
     success_resp = MagicMock()
     success_resp.models = []
@@ -97,6 +116,47 @@ def test_auto_start_prints_starting_message(
     assert "starting ollama" in output
 
 
+@patch("ai_cli.setup.time.sleep")
+@patch("ai_cli.setup.shutil_which", return_value="/usr/local/bin/ollama")
+@patch("ai_cli.setup.ollama_list", side_effect=ConnectionError("refused"))
+def test_auto_start_fails_fast_when_process_exits(_mock_list, _mock_which, mock_sleep, capsys):
+    with patch("ai_cli.setup.subprocess.Popen") as mock_popen:
+        mock_popen.return_value.poll.return_value = 1
+        with pytest.raises(SystemExit):
+            ensure_server()
+
+    mock_sleep.assert_not_called()
+    assert "exited with code 1" in capsys.readouterr().err
+
+
+@patch("ai_cli.setup._port_open", side_effect=[False, False, True])
+@patch("ai_cli.setup.ollama_list")
+def test_wait_for_server_backs_off_exponentially_until_port_opens(mock_list, mock_port):
+    mock_list.return_value.models = []
+    process = MagicMock()
+    process.poll.return_value = None
+    with patch("ai_cli.setup.time.sleep") as mock_sleep:
+        assert _wait_for_server(process, timeout=10) is None
+
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    assert delays == [0.005, 0.01]
+    mock_list.assert_called_once()  # no HTTP request until the port accepts connections
+
+
+@pytest.mark.parametrize(
+    ("host", "address"),
+    [
+        (None, ("127.0.0.1", 11434)),
+        ("0.0.0.0", ("127.0.0.1", 11434)),
+        ("gpu-box:8080", ("gpu-box", 8080)),
+        ("https://ollama.example.com", ("ollama.example.com", 443)),
+    ],
+)
+def test_server_address_follows_ollama_host_rules(host, address):
+    with patch("ai_cli.setup.ollama_host", return_value=host):
+        assert _server_address() == address
+
+
 # --- Connected, model already present ---
 
 
@@ -362,9 +422,9 @@ def test_model_larger_than_ram_shows_warning(mock_list, mock_pull, capsys):
     # First confirm = yes to download, second confirm = no to RAM warning
     with (
         patch("click.confirm", side_effect=[True, False]),
-        patch("ai_cli.setup.psutil") as mock_psutil,
+        patch("psutil.virtual_memory") as mock_virtual_memory,
     ):
-        mock_psutil.virtual_memory.return_value.total = 16_000_000_000
+        mock_virtual_memory.return_value.total = 16_000_000_000
         with pytest.raises(SystemExit):
             ensure_ready("huge-model")
 
@@ -390,9 +450,9 @@ def test_model_smaller_than_ram_no_warning(mock_list, mock_pull, capsys):
 
     with (
         patch("click.confirm", return_value=True),
-        patch("ai_cli.setup.psutil") as mock_psutil,
+        patch("psutil.virtual_memory") as mock_virtual_memory,
     ):
-        mock_psutil.virtual_memory.return_value.total = 16_000_000_000
+        mock_virtual_memory.return_value.total = 16_000_000_000
         ensure_ready("small-model")
 
     output = capsys.readouterr().err
@@ -418,9 +478,174 @@ def test_model_larger_than_ram_user_continues(mock_list, mock_pull):
     # First confirm = yes to download, second confirm = yes to RAM warning
     with (
         patch("click.confirm", side_effect=[True, True]),
-        patch("ai_cli.setup.psutil") as mock_psutil,
+        patch("psutil.virtual_memory") as mock_virtual_memory,
     ):
-        mock_psutil.virtual_memory.return_value.total = 16_000_000_000
+        mock_virtual_memory.return_value.total = 16_000_000_000
         ensure_ready("huge-model")
 
     mock_pull.assert_called_once()
+
+
+# --- Model inventory ---
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_inventory_fetched_once_per_process(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+
+    ensure_ready("qwen2.5:7b")
+    installed_models()
+
+    mock_list.assert_called_once()
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_ensure_server_probes_even_with_fresh_inventory(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    installed_models()
+    setup._inventory = None  # the next invocation finds a fresh models.json
+
+    assert "qwen2.5:7b" in installed_models(ttl=60)
+    mock_list.side_effect = ConnectionError("refused")
+    with (
+        patch("ai_cli.setup._start_server", return_value=(MagicMock(), 1)) as start,
+        patch("ai_cli.setup._wait_for_server", return_value=None),
+    ):
+        ensure_server()
+
+    start.assert_called_once()
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_inventory_in_memory_expires_after_ttl(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    installed_models(ttl=60)
+    installed_models(ttl=60)
+    with patch("ai_cli.setup.time.time", return_value=setup.time.time() + 120):
+        installed_models(ttl=60)
+
+    assert mock_list.call_count == 2
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_inventory_persisted_and_reused_within_ttl(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    installed_models()
+    setup._inventory = None  # simulate the next invocation
+
+    models = installed_models(ttl=60)
+
+    mock_list.assert_called_once()
+    assert "qwen2.5:7b" in models
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_inventory_file_ignored_when_stale_or_other_host(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    installed_models()
+
+    setup._inventory = None
+    with patch("ai_cli.setup.time.time", return_value=setup.time.time() + 120):
+        installed_models(ttl=60)
+    setup._inventory = None
+    with patch.dict("os.environ", {"OLLAMA_HOST": "http://gpu-box:11434"}):
+        installed_models(ttl=60)
+
+    assert mock_list.call_count == 3
+
+
+def _ps_client(*names):
+    client = MagicMock()
+    client.ps.return_value.models = [MagicMock(model=name) for name in names]
+    return client
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_running_set_saved_alongside_inventory_and_reused_within_ttl(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    client = _ps_client("qwen2.5:7b")
+    with patch("ai_cli.setup.get_client", return_value=client):
+        installed_models()
+        assert running_models(ttl=10) == {"qwen2.5:7b"}
+        setup._running = None  # simulate the next invocation
+        setup._inventory = None
+        assert running_models(ttl=10) == {"qwen2.5:7b"}
+        assert "qwen2.5:7b" in installed_models(ttl=60)
+        with patch("ai_cli.setup.time.time", return_value=setup.time.time() + 20):
+            running_models(ttl=10)
+        running_models()
+
+    assert client.ps.call_count == 3
+    mock_list.assert_called_once()
+
+
+def test_warm_model_forgets_running_set():
+    client = _ps_client()
+    client.generate.return_value.load_duration = None
+    with (
+        patch("ai_cli.setup.get_client", return_value=client),
+        patch("ai_cli.setup.load_config", return_value={}),
+    ):
+        assert running_models(ttl=10) == set()
+        warm_model("qwen2.5:7b")
+        client.ps.return_value.models = [MagicMock(model="qwen2.5:7b")]
+
+        assert running_models(ttl=10) == {"qwen2.5:7b"}
+
+
+@patch("ai_cli.setup.ollama_pull")
+@patch("ai_cli.setup.ollama_list")
+def test_pull_invalidates_inventory(mock_list, mock_pull):
+    resp = MagicMock()
+    resp.models = []
+    mock_list.return_value = resp
+    progress = MagicMock()
+    progress.status = "success"
+    progress.completed = None
+    progress.total = None
+    mock_pull.return_value = iter([progress])
+
+    with patch("click.confirm", return_value=True):
+        ensure_ready("llama3")
+
+    assert setup._inventory is None
+    assert not setup.INVENTORY_PATH.exists()
+
+
+# --- Warm-up ---
+
+
+def test_warm_model_sends_empty_request_and_reports_load_time():
+    config = {"keep_alive": "30m", "model_options": {"qwen2.5:7b": {"num_ctx": 8192}}}
+    client = MagicMock()
+    client.generate.return_value.load_duration = 1_500_000_000
+    with (
+        patch("ai_cli.setup.get_client", return_value=client),
+        patch("ai_cli.setup.load_config", return_value=config),
+    ):
+        load = warm_model("qwen2.5:7b")
+
+    options = client.generate.call_args.kwargs.pop("options")
+    client.generate.assert_called_once_with(model="qwen2.5:7b", prompt="", keep_alive="30m")
+    assert options["num_ctx"] == 8192
+    assert load == 1.5
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_ensure_ready_warm_loads_model_in_background(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    with patch("ai_cli.setup.threading.Thread") as mock_thread:
+        ensure_ready("qwen2.5:7b", warm=True)
+
+    assert mock_thread.call_args.kwargs["args"] == ("qwen2.5:7b",)
+    assert mock_thread.call_args.kwargs["daemon"] is True
+    mock_thread.return_value.start.assert_called_once()
+
+
+@patch("ai_cli.setup.ollama_list")
+def test_ensure_ready_without_warm_starts_no_thread(mock_list, mock_list_response):
+    mock_list.return_value = mock_list_response
+    with patch("ai_cli.setup.threading.Thread") as mock_thread:
+        ensure_ready("qwen2.5:7b")
+
+    mock_thread.assert_not_called()
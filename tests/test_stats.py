@@ -0,0 +1,81 @@
+"""Tests for per-model latency statistics."""
+
+import time
+from unittest.mock import patch
+
+from ai_cli.stats import ModelStats
+
+
+def test_summary_reports_counts_and_quantiles(tmp_path):
+    stats = ModelStats(tmp_path / "stats.json")
+    for total in (1.0, 2.0, 3.0, 4.0, 10.0):
+        stats.record("llama3", total, ttft=total / 2)
+    stats.record_failure("llama3")
+
+    summary = ModelStats(tmp_path / "stats.json").summary("llama3")
+
+    assert summary["requests"] == 6
+    assert summary["failures"] == 1
+    assert summary["p50"] == 3.0
+    assert summary["p95"] == 10.0
+    assert summary["ttft_p50"] == 1.5
+
+
+def test_summary_unknown_model_is_none(tmp_path):
+    assert ModelStats(tmp_path / "stats.json").summary("llama3") is None
+
+
+def test_old_samples_count_less(tmp_path):
+    stats = ModelStats(tmp_path / "stats.json", half_life_days=1)
+    now = time.time()
+    with patch("ai_cli.stats.time.time", return_value=now - 10 * 86400):
+        for _ in range(3):
+            stats.record("llama3", 9.0)
+    stats.record("llama3", 1.0)
+
+    assert stats.summary("llama3")["p50"] == 1.0
+
+
+def test_rank_orders_fastest_first_with_unmeasured_models_leading(tmp_path):
+    stats = ModelStats(tmp_path / "stats.json")
+    stats.record("slow", 8.0)
+    stats.record("fast", 1.0)
+    stats.record_failure("broken")
+
+    assert stats.rank(["slow", "broken", "fast", "new"]) == ["new", "fast", "slow", "broken"]
+
+
+def test_rank_penalizes_failures(tmp_path):
+    stats = ModelStats(tmp_path / "stats.json")
+    stats.record("flaky", 1.0)
+    stats.record_failure("flaky")
+    stats.record_failure("flaky")
+    stats.record("steady", 1.5)
+
+    assert stats.rank(["flaky", "steady"]) == ["steady", "flaky"]
+
+
+def test_concurrent_writers_keep_every_sample(tmp_path):
+    import threading
+
+    def worker():
+        stats = ModelStats(tmp_path / "stats.json")
+        for _ in range(10):
+            stats.record("llama3", 1.0)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert ModelStats(tmp_path / "stats.json").summary("llama3")["requests"] == 80
+
+
+def test_failure_to_save_is_not_raised(tmp_path):
+    stats = ModelStats(tmp_path / "stats.json")
+    with patch("ai_cli.stats.write_atomic", side_effect=OSError("disk full")):
+        stats.record("llama3", 1.0)
+        stats.record_failure("llama3")
+
+    assert stats.summary("llama3") is None
@@ -0,0 +1,97 @@
+"""Tests for the PATH executable index."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ai_cli import tools
+from ai_cli.llm import _detect_env
+from ai_cli.tools import available_tools, path_executables
+
+
+def _executable(directory, name, mode=0o755):
+    path = directory / name
+    path.write_text("#!/bin/sh\n")
+    path.chmod(mode)
+    return path
+
+
+@pytest.fixture()
+def path_dirs(tmp_path, monkeypatch):
+    first, second = tmp_path / "bin1", tmp_path / "bin2"
+    first.mkdir()
+    second.mkdir()
+    _executable(first, "git")
+    _executable(first, "notes.txt", mode=0o644)
+    (first / "subdir").mkdir()
+    _executable(second, "docker")
+    path = os.pathsep.join([str(first), str(second), str(tmp_path / "missing")])
+    monkeypatch.setenv("PATH", path)
+    return first, second
+
+
+def test_index_lists_executables_only(path_dirs):
+    assert path_executables() == {"git", "docker"}
+
+
+def test_index_reused_from_disk_without_scanning(path_dirs):
+    path_executables()
+
+    with patch("ai_cli.tools._index", None), patch("ai_cli.tools.os.scandir") as scandir:
+        assert path_executables() == {"git", "docker"}
+
+    scandir.assert_not_called()
+
+
+def test_index_rebuilt_when_directory_changes(path_dirs):
+    first, _ = path_dirs
+    path_executables()
+
+    _executable(first, "jq")
+    stat = os.stat(first)
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert "jq" in path_executables()
+
+
+def test_index_rebuilt_when_path_changes(path_dirs, monkeypatch):
+    first, _ = path_dirs
+    path_executables()
+
+    monkeypatch.setenv("PATH", str(first))
+
+    assert path_executables() == {"git"}
+
+
+def test_available_tools_follow_configured_order_and_labels(path_dirs):
+    assert available_tools({"tools": ["docker", "kubectl", "git"]}) == ["Docker", "git"]
+    assert available_tools({}) == ["Docker", "git"]
+
+
+def test_detect_env_lists_available_tools(path_dirs):
+    env = _detect_env({"tools": ["git", "docker"]})
+
+    assert "Available tools: git, Docker. " in env["env_context"]
+
+
+def test_detect_env_describes_the_given_environment(path_dirs):
+    first, _ = path_dirs
+    env = _detect_env(
+        {"tools": ["git", "docker"]}, environ={"SHELL": "/bin/zsh", "PATH": str(first)}
+    )
+
+    assert env["shell"] == "zsh"
+    assert "Available tools: git. " in env["env_context"]
+
+
+def test_detection_cost_does_not_grow_with_tool_list(path_dirs):
+    path_executables()
+
+    with patch.object(tools.os, "stat", wraps=os.stat) as stat:
+        available_tools({"tools": ["git"]})
+        few = stat.call_count
+        stat.reset_mock()
+        available_tools({"tools": [f"tool{i}" for i in range(100)]})
+
+    assert stat.call_count == few